@@ -1,8 +1,7 @@
 for L in 21; do
     for r in 6.083 6.325; do
-        for seed in `seq 0 1000`; do #1.0 1.415 2.0 2.237 2.829 3.0
-            python3 ../generator/generate.py -L $L -s $seed -r $r --metis -f test
-        done
+        #1.0 1.415 2.0 2.237 2.829 3.0
+        python3 ../generator/generate.py -L $L --seeds 0:1001 --jobs 8 -r $r --metis -f test
     done
 done
 
@@ -2,11 +2,20 @@
 # // SPDX-License-Identifier: Apache-2.0
 # // Copyright 2023: Amazon Web Services, Inc
 ###############################################################################
+import os
+import sys
 import pandas as pd
 import numpy as np
 from matplotlib.ticker import FixedLocator, FuncFormatter, MaxNLocator
 import warnings
 
+sys.path.append(
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "..", "generator", "optimization"
+    )
+)
+from result_store import load_results
+
 DICT_RC_PARAM = {
     "font.size": 20,
     "text.usetex": True,
@@ -31,7 +40,9 @@ def get_data_frames_cplex(L_range=range(7, 36, 2), d=0.8):
 
 def get_cplex_data(d=0.8):
     base_path = "../generator/data/cplex/"
-    df = pd.read_csv(base_path + f"run_time_d{d}_UDG_8vCPU.csv")
+    # the columnar copy written by optimization/result_store.py reads much faster,
+    # load_results only uses it when it is up to date with the csv file
+    df = load_results(base_path + f"run_time_d{d}_UDG_8vCPU.csv")
     return df
 
 
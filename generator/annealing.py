@@ -0,0 +1,406 @@
+###############################################################################
+# // SPDX-License-Identifier: Apache-2.0
+# // Copyright 2023: Amazon Web Services, Inc
+###############################################################################
+"""annealing.py: Simulated annealing of unweighted MIS instances.
+
+This is the simulated annealing of `cpp/fixed_depth_sa.cc` with many replicas
+run at once: the states of the replicas are the rows of NumPy matrices
+(replicas x nodes), and each step makes one move in every replica.
+
+The states and moves are those of `cpp/state.h` and `cpp/independent_set.h`.
+Only independent sets are visited, and the nodes of each replica are kept in
+an order with contiguous sections for the nodes in the set, the vacant ones
+(no neighbor in the set) and the single ones (one neighbor in the set). A move
+adds a vacant node (60%), else exchanges a single node with its neighbor in
+the set (60% of the rest), else removes a node from the set, which is
+accepted with probability exp(-beta). A sweep is one move per node, and beta
+follows a geometric schedule from `b_min` to `b_max` over the sweeps.
+"""
+
+import argparse
+import math
+import sys
+import time
+from multiprocessing import Pool
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from instance import Instance
+
+
+def neighbor_matrix(nn: List[List[int]]) -> np.ndarray:
+    """The adjacency lists as an (N, max degree) array padded with -1."""
+    width = max([len(neighbors) for neighbors in nn] + [1])
+    matrix = np.full((len(nn), width), -1, dtype=np.int64)
+    for i, neighbors in enumerate(nn):
+        matrix[i, : len(neighbors)] = neighbors
+    return matrix
+
+
+class Replicas:
+    """The states of many replicas of the independent set model.
+
+    Each attribute of a state in `cpp/state.h` is a column (or a row per
+    replica) here, and the methods take the replicas to update (`rows`) and
+    the node of each of them (`nodes`).
+
+    Args:
+      nn (list): adjacency list of each node
+      replicas (int): the number of replicas
+      rng (np.random.Generator): the random numbers of all the replicas
+    """
+
+    def __init__(
+        self, nn: List[List[int]], replicas: int, rng: np.random.Generator
+    ) -> None:
+        self.N = len(nn)
+        self.R = replicas
+        self.rng = rng
+        self.neighbors = neighbor_matrix(nn)
+        self.degree = np.array([len(neighbors) for neighbors in nn], dtype=np.int64)
+        self.in_set = np.zeros((replicas, self.N), dtype=bool)
+        self.adjacent = np.zeros((replicas, self.N), dtype=np.int64)
+        self.order = np.tile(np.arange(self.N), (replicas, 1))
+        self.position = self.order.copy()
+        self.size = np.zeros(replicas, dtype=np.int64)
+        self.vacant = np.full(replicas, self.N, dtype=np.int64)
+        self.single = np.full(replicas, self.N, dtype=np.int64)
+        self.n_moves = 0
+        self.n_accepted = np.zeros(replicas, dtype=np.int64)
+
+    def reorder(self, rows: np.ndarray, nodes: np.ndarray, target: np.ndarray):
+        """Move each node to the target position (swapping with its node)."""
+        other = self.order[rows, target]
+        current = self.position[rows, nodes]
+        self.order[rows, current] = other
+        self.order[rows, target] = nodes
+        self.position[rows, other] = current
+        self.position[rows, nodes] = target
+
+    def add(self, rows: np.ndarray, nodes: np.ndarray) -> None:
+        """Add a node (not in the set) to each replica of `rows`."""
+        self.in_set[rows, nodes] = True
+        self.reorder(rows, nodes, self.size[rows])
+        self.size[rows] += 1
+        for k in range(self.neighbors.shape[1]):
+            keep = self.degree[nodes] > k
+            rows, nodes = rows[keep], nodes[keep]
+            if len(rows) == 0:
+                break
+            j = self.neighbors[nodes, k]
+            adjacent = self.adjacent[rows, j]
+            # vacant -> single
+            vacant = adjacent == 0
+            r = rows[vacant]
+            self.reorder(r, j[vacant], self.vacant[r] - 1)
+            self.vacant[r] -= 1
+            # single -> other
+            single = adjacent == 1
+            r = rows[single]
+            self.reorder(r, j[single], self.single[r] - 1)
+            self.single[r] -= 1
+            self.adjacent[rows, j] += 1
+
+    def remove(self, rows: np.ndarray, nodes: np.ndarray) -> None:
+        """Remove a node (in the set) from each replica of `rows`."""
+        self.in_set[rows, nodes] = False
+        self.reorder(rows, nodes, self.size[rows] - 1)
+        self.size[rows] -= 1
+        for k in range(self.neighbors.shape[1]):
+            keep = self.degree[nodes] > k
+            rows, nodes = rows[keep], nodes[keep]
+            if len(rows) == 0:
+                break
+            j = self.neighbors[nodes, k]
+            adjacent = self.adjacent[rows, j]
+            # single -> vacant
+            single = adjacent == 1
+            r = rows[single]
+            self.reorder(r, j[single], self.vacant[r])
+            self.vacant[r] += 1
+            # other -> single
+            other = adjacent == 2
+            r = rows[other]
+            self.reorder(r, j[other], self.single[r])
+            self.single[r] += 1
+            self.adjacent[rows, j] -= 1
+
+    def init(self) -> None:
+        """Fill each replica with the nodes in a random order, when possible."""
+        rows = np.arange(self.R)
+        permutations = self.rng.permuted(
+            np.tile(np.arange(self.N), (self.R, 1)), axis=1
+        )
+        for t in range(self.N):
+            nodes = permutations[:, t]
+            vacant = self.adjacent[rows, nodes] == 0
+            self.add(rows[vacant], nodes[vacant])
+
+    def step(self, beta: float) -> None:
+        """One move in every replica (see `get_random_move` in the C++ code)."""
+        r = self.rng.random(self.R)
+        rows = np.arange(self.R)
+
+        # Add a vacant node
+        vacant = self.vacant - self.size
+        add = (vacant > 0) & (r < 0.6)
+        p = self.size + np.minimum((vacant * r / 0.6).astype(np.int64), vacant - 1)
+        r = np.where(vacant > 0, (r - 0.6) / 0.4, r)
+
+        # Exchange a single node with its neighbor in the set
+        single = self.single - self.vacant
+        exchange = ~add & (single > 0) & (r < 0.6)
+        q = self.vacant + np.minimum((single * r / 0.6).astype(np.int64), single - 1)
+        r = np.where(~add & (single > 0), (r - 0.6) / 0.4, r)
+
+        # Remove a node from the set
+        remove = ~add & ~exchange & (self.size > 0)
+        s = np.minimum((self.size * r).astype(np.int64), self.size - 1)
+
+        # The moves which do not decrease the size are always accepted
+        e = rows[exchange]
+        if len(e):
+            nodes = self.order[e, q[e]]
+            neighbors = self.neighbors[nodes]
+            in_set = self.in_set[e[:, None], neighbors] & (neighbors >= 0)
+            partner = neighbors[np.arange(len(e)), np.argmax(in_set, axis=1)]
+            self.remove(e, partner)
+            self.add(e, nodes)
+        a = rows[add]
+        if len(a):
+            self.add(a, self.order[a, p[a]])
+        accept = remove & (self.rng.random(self.R) < math.exp(-beta))
+        d = rows[accept]
+        if len(d):
+            self.remove(d, self.order[d, s[d]])
+
+        self.n_moves += 1
+        self.n_accepted += add | exchange | accept
+
+
+def anneal(
+    nn: List[List[int]],
+    target: Optional[int] = None,
+    replicas: int = 1000,
+    steps: int = 32,
+    b_min: float = 1e1,
+    b_max: float = 5e3,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Simulated annealing of many replicas at once.
+
+    Args:
+      nn (list): adjacency list of each node
+      target (int): the size of the independent set to reach (e.g., the mis
+        size, to measure the time to solution)
+      replicas (int): the number of replicas
+      steps (int): the number of sweeps
+      b_min (float): the inverse temperature of the first sweep
+      b_max (float): the inverse temperature of the last sweep
+      seed (int): the seed of the random numbers (or a `SeedSequence`)
+
+    Returns:
+      a dict with the best size found and one such set (`best`, `nodes`),
+      how many replicas reached the target (`hits`), the wall and process
+      time of the whole run (`time`, `process_time`), the wall time until a
+      replica first reached the target (`time_to_target`, None if none did),
+      the wall and process time until the best size was first found
+      (`time_to_best`, `process_time_to_best`), and the acceptance rate.
+      Times are taken at the end of each sweep.
+    """
+    time_start = time.time()
+    process_time_start = time.process_time()
+    state = Replicas(nn, replicas, np.random.default_rng(seed))
+    state.init()
+    best_size = state.size.copy()
+    best_sets = state.in_set.copy()
+    time_to_target = None
+    found = -1
+    time_to_best = process_time_to_best = 0.0
+    for step in range(steps):
+        progress = step / (steps - 1) if steps > 1 else 0
+        beta = b_min * (b_max / b_min) ** progress
+        for _ in range(state.N):
+            state.step(beta)
+            better = state.size > best_size
+            if better.any():
+                best_size[better] = state.size[better]
+                best_sets[better] = state.in_set[better]
+        if best_size.max() > found:
+            found = best_size.max()
+            time_to_best = time.time() - time_start
+            process_time_to_best = time.process_time() - process_time_start
+        if target is not None and time_to_target is None and found >= target:
+            time_to_target = time.time() - time_start
+
+    best = int(np.argmax(best_size))
+    hits = int((best_size >= target).sum()) if target is not None else 0
+    return {
+        "best": int(best_size[best]),
+        "nodes": np.flatnonzero(best_sets[best]).tolist(),
+        "replicas": replicas,
+        "hits": hits,
+        "time": time.time() - time_start,
+        "process_time": time.process_time() - process_time_start,
+        "time_to_target": time_to_target,
+        "time_to_best": time_to_best,
+        "process_time_to_best": process_time_to_best,
+        "acceptance_rate": float((state.n_accepted / max(state.n_moves, 1)).mean()),
+    }
+
+
+def tts(result: Dict[str, Any], confidence: float = 0.99) -> float:
+    """Time to solution of an annealing run at some confidence.
+
+    The time of one replica is the time of the run divided by the number of
+    replicas, and the probability to reach the target is the portion of the
+    replicas which did (inf if none).
+    """
+    p = result["hits"] / result["replicas"]
+    time_replica = result["time"] / result["replicas"]
+    if p == 0:
+        return math.inf
+    if p == 1:
+        return time_replica
+    return time_replica * math.log(1 - confidence) / math.log(1 - p)
+
+
+def _anneal(args) -> Dict[str, Any]:
+    nn, kwargs = args
+    return anneal(nn, **kwargs)
+
+
+def anneal_parallel(
+    nn: List[List[int]],
+    target: Optional[int] = None,
+    replicas: int = 1000,
+    workers: int = 1,
+    seed: int = 0,
+    **kwargs,
+) -> Dict[str, Any]:
+    """Simulated annealing with the replicas split over a pool of processes.
+
+    Each process gets its own random numbers (spawned from `seed`). The result
+    is that of `anneal` for all the replicas, where the time is that of the
+    slowest process, the process time the sum over the processes, and the
+    times to target and to best those of the first process to reach them.
+    """
+    if workers <= 1:
+        return anneal(nn, target, replicas, seed=seed, **kwargs)
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    counts = [replicas // workers + (k < replicas % workers) for k in range(workers)]
+    jobs = [
+        (nn, dict(target=target, replicas=count, seed=child, **kwargs))
+        for count, child in zip(counts, seeds)
+        if count > 0
+    ]
+    with Pool(len(jobs)) as pool:
+        results = pool.map(_anneal, jobs)
+    best = max(results, key=lambda result: result["best"])
+    # the first process to find the best size
+    first = min(
+        (result for result in results if result["best"] == best["best"]),
+        key=lambda result: result["time_to_best"],
+    )
+    times = [r["time_to_target"] for r in results if r["time_to_target"] is not None]
+    return {
+        "best": best["best"],
+        "nodes": best["nodes"],
+        "replicas": replicas,
+        "hits": sum(result["hits"] for result in results),
+        "time": max(result["time"] for result in results),
+        "process_time": sum(result["process_time"] for result in results),
+        "time_to_target": min(times) if times else None,
+        "time_to_best": first["time_to_best"],
+        "process_time_to_best": first["process_time_to_best"],
+        "acceptance_rate": sum(r["acceptance_rate"] * r["replicas"] for r in results)
+        / replicas,
+    }
+
+
+def anneal_instance(instance: Instance, **kwargs) -> Dict[str, Any]:
+    """Simulated annealing of an instance (see `anneal_parallel`)."""
+    return anneal_parallel(instance.adjacency(), **kwargs)
+
+
+def main(argv):
+    # Usage: python annealing.py some_instance.json [--target 89]
+    from solver import load_binary, load_json
+
+    parser = argparse.ArgumentParser(
+        prog="annealing.py",
+        description="Simulated annealing of unweighted MIS instances",
+    )
+    parser.add_argument(
+        "instance",
+        type=str,
+        help="The instance in json or binary (.bin) format, or an archive shard (.mis)",
+    )
+    parser.add_argument(
+        "-s", "--seed", type=int, help="The seed of the instance in an archive shard"
+    )
+    parser.add_argument(
+        "-t", "--target", type=int, help="The size to reach (e.g., the mis size)"
+    )
+    parser.add_argument(
+        "--replicas", type=int, default=1000, help="Number of replicas (default 1000)"
+    )
+    parser.add_argument(
+        "--steps", type=int, default=32, help="Number of sweeps (default 32)"
+    )
+    parser.add_argument(
+        "--b_min", type=float, default=1e1, help="Initial beta (default 10)"
+    )
+    parser.add_argument(
+        "--b_max", type=float, default=5e3, help="Final beta (default 5000)"
+    )
+    parser.add_argument(
+        "--rng_seed", type=int, default=0, help="Seed of the annealing (default 0)"
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="Number of processes (default 1)"
+    )
+    args = parser.parse_args(argv[1:])
+    if args.instance.endswith(".mis"):
+        _, nn = load_binary(args.instance, args.seed)
+    elif args.instance.endswith(".bin"):
+        _, nn = load_binary(args.instance)
+    else:
+        assert args.instance[-5:] == ".json"
+        _, nn = load_json(args.instance)
+
+    result = anneal_parallel(
+        nn,
+        target=args.target,
+        replicas=args.replicas,
+        workers=args.jobs,
+        seed=args.rng_seed,
+        steps=args.steps,
+        b_min=args.b_min,
+        b_max=args.b_max,
+    )
+
+    print("file:", args.instance)
+    if args.seed is not None:
+        print("seed:", args.seed)
+    print("# N steps b_min b_max replicas gs acc")
+    print(
+        len(nn),
+        args.steps,
+        args.b_min,
+        args.b_max,
+        args.replicas,
+        result["hits"],
+        result["acceptance_rate"],
+    )
+    print(f"|is|={result['best']}")
+    print(f"time={result['time']:.3f}")
+    if args.target is not None:
+        print(f"time_to_target={result['time_to_target']}")
+        print(f"tts99={tts(result):.6f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
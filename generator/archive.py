@@ -0,0 +1,199 @@
+###############################################################################
+# // SPDX-License-Identifier: Apache-2.0
+# // Copyright 2023: Amazon Web Services, Inc
+###############################################################################
+
+"""archive.py: Sharded archives of many MIS instances in a few files."""
+
+import io
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from instance import Instance, read_binary
+from utils import format_radius
+
+# Header of each shard, 64 bytes
+SHARD_MAGIC = b"MISA"
+SHARD_VERSION = 1
+SHARD_HEADER = np.dtype(
+    [
+        ("magic", "S4"),
+        ("format", "<u4"),
+        ("capacity", "<u8"),
+        ("first_seed", "<i8"),
+        # the ordering of the nodes of the records (see ordering.py), empty if
+        # they are in the order of the generator
+        ("order", "S16"),
+        ("reserved", "V24"),
+    ]
+)
+# The index of a shard has one entry per seed: the offset of the record in the
+# shard and its length (0 if the seed is not in the shard)
+SHARD_INDEX = np.dtype([("offset", "<u8"), ("length", "<u8")])
+
+
+class Archive:
+    """Instances of the same (L, density, r) for many seeds, in sharded files.
+
+    Seed s is stored in shard s // shard_size. Each shard has a header, a
+    fixed-size index with one entry per seed of the shard, and the records
+    of the instances appended one after the other. Each record is a binary
+    container (see `Instance.binary`), so an instance is read by looking up
+    its offset in the index and memory mapping its arrays.
+
+    The nodes of all the records of a shard are in the same `order` (see
+    ordering.py, None for the order of the generator), which is written in
+    the header of the shard: appending in another order raises ValueError.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        L: int,
+        density: float = 0.8,
+        r: float = 2 ** 0.5,
+        shard_size: int = 1000,
+        order: Optional[str] = None,
+    ) -> None:
+        self.folder = folder
+        self.L = L
+        self.density = density
+        self.r = format_radius(r)
+        self.shard_size = shard_size
+        self.order = order
+
+    def shard_path(self, seed: int) -> str:
+        shard = seed // self.shard_size
+        name = f"L{self.L}_d{self.density}_r{self.r}_shard{shard}.mis"
+        return os.path.join(self.folder, name)
+
+    def index(self, seed: int) -> np.ndarray:
+        """The index of the shard of a seed (empty if the shard does not exist)."""
+        path = self.shard_path(seed)
+        if not os.path.isfile(path):
+            return np.zeros(0, dtype=SHARD_INDEX)
+        _, index = read_index(path)
+        if len(index) != self.shard_size:
+            raise ValueError(f"{path} has {len(index)} seeds per shard")
+        return index
+
+    def __contains__(self, seed: int) -> bool:
+        index = self.index(seed)
+        return len(index) > 0 and index[seed % self.shard_size]["length"] > 0
+
+    def seeds(self) -> List[int]:
+        """The seeds in the archive (sorted)."""
+        seeds = []
+        if not os.path.isdir(self.folder):
+            return seeds
+        prefix = f"L{self.L}_d{self.density}_r{self.r}_shard"
+        for name in os.listdir(self.folder):
+            if name.startswith(prefix) and name.endswith(".mis"):
+                first = int(name[len(prefix) : -4]) * self.shard_size
+                index = self.index(first)
+                seeds += (first + np.flatnonzero(index["length"])).tolist()
+        return sorted(seeds)
+
+    def offset(self, seed: int) -> int:
+        """The offset of the record of a seed in its shard."""
+        path = self.shard_path(seed)
+        if not os.path.isfile(path):
+            raise KeyError(f"seed {seed} is not in the archive {self.folder}")
+        return shard_offset(path, seed)
+
+    def read(
+        self, seed: int
+    ) -> Tuple[Dict[str, Any], np.ndarray, np.ndarray, np.ndarray]:
+        """The memory mapped arrays of an instance (see `instance.read_binary`)."""
+        return read_binary(self.shard_path(seed), self.offset(seed))
+
+    def get(self, seed: int) -> Instance:
+        """The instance of a seed."""
+        return Instance.from_binary(self.shard_path(seed), self.offset(seed))
+
+    def append(self, seed: int, record: bytes) -> None:
+        """Append the record of an instance (see `record`) to its shard.
+
+        Records are appended by a single process, which can receive them from
+        worker processes. Adding a seed again replaces its entry in the index.
+        """
+        path = self.shard_path(seed)
+        if not os.path.isfile(path):
+            os.makedirs(self.folder, exist_ok=True)
+            header = np.zeros(1, dtype=SHARD_HEADER)
+            header[0] = (
+                SHARD_MAGIC,
+                SHARD_VERSION,
+                self.shard_size,
+                seed - seed % self.shard_size,
+                (self.order or "").encode(),
+                b"",
+            )
+            with open(path, "wb") as fh:
+                fh.write(header.tobytes())
+                fh.write(np.zeros(self.shard_size, dtype=SHARD_INDEX).tobytes())
+        self.index(seed)  # check the header of an existing shard
+        order = shard_order(path)
+        if order != self.order:
+            raise ValueError(
+                f"{path} has the nodes in {order or 'generated'} order, "
+                f"not {self.order or 'generated'}"
+            )
+        with open(path, "r+b") as fh:
+            offset = fh.seek(0, io.SEEK_END)
+            # keep the records aligned to 8 bytes
+            padding = -offset % 8
+            fh.write(b"\0" * padding)
+            fh.write(record)
+            entry = np.array([(offset + padding, len(record))], dtype=SHARD_INDEX)
+            fh.seek(SHARD_HEADER.itemsize + (seed % self.shard_size) * entry.nbytes)
+            fh.write(entry.tobytes())
+
+    def extend(self, records: Iterable[Tuple[int, bytes]]) -> int:
+        """Append many (seed, record) pairs, returns how many were added."""
+        count = 0
+        for seed, record in records:
+            self.append(seed, record)
+            count += 1
+        return count
+
+
+def read_index(path: str) -> Tuple[int, np.ndarray]:
+    """The first seed of a shard and its (memory mapped) index."""
+    header = np.fromfile(path, dtype=SHARD_HEADER, count=1)
+    if len(header) == 0 or header["magic"][0] != SHARD_MAGIC:
+        raise ValueError(f"{path} is not an archive shard")
+    if header["format"][0] != SHARD_VERSION:
+        raise ValueError(f"{path} has shard format {header['format'][0]}")
+    index = np.memmap(
+        path,
+        dtype=SHARD_INDEX,
+        mode="r",
+        offset=SHARD_HEADER.itemsize,
+        shape=(int(header["capacity"][0]),),
+    )
+    return int(header["first_seed"][0]), index
+
+
+def shard_order(path: str) -> Optional[str]:
+    """The ordering of the nodes of the records of a shard (see Archive)."""
+    header = np.fromfile(path, dtype=SHARD_HEADER, count=1)
+    return header["order"][0].decode() or None
+
+
+def shard_offset(path: str, seed: int) -> int:
+    """The offset of the record of a seed in a shard (see `read_binary`)."""
+    first_seed, index = read_index(path)
+    slot = seed - first_seed
+    if not 0 <= slot < len(index) or index[slot]["length"] == 0:
+        raise KeyError(f"seed {seed} is not in the shard {path}")
+    return int(index[slot]["offset"])
+
+
+def record(instance: Instance) -> Tuple[int, bytes]:
+    """The seed of an instance and its record (its binary container)."""
+    buffer = io.BytesIO()
+    instance.write_binary(buffer)
+    return instance.seed, buffer.getvalue()
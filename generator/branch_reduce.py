@@ -0,0 +1,479 @@
+###############################################################################
+# // SPDX-License-Identifier: Apache-2.0
+# // Copyright 2023: Amazon Web Services, Inc
+###############################################################################
+"""branch_reduce.py: Exact branch-and-reduce solver for unweighted MIS.
+
+Unlike the sweeping-line solvers (`solver.py`), whose cost is exponential in
+the frontier of the instance, this solver works on any graph. The graph is
+represented with bitsets (Python ints): bit j of `adj[i]` is set if nodes i
+and j are connected, and the nodes remaining in a subproblem are a mask.
+
+Each subproblem is first reduced (see `BranchAndReduce.reduce`) with
+rules which keep at least one maximum independent set:
+
+  * degree 0 and 1: the node is in the set (its neighbor is not),
+  * domination: if N[u] is contained in N[v] for neighbors u and v,
+    v can be removed,
+  * degree 2 folding: a node v with two non-adjacent neighbors u and w is
+    replaced with the three of them by a single node connected to the
+    neighbors of u and w (it stands for {u, w}, and for {v} if not taken),
+  * twins: two non-adjacent nodes of degree 3 with the same neighbors
+    are both in the set if two of the neighbors are connected, otherwise
+    they are folded with their neighbors like a degree 2 node.
+
+The remaining graph is split in connected components, solved separately,
+and otherwise the solver branches on a node (taking it or not). Branches are
+pruned with the size of a greedy clique cover, which is an upper bound of the
+size of the independent sets, and for larger subproblems with the linear
+relaxation of the clique formulation (one constraint per clique of a cover of
+the edges, solved with HiGHS). The relaxation of unit disk graphs is tight,
+and the solver branches on the node whose value is the most fractional.
+
+The search runs with an explicit stack (see `BranchAndReduce.run`), so its
+depth is not limited by the recursion limit of Python.
+"""
+
+import argparse
+import sys
+from typing import Dict, Generator, Iterator, List, Optional, Tuple
+
+import numpy as np
+from scipy.optimize import linprog
+from scipy.sparse import csr_matrix, hstack, vstack
+
+from instance import Instance
+
+try:
+    popcount = int.bit_count  # Python >= 3.10
+except AttributeError:
+
+    def popcount(mask: int) -> int:
+        return bin(mask).count("1")
+
+# A search of a subproblem: it yields the searches of its subproblems, is sent
+# their results, and returns the size of its independent set and the set
+Search = Generator["Search", Tuple[int, int], Tuple[int, int]]
+
+
+def bits(mask: int) -> Iterator[int]:
+    """The indices of the bits set in a mask, in increasing order."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def bitset_adjacency(nn: List[List[int]]) -> List[int]:
+    """The adjacency of each node as a bitset, from its adjacency list."""
+    adj = []
+    for neighbors in nn:
+        mask = 0
+        for j in neighbors:
+            mask |= 1 << j
+        adj.append(mask)
+    return adj
+
+
+def maximal_cliques(adj: List[int]) -> List[int]:
+    """All the maximal cliques of a graph, as masks (Bron-Kerbosch with pivot)."""
+    cliques = []
+    stack = [(0, (1 << len(adj)) - 1, 0)]
+    while stack:
+        clique, candidates, excluded = stack.pop()
+        if not candidates:
+            if not excluded:
+                cliques.append(clique)
+            continue
+        pivot = max(
+            bits(candidates | excluded), key=lambda i: popcount(adj[i] & candidates)
+        )
+        for v in bits(candidates & ~adj[pivot]):
+            stack.append((clique | (1 << v), candidates & adj[v], excluded & adj[v]))
+            candidates &= ~(1 << v)
+            excluded |= 1 << v
+    return cliques
+
+
+def edge_clique_cover(adj: List[int]) -> List[int]:
+    """Maximal cliques which cover all the edges of a graph, as masks.
+
+    The cliques are taken largest first, and only kept if they cover an edge
+    not covered yet.
+    """
+    covered = [0] * len(adj)
+    cover = []
+    for clique in sorted(maximal_cliques(adj), key=popcount, reverse=True):
+        if popcount(clique) < 2:
+            continue
+        if any(clique & ~covered[v] & ~(1 << v) for v in bits(clique)):
+            cover.append(clique)
+            for v in bits(clique):
+                covered[v] |= clique
+    return cover
+
+
+class BranchAndReduce:
+    """Exact maximum independent set of a graph given as bitsets.
+
+    Args:
+      adj (list): the adjacency of each node as a bitset (see
+        `bitset_adjacency`), which is not modified
+      lp (bool): whether to bound the larger subproblems with the linear
+        relaxation of the clique formulation (see `lp_bound`)
+
+    Attributes:
+      branches (int): the number of subproblems which were branched on
+      folds (int): the number of folds applied (degree 2 and twins)
+      lps (int): the number of linear relaxations solved
+    """
+
+    # Subproblems with fewer nodes are only bounded by the clique cover
+    LP_MIN_NODES = 30
+
+    def __init__(self, adj: List[int], lp: bool = True) -> None:
+        self.adj = adj
+        self.lp = lp
+        self.branches = 0
+        self.folds = 0
+        self.lps = 0
+        if lp:
+            # the constraints of the nodes of the graph, the nodes created by
+            # the folds get their own constraints (see `lp_bound`)
+            cliques = edge_clique_cover(adj)
+            rows = [k for k, clique in enumerate(cliques) for _ in bits(clique)]
+            columns = [v for clique in cliques for v in bits(clique)]
+            self.incidence = csr_matrix(
+                (np.ones(len(rows)), (rows, columns)), shape=(len(cliques), len(adj))
+            )
+
+    def solve(self) -> Tuple[int, int]:
+        """The size of a maximum independent set and the set as a mask."""
+        alive = (1 << len(self.adj)) - 1
+        return self.run(self.search(self.adj, alive, -1))
+
+    @staticmethod
+    def run(search: Search) -> Tuple[int, int]:
+        """Run a search and its subproblems with an explicit stack.
+
+        Each search yields the searches of its subproblems, which are run
+        before it resumes with their result (instead of recursive calls).
+        """
+        stack = [search]
+        result = None
+        while stack:
+            try:
+                stack.append(stack[-1].send(result))
+                result = None
+            except StopIteration as stop:
+                stack.pop()
+                result = stop.value
+        return result
+
+    def search(self, adj: List[int], alive: int, lower: int) -> Search:
+        """The best independent set of the nodes in `alive`.
+
+        The search is pruned once it cannot find a set larger than `lower`,
+        in which case the set returned has at most `lower` nodes (so -1 finds
+        a maximum independent set).
+        """
+        adj, alive, taken, gain, folds = self.reduce(adj, alive)
+        count = popcount(taken) + gain
+        if alive:
+            size, chosen = yield self.branch(adj, alive, lower - count)
+            count += size
+            taken |= chosen
+        # Undo the folds, the last one first
+        for node, merged, alternative in reversed(folds):
+            if taken >> node & 1:
+                taken ^= (1 << node) | merged
+            else:
+                taken |= alternative
+        return count, taken
+
+    def branch(self, adj: List[int], alive: int, lower: int) -> Search:
+        """The best independent set of a reduced subproblem (see `search`)."""
+        components = self.components(adj, alive)
+        if len(components) > 1:
+            if sum(self.upper_bound(adj, c) for c in components) <= lower:
+                return 0, 0
+            # Each component is solved exactly, the largest one last
+            size, taken = 0, 0
+            for component in sorted(components, key=popcount):
+                s, t = yield self.search(adj, component, -1)
+                size += s
+                taken |= t
+            return size, taken
+
+        if self.upper_bound(adj, alive) <= lower:
+            return 0, 0
+        values = None
+        if self.lp and popcount(alive) >= self.LP_MIN_NODES:
+            bound, values = self.lp_bound(adj, alive)
+            if bound <= lower:
+                return 0, 0
+        self.branches += 1
+        if values is None:
+            v = max(bits(alive), key=lambda i: popcount(adj[i] & alive))
+        else:
+            # The most fractional node of the relaxation (then of max degree)
+            v = max(
+                bits(alive),
+                key=lambda i: (-abs(values[i] - 0.5), popcount(adj[i] & alive)),
+            )
+        # Take v (and none of its neighbors)
+        size, taken = yield self.search(adj, alive & ~adj[v] & ~(1 << v), lower - 1)
+        best = (size + 1, taken | (1 << v))
+        # Leave v out
+        size, taken = yield self.search(adj, alive & ~(1 << v), max(lower, best[0]))
+        if size > best[0]:
+            best = (size, taken)
+        return best
+    def components(self, adj: List[int], alive: int) -> List[int]:
+        """The connected components of the nodes in `alive`, as masks."""
+        components = []
+        remaining = alive
+        while remaining:
+            component = frontier = remaining & -remaining
+            while frontier:
+                low = frontier & -frontier
+                frontier ^= low
+                new = adj[low.bit_length() - 1] & remaining & ~component
+                component |= new
+                frontier |= new
+            components.append(component)
+            remaining &= ~component
+        return components
+
+    def upper_bound(self, adj: List[int], alive: int) -> int:
+        """The number of cliques of a greedy clique cover of the nodes.
+
+        Each node of an independent set is in a different clique, so this is
+        an upper bound of the size of the independent sets.
+        """
+        cliques = 0
+        remaining = alive
+        while remaining:
+            low = remaining & -remaining
+            remaining ^= low
+            candidates = adj[low.bit_length() - 1] & remaining
+            while candidates:
+                low = candidates & -candidates
+                remaining ^= low
+                candidates &= adj[low.bit_length() - 1]
+            cliques += 1
+        return cliques
+
+    def lp_bound(
+        self, adj: List[int], alive: int
+    ) -> Tuple[int, Optional[Dict[int, float]]]:
+        """The linear relaxation of the clique formulation of the nodes.
+
+        The constraints are the cliques of the cover of the edges of the graph
+        (restricted to the nodes in `alive`), and greedy cliques covering the
+        edges of the nodes created by the folds. Returns the relaxation
+        rounded down, which is an upper bound of the size of the independent
+        sets, and the value of each node (None if HiGHS failed).
+        """
+        self.lps += 1
+        nodes = np.array(list(bits(alive)), dtype=np.int64)
+        original = nodes[nodes < len(self.adj)]
+        A = self.incidence[:, original]
+        A = A[np.asarray(A.sum(axis=1)).ravel() > 1]
+        A = hstack([A, csr_matrix((A.shape[0], len(nodes) - len(original)))])
+
+        index = {v: k for k, v in enumerate(nodes.tolist())}
+        rows, columns = [], []
+        num_rows = 0
+        for v in nodes[len(original) :].tolist():
+            uncovered = adj[v] & alive
+            while uncovered:
+                # A greedy clique with v and one of its uncovered edges
+                clique = 1 << v
+                candidates = adj[v] & alive
+                u = uncovered & -uncovered
+                while u:
+                    clique |= u
+                    candidates &= adj[u.bit_length() - 1]
+                    u = candidates & -candidates
+                for i in bits(clique):
+                    rows.append(num_rows)
+                    columns.append(index[i])
+                num_rows += 1
+                uncovered &= ~clique
+        folded = csr_matrix(
+            (np.ones(len(rows)), (rows, columns)), shape=(num_rows, len(nodes))
+        )
+        A = vstack([A, folded]).tocsr()
+        if A.shape[0] == 0:
+            return len(nodes), None
+        result = linprog(
+            -np.ones(len(nodes)),
+            A_ub=A,
+            b_ub=np.ones(A.shape[0]),
+            bounds=(0, 1),
+            method="highs",
+            options={"presolve": False},
+        )
+        if result.status != 0:
+            return len(nodes), None
+        return int(-result.fun + 1e-6), dict(zip(nodes.tolist(), result.x.tolist()))
+
+    def reduce(self, adj: List[int], alive: int):
+        """Apply the reductions until none applies.
+
+        Returns the adjacency (a copy, with new nodes, if something was
+        folded), the remaining nodes, the nodes taken, the number of nodes
+        gained by the folds, and the folds as (new node, the nodes it stands
+        for when taken, the nodes taken otherwise).
+        """
+        taken = 0
+        gain = 0
+        folds = []
+        copied = False
+        changed = True
+        while changed:
+            changed = False
+            for v in bits(alive):
+                if not alive >> v & 1:
+                    continue
+                neighbors = adj[v] & alive
+                degree = popcount(neighbors)
+                if degree <= 1:
+                    # Take v and drop its neighbor (if any)
+                    taken |= 1 << v
+                    alive &= ~(neighbors | (1 << v))
+                    changed = True
+                elif degree == 2:
+                    u, w = bits(neighbors)
+                    if adj[u] >> w & 1:
+                        # v is simplicial: take it
+                        taken |= 1 << v
+                        alive &= ~(neighbors | (1 << v))
+                    else:
+                        if not copied:
+                            adj, copied = list(adj), True
+                        alive = self.fold(adj, alive, neighbors, 1 << v, folds)
+                        gain += 1
+                    changed = True
+
+            # Domination: drop v if N[u] is contained in N[v] for a neighbor u
+            for v in bits(alive):
+                if not alive >> v & 1:
+                    continue
+                closed = (adj[v] & alive) | (1 << v)
+                for u in bits(adj[v] & alive):
+                    if ((adj[u] & alive) | (1 << u)) & ~closed == 0:
+                        alive &= ~(1 << v)
+                        changed = True
+                        break
+            if changed:
+                continue
+
+            # Twins: non-adjacent nodes of degree 3 with the same neighbors
+            seen = {}
+            for v in bits(alive):
+                neighbors = adj[v] & alive
+                if popcount(neighbors) != 3:
+                    continue
+                u = seen.setdefault(neighbors, v)
+                if u == v:
+                    continue
+                twins = (1 << u) | (1 << v)
+                if any(adj[i] & neighbors for i in bits(neighbors)):
+                    # The twins are in a maximum independent set
+                    taken |= twins
+                    alive &= ~(twins | neighbors)
+                else:
+                    if not copied:
+                        adj, copied = list(adj), True
+                    alive = self.fold(adj, alive & ~twins, neighbors, twins, folds)
+                    gain += 2
+                changed = True
+                break
+        return adj, alive, taken, gain, folds
+
+    def fold(
+        self, adj: List[int], alive: int, merged: int, alternative: int, folds: list
+    ) -> int:
+        """Replace the nodes of `merged` and `alternative` by a new node.
+
+        The new node is connected to the neighbors of the merged nodes. It is
+        in the set in place of `merged`, and otherwise `alternative` is.
+        Returns the remaining nodes (`adj` is extended in place).
+        """
+        self.folds += 1
+        alive &= ~(merged | alternative)
+        neighbors = 0
+        for i in bits(merged):
+            neighbors |= adj[i]
+        neighbors &= alive
+        node = len(adj)
+        adj.append(neighbors)
+        for i in bits(neighbors):
+            adj[i] |= 1 << node
+        folds.append((node, merged, alternative))
+        return alive | (1 << node)
+
+
+def solve(nn: List[List[int]]) -> Tuple[int, List[int]]:
+    """Maximum independent set of a graph given by its adjacency lists.
+
+    Args:
+      nn (list): adjacency list of each node
+
+    Returns:
+      (best, nodes): the mis size and the (sorted) nodes of one such set
+    """
+    size, taken = BranchAndReduce(bitset_adjacency(nn)).solve()
+    return size, list(bits(taken))
+
+
+def solve_instance(instance: Instance) -> Tuple[int, List[int]]:
+    """Maximum independent set of an instance (see `solve`)."""
+    return solve(instance.adjacency())
+
+
+def main(argv):
+    # Usage: python branch_reduce.py some_instance.json
+    from solver import load_binary, load_json
+
+    parser = argparse.ArgumentParser(
+        prog="branch_reduce.py",
+        description="Solve unweighted MIS instances exactly by branch and reduce",
+    )
+    parser.add_argument(
+        "instance",
+        type=str,
+        help="The instance in json or binary (.bin) format, or an archive shard (.mis)",
+    )
+    parser.add_argument(
+        "-s", "--seed", type=int, help="The seed of the instance in an archive shard"
+    )
+    args = parser.parse_args(argv[1:])
+    if args.instance.endswith(".mis"):
+        _, nn = load_binary(args.instance, args.seed)
+    elif args.instance.endswith(".bin"):
+        _, nn = load_binary(args.instance)
+    else:
+        assert args.instance[-5:] == ".json"
+        _, nn = load_json(args.instance)
+
+    solver = BranchAndReduce(bitset_adjacency(nn))
+    best, taken = solver.solve()
+
+    print("file:", args.instance)
+    if args.seed is not None:
+        print("seed:", args.seed)
+    print(f"|mis|={best}")
+    print(f"branches={solver.branches}")
+    print(f"folds={solver.folds}")
+    print(f"lps={solver.lps}")
+    print("\nsolution:")
+    print(list(bits(taken)))
+    print()
+    print("NOTE: Node indices are 0-indexed!")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
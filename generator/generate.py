@@ -10,9 +10,51 @@ __email__ = "randrist@amazon.com"
 
 import argparse
 import os
+import shutil
 import sys
+import tempfile
+from functools import partial
+from typing import List, Optional, Sequence, Tuple
 
+from archive import Archive, record
 from generator import Generator
+from instance import Instance
+from ordering import ORDERINGS, reorder
+from utils import parse_seeds
+
+# The output formats, in the order in which they are written
+FORMATS = [
+    "svg",
+    "cplex",
+    "metis",
+    "json",
+    "pickle",
+    "edgelist",
+    "npz",
+    "npy",
+    "bits",
+    "binary",
+    "cliques",
+]
+# The formats written with --all (the dense pickle and the clique cover, which
+# only exists for unit disk graphs, need to be selected)
+ALL = [f for f in FORMATS if f not in ["pickle", "cliques"]]
+# The formats which need the coordinates of the nodes (which ER graphs lack)
+GEOMETRIC = ["svg", "cliques"]
+# The file extension of each format
+EXTENSIONS = {
+    "svg": ".svg",
+    "cplex": ".lp",
+    "metis": ".txt",
+    "json": ".json",
+    "pickle": ".pkl",
+    "edgelist": ".edgelist",
+    "npz": ".npz",
+    "npy": ".npy",
+    "bits": ".bits.npy",
+    "binary": ".bin",
+    "cliques": ".cliques.lp",
+}
 
 
 def main():
@@ -36,6 +78,18 @@ def main():
         required=False,
         help="The specific seed to generate (uses a random one if not specified)",
     )
+    parser.add_argument(
+        "--seeds",
+        type=str,
+        required=False,
+        help="Generate many seeds, given as a range start:stop or a list a,b,c",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes used with --seeds (default = 1)",
+    )
     parser.add_argument(
         "-r",
         "--radius",
@@ -51,11 +105,76 @@ def main():
         help="Folder where the files should be stored (default: instances/L{L})",
     )
 
+    add_format_arguments(parser)
+
+    parser.add_argument(
+        "-o",
+        "--order",
+        choices=list(ORDERINGS) + ["best"],
+        help="Relabel the nodes in this order before writing (see ordering.py)",
+    )
+
+    parser.add_argument(
+        "--archive",
+        action="store_true",
+        help="Append the instances to sharded archives in the folder (see archive.py)",
+    )
+
+    parser.add_argument(
+        "-n", "--dry", action="store_true", help="don't generate any files"
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="show an ascii rendering on screen.",
+    )
+
+    args = parser.parse_args()
+    if args.archive and (args.all or any(getattr(args, f) for f in FORMATS)):
+        parser.error("--archive writes binary records, no other format")
+    formats = selected_formats(args)
+
+    generator = Generator(L=args.L, density=args.density, r=args.radius)
+
+    if args.archive and not args.dry:
+        seeds = [args.seed] if args.seeds is None else parse_seeds(args.seeds)
+        folder = args.folder.format(L=args.L, d=args.density, s="", r=args.radius)
+        archive = Archive(folder, args.L, args.density, args.radius, order=args.order)
+        process = partial(archive_record, args.order)
+        count = archive.extend(
+            generator.generate_many(seeds, workers=args.jobs, process=process)
+        )
+        print(f"appended {count} instances to the archive in {folder}")
+        sys.exit(0)
+
+    if args.seeds is not None:
+        process = None
+        if not args.dry:
+            process = partial(
+                write_instance, args.folder, args.radius, formats, args.order
+            )
+        for _ in generator.generate_many(
+            parse_seeds(args.seeds), workers=args.jobs, process=process
+        ):
+            pass
+        sys.exit(0)
+
+    instance = generator.generate(seed=args.seed, verbose=args.verbose or args.dry)
+
+    if args.dry:
+        sys.exit(0)
+
+    write_instance(args.folder, args.radius, formats, args.order, instance)
+
+
+def add_format_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the flags selecting the output formats to a parser."""
     parser.add_argument(
         "-a",
         "--all",
         action="store_true",
-        help="Generate all output formats (assumed if none selected).",
+        help="Generate all output formats except -p and -q (assumed if none selected).",
     )
 
     parser.add_argument(
@@ -77,73 +196,160 @@ def main():
         "-p",
         "--pickle",
         action="store_true",
-        help="Adjacency matrix in pickled format.",
+        help="Dense adjacency matrix in pickled format (legacy, only if selected).",
+    )
+    parser.add_argument(
+        "-z",
+        "--npz",
+        action="store_true",
+        help="Sparse adjacency matrix in scipy CSR format.",
+    )
+    parser.add_argument(
+        "-y", "--npy", action="store_true", help="Edge array (E,2) in numpy format."
+    )
+    parser.add_argument(
+        "-b",
+        "--bits",
+        action="store_true",
+        help="Adjacency matrix packed to one bit per entry, in numpy format.",
     )
     parser.add_argument(
         "-e", "--edgelist", action="store_true", help="Edgelist in txt file: x0, x1"
     )
-
     parser.add_argument(
-        "-n", "--dry", action="store_true", help="don't generate any files"
+        "-x",
+        "--binary",
+        action="store_true",
+        help="Coordinates and CSR adjacency in a memory mappable binary file.",
     )
     parser.add_argument(
-        "-v",
-        "--verbose",
+        "-q",
+        "--cliques",
         action="store_true",
-        help="show an ascii rendering on screen.",
+        help="A cplex lp formulation with one constraint per clique of a clique cover.",
     )
 
-    args = parser.parse_args()
-    if not (
-        args.json
-        or args.metis
-        or args.svg
-        or args.cplex
-        or args.pickle
-        or args.edgelist
-    ):
+
+def selected_formats(
+    args: argparse.Namespace,
+    default: Optional[List[str]] = None,
+    unsupported: Sequence[str] = (),
+) -> List[str]:
+    """The output formats selected by the flags (see add_format_arguments).
+
+    If no format is selected, `default` is returned (all formats if None).
+    The `unsupported` formats (e.g., those which need the coordinates of the
+    nodes) are left out of --all, and raise ValueError if selected.
+    """
+    selected = [f for f in unsupported if getattr(args, f)]
+    if selected:
+        raise ValueError(f"The formats {selected} are not supported for these graphs")
+    if not args.all and not any(getattr(args, f) for f in FORMATS):
+        if default is not None:
+            return list(default)
         args.all = True
+    return [
+        f
+        for f in FORMATS
+        if getattr(args, f) or (args.all and f in ALL and f not in unsupported)
+    ]
 
-    instance = Generator(L=args.L, density=args.density, r=args.radius).generate(
-        seed=args.seed, verbose=args.verbose or args.dry
-    )
 
-    if args.dry:
-        sys.exit(0)
+def archive_record(order: Optional[str], instance: Instance) -> Tuple[int, bytes]:
+    """The record of an instance for an archive (see archive.record).
+
+    If `order` is given, the nodes are first relabelled in that order.
+    """
+    if order is not None:
+        instance = reorder(instance, order)
+    return record(instance)
+
 
-    folder = args.folder.format(L=args.L, d=args.density, s=args.seed, r=args.radius)
-    if not os.path.isdir(folder):
-        os.makedirs(folder)
-    path = os.path.join(folder, instance.name())
+def write_instance(
+    folder: str,
+    radius: float,
+    formats: List[str],
+    order: Optional[str],
+    instance: Instance,
+    suffix: str = "",
+) -> None:
+    """Write an instance to `folder` in each of the requested formats.
 
-    if args.all or args.svg:
-        with open(f"{path}.svg", "w") as fh:
+    If `order` is given, the nodes are first relabelled in that order. The
+    files are named after the instance, followed by `suffix`. They are written
+    to a temporary folder and only moved in place once all of them are
+    complete, so a failure never leaves partial files behind.
+    """
+    if order is not None:
+        instance = reorder(instance, order)
+    folder = folder.format(L=instance.L, d=instance.density, s=instance.seed, r=radius)
+    os.makedirs(folder, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=folder)
+    try:
+        _write_formats(
+            os.path.join(tmp, instance.name() + suffix),
+            os.path.join(folder, instance.name() + suffix),
+            formats,
+            instance,
+        )
+        for name in os.listdir(tmp):
+            os.replace(os.path.join(tmp, name), os.path.join(folder, name))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _write_formats(temp: str, path: str, formats: List[str], instance: Instance):
+    """Write the files of `write_instance` at `temp` (`path` is their name)."""
+
+    if "svg" in formats:
+        with open(f"{temp}.svg", "w") as fh:
             print(f"writing {path}.svg (rendering)")
-            fh.write(instance.svg())
+            instance.write_svg(fh)
 
-    if args.all or args.cplex:
-        with open(f"{path}.lp", "w") as fh:
+    if "cplex" in formats:
+        with open(f"{temp}.lp", "w") as fh:
             print(f"writing {path}.lp (cplex format)")
-            fh.write(instance.cplex())
+            instance.write_cplex(fh)
+
+    if "cliques" in formats:
+        with open(f"{temp}.cliques.lp", "w") as fh:
+            print(f"writing {path}.cliques.lp (cplex format, clique constraints)")
+            instance.write_cplex(fh, cliques=True)
 
-    if args.all or args.metis:
-        with open(f"{path}.txt", "w") as fh:
+    if "metis" in formats:
+        with open(f"{temp}.txt", "w") as fh:
             print(f"writing {path}.txt (metis format)")
-            fh.write(instance.metis())
+            instance.write_metis(fh)
 
-    if args.all or args.json:
-        with open(f"{path}.json", "w") as fh:
+    if "json" in formats:
+        with open(f"{temp}.json", "w") as fh:
             print(f"writing {path}.json (json edge list)")
-            fh.write(instance.json())
+            instance.write_json(fh)
 
-    if args.all or args.pickle:
+    if "pickle" in formats:
         print(f"writing {path}.pkl (pickled adj-matrix)")
-        instance.pickle(f"{path}.pkl")
+        instance.pickle(f"{temp}.pkl")
+
+    if "npz" in formats:
+        print(f"writing {path}.npz (sparse adj-matrix)")
+        instance.npz(f"{temp}.npz")
+
+    if "npy" in formats:
+        print(f"writing {path}.npy (edge array)")
+        instance.npy(f"{temp}.npy")
+
+    if "bits" in formats:
+        print(f"writing {path}.bits.npy (packed adj-matrix)")
+        instance.bits(f"{temp}.bits.npy")
+
+    if "binary" in formats:
+        print(f"writing {path}.bin (binary container)")
+        instance.binary(f"{temp}.bin")
 
-    if args.all or args.edgelist:
-        with open(f"{path}.edgelist", "w") as fh:
+    if "edgelist" in formats:
+        with open(f"{temp}.edgelist", "w") as fh:
             print(f"writing {path}.edgelist (txt edge list)")
-            fh.write(instance.edgelist())
+            instance.write_edgelist(fh)
 
 
 if __name__ == "__main__":
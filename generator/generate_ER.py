@@ -2,15 +2,106 @@
 # // SPDX-License-Identifier: Apache-2.0
 # // Copyright 2023: Amazon Web Services, Inc
 ###############################################################################
-from networkx import erdos_renyi_graph
 import numpy as np
+from generate import GEOMETRIC, add_format_arguments, selected_formats, write_instance
+from generator import Generator
 from instance import Instance
+from utils import parse_seeds
+from functools import partial
+from typing import Iterator
 import argparse
+import multiprocessing
 import random
 import os
 
+# The ways to sample the edges of G(n,p):
+#  - "networkx": the same graphs as networkx.erdos_renyi_graph for a given seed
+#  - "fast": geometric skips between edges, O(N + E) instead of O(N^2)
+METHODS = ["networkx", "fast"]
 
-def generate_ER_graph(L: int, density: float, seed: int):
+
+def pair_edges(index: np.ndarray, N: int) -> np.ndarray:
+    """
+    Map indices of the pairs (u, v), u < v, enumerated in lexicographic order
+    (as itertools.combinations(range(N), 2)) to an (E,2) edge array
+    """
+    # the pairs starting with u begin at index u * (N - 1) - u * (u - 1) / 2
+    u = np.arange(N, dtype=np.int64)
+    starts = u * (N - 1) - u * (u - 1) // 2
+    rows = np.searchsorted(starts, index, side="right") - 1
+    cols = index - starts[rows] + rows + 1
+    return np.stack([rows, cols], axis=1).astype(np.int32)
+
+
+def gnp_edges_networkx(N: int, p: float, random_state: np.random.RandomState):
+    """
+    The edges of networkx.erdos_renyi_graph(N, p, seed=random_state), without
+    building the graph: networkx draws one number per pair (in lexicographic
+    order) and keeps the pair if it is below p, we draw them in chunks.
+    """
+    if p <= 0 or N < 2:
+        return np.empty((0, 2), dtype=np.int32)
+    num_pairs = N * (N - 1) // 2
+    if p >= 1:
+        return pair_edges(np.arange(num_pairs), N)
+    chunk = 1 << 20
+    index = []
+    for start in range(0, num_pairs, chunk):
+        draws = random_state.random_sample(min(chunk, num_pairs - start))
+        index.append(start + np.flatnonzero(draws < p))
+    return pair_edges(np.concatenate(index), N)
+
+
+def gnp_edges_fast(N: int, p: float, rng: np.random.Generator):
+    """
+    The edges of a G(N, p) random graph sampled with geometric skips: the gap
+    between two consecutive edges (in the lexicographic order of the pairs)
+    is geometrically distributed, so only O(E) random numbers are drawn.
+    """
+    num_pairs = N * (N - 1) // 2
+    if p <= 0 or num_pairs == 0:
+        return np.empty((0, 2), dtype=np.int32)
+    if p >= 1:
+        return pair_edges(np.arange(num_pairs), N)
+    index = []
+    last = -1
+    # draw a few standard deviations more skips than the expected number of
+    # edges, so that a single batch is almost always enough
+    batch = int(num_pairs * p + 5 * (num_pairs * p) ** 0.5) + 16
+    while last < num_pairs:
+        positions = last + np.cumsum(rng.geometric(p, size=batch))
+        index.append(positions[positions < num_pairs])
+        last = positions[-1]
+    return pair_edges(np.concatenate(index), N)
+
+
+def gnm_edges(N: int, num_edges: int, rng: np.random.Generator):
+    """
+    The edges of a G(N, m) random graph, i.e., `num_edges` distinct pairs
+    drawn uniformly at random (sorted lexicographically)
+    """
+    num_pairs = N * (N - 1) // 2
+    if num_edges > num_pairs:
+        raise ValueError(f"Cannot draw {num_edges} edges between {N} nodes")
+    index = np.sort(rng.choice(num_pairs, size=num_edges, replace=False))
+    return pair_edges(index, N)
+
+
+def generate_ER_graph(
+    L: int,
+    density: float,
+    seed: int,
+    method: str = "networkx",
+    num_edges: int = None,
+):
+    """
+    Generate an Erdos-Renyi graph with round(L * L * density) nodes
+
+    Args:
+        method (str): how to sample G(n,p) graphs (see METHODS)
+        num_edges (int): if given, sample a G(n,m) graph with exactly that
+            many edges instead (e.g., to match a UDG, see `udg_num_edges`)
+    """
     if seed is None:
         seed = random.randrange(100000)
     N = np.round(L * L * density).astype(int)
@@ -19,24 +110,72 @@ def generate_ER_graph(L: int, density: float, seed: int):
     )  # p set to match in expectation the number of edges of the original graph
     # set a radius even though is does not make sense for ER graphs, would need to refactor Instance
     instance = Instance(L=L, density=density, seed=seed, r=2 ** 0.5, version="0.2")
-    random_state = np.random.RandomState(seed)
-    graph = erdos_renyi_graph(n=N, p=p, seed=random_state)
-    instance.add_networkx_graph(graph)
+    if num_edges is not None:
+        edges = gnm_edges(N, num_edges, np.random.default_rng(seed))
+    elif method == "networkx":
+        edges = gnp_edges_networkx(N, p, np.random.RandomState(seed))
+    elif method == "fast":
+        edges = gnp_edges_fast(N, p, np.random.default_rng(seed))
+    else:
+        raise ValueError(f"Unknown method {method}, expected one of {METHODS}")
+    instance.set_edges(edges)
+    for node in range(N):
+        instance.add_node(node)
     return instance
 
 
-def save_lp_ER_graph(L, density, seed):
-    instance = generate_ER_graph(L, density, seed)
-    path = os.path.join("instances", f"L{L}", "ER", instance.name())
-    with open(f"{path}.lp", "w") as fh:
-        print(f"writing {path}.lp (cplex format)")
-        fh.write(instance.cplex())
+def udg_num_edges(L: int, density: float, seed: int, r: float) -> int:
+    """The number of edges of the UDG instance generated for the same parameters"""
+    return Generator(L=L, density=density, r=r).generate(seed=seed).num_edges()
+
+
+def save_ER_graph(folder, formats, order, L, density, method, match, seed) -> int:
+    """
+    Generate the ER graph of a seed and write it in each of the requested
+    formats (see generate.write_instance), this runs within a worker process
+    match (float): radius of the UDG instance whose edge count to match (optional)
+    """
+    num_edges = None
+    if match is not None:
+        num_edges = udg_num_edges(L, density, seed, match)
+    instance = generate_ER_graph(L, density, seed, method, num_edges)
+    write_instance(folder, 2 ** 0.5, formats, order, instance)
+    return instance.seed
+
+
+def save_ER_graphs(
+    seeds,
+    folder,
+    formats,
+    order=None,
+    L=21,
+    density=0.8,
+    method="networkx",
+    match=None,
+    workers=1,
+) -> Iterator[int]:
+    """
+    Generate and write the ER graphs of many seeds (see `save_ER_graph`) with
+    up to `workers` processes, each graph only depends on its seed
+    """
+    save = partial(save_ER_graph, folder, formats, order, L, density, method, match)
+    if workers <= 1:
+        yield from map(save, seeds)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap(save, seeds, chunksize=4)
+
+
+def save_lp_ER_graph(L, density, seed, method="networkx", num_edges=None):
+    instance = generate_ER_graph(L, density, seed, method, num_edges)
+    folder = os.path.join("instances", "L{L}", "ER")
+    write_instance(folder, 2 ** 0.5, ["cplex"], None, instance)
 
 
 def main():
     parser = argparse.ArgumentParser(
         prog="generate_ER.py",
-        description="Generate lp of ER graph instances",
+        description="Generate Erdos-Renyi graph instances",
     )
 
     parser.add_argument("-L", type=int, required=True, help="The size of the lattice")
@@ -54,17 +193,66 @@ def main():
         type=int,
         required=False,
         default=0,
-        help="The specific seed to generate (uses a random one if not specified)",
+        help="The specific seed to generate (default = 0)",
+    )
+    parser.add_argument(
+        "--seeds",
+        type=str,
+        required=False,
+        help="Generate many seeds, given as a range start:stop or a list a,b,c",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes used with --seeds (default = 1)",
     )
     parser.add_argument(
-        "-c",
-        "--cplex",
-        action="store_true",
-        help="A cplex lp formulation of the instance.",
+        "-f",
+        "--folder",
+        type=str,
+        default=os.path.join("instances", "L{L}", "ER"),
+        help="Folder where the files should be stored (default: instances/L{L}/ER)",
+    )
+    add_format_arguments(parser)
+    parser.add_argument(
+        "-o",
+        "--order",
+        choices=["cm", "rcm", "best"],
+        help="Relabel the nodes in this order before writing (see ordering.py)",
+    )
+    parser.add_argument(
+        "--method",
+        choices=METHODS,
+        default="networkx",
+        help="networkx: same graphs as networkx for each seed, fast: geometric skips",
+    )
+    parser.add_argument(
+        "--match",
+        type=float,
+        metavar="R",
+        help="Draw exactly as many edges as the UDG instance of radius R, G(n,m)",
     )
     args = parser.parse_args()
+    try:
+        # the nodes of ER graphs have no coordinates
+        formats = selected_formats(args, default=["cplex"], unsupported=GEOMETRIC)
+    except ValueError as error:
+        parser.error(str(error))
 
-    save_lp_ER_graph(L=args.L, density=args.density, seed=args.seed)
+    seeds = [args.seed] if args.seeds is None else parse_seeds(args.seeds)
+    for _ in save_ER_graphs(
+        seeds,
+        args.folder,
+        formats,
+        order=args.order,
+        L=args.L,
+        density=args.density,
+        method=args.method,
+        match=args.match,
+        workers=args.jobs,
+    ):
+        pass
 
 
 if __name__ == "__main__":
@@ -2,83 +2,233 @@
 # // SPDX-License-Identifier: Apache-2.0
 # // Copyright 2023: Amazon Web Services, Inc
 ###############################################################################
+import argparse
 import random
 import os
+from functools import partial
+
+import numpy as np
 
 from instance import Instance
 from generator import Generator
+from generate import add_format_arguments, selected_formats, write_instance
+from utils import parse_seeds
+
 
+class Rewirer:
+    """
+    Incrementally rewires the edges of a graph, each rewire costs O(1) on average.
 
-def rewire_edges_from_graph(G, num_edges_to_rewire, list_edges):
+    The edges which have not been touched yet are kept in a list from which a
+    random one is removed by swapping it with the last entry, and the adjacency
+    is kept as sets so that the new endpoint of an edge can be drawn by
+    rejection sampling (we draw nodes until we find one which is not connected).
     """
-    G: networkx graph,
-    num_edges_to_rewire: number of edges in graph G to rewire
-    list_edges (list): list of the edges to pick randomly to rewire
+
+    def __init__(self, nodes, edges, rng=None):
+        """
+        nodes (list): the node ids of the graph
+        edges (list): the edges (u, v) of the graph
+        rng (random.Random): random number generator (optional, unseeded by default)
+        """
+        self.nodes = list(nodes)
+        self.rng = rng if rng is not None else random.Random()
+        self.adj = {node: set() for node in self.nodes}
+        for u, v in edges:
+            self.adj[u].add(v)
+            self.adj[v].add(u)
+        self.untouched = [tuple(e) for e in edges]
+
+    def rewire_edge(self, rng=None):
+        """
+        Rewire a random edge (u, v) which has not been touched yet into an edge
+        (u, w), where w is a random node that is not u, v or connected to u.
+        rng (random.Random): random number generator (default: the one of the rewirer)
+        """
+        rng = rng if rng is not None else self.rng
+        if not self.untouched:
+            raise ValueError("All the edges have already been rewired")
+        i = rng.randrange(len(self.untouched))
+        u, v = self.untouched[i]
+        # Checked before changing anything, so the graph is left as it was
+        if len(self.adj[u]) + 1 >= len(self.nodes):
+            raise ValueError(f"Node {u} is already connected to all other nodes")
+        self.untouched[i] = self.untouched[-1]
+        self.untouched.pop()
+
+        self.adj[u].discard(v)
+        self.adj[v].discard(u)
+        # We select a new node to connect that is not u, v or any node already
+        # connected to u. Rejection sampling draws uniformly from those nodes.
+        while True:
+            w = self.nodes[rng.randrange(len(self.nodes))]
+            if w != u and w != v and w not in self.adj[u]:
+                break
+        self.adj[u].add(w)
+        self.adj[w].add(u)
+
+    def rewire(self, num_edges_to_rewire, rng=None):
+        """
+        Rewire `num_edges_to_rewire` edges which have not been touched yet.
+        rng (random.Random): random number generator (default: the one of the rewirer)
+        """
+        for _ in range(num_edges_to_rewire):
+            self.rewire_edge(rng)
+
+    def edges(self):
+        """
+        The current edges of the graph as an (E,2) array, with u < v
+        """
+        edges = [(u, v) for u in self.nodes for v in self.adj[u] if u < v]
+        edges.sort()
+        return np.array(edges, dtype=np.int32).reshape(-1, 2)
+
+
+def step_rng(seed, step):
     """
+    The random number generator used for one step of the rewiring of an instance.
 
-    for _ in range(num_edges_to_rewire):
-        u, v = random.choice(list_edges)
-        G.remove_edge(u, v)
-        edges_from_u = [v for u, v in G.edges(u)]  # nodes connected to u
-        new_node = random.choice(
-            [
-                node
-                for node in list(G.nodes())
-                if (node not in [u, v]) and (node not in edges_from_u)
-            ]
-        )  # we select a new node to connect that is not u, v or any node already connected to u
-        G.add_edge(u, new_node)
-        list_edges = [
-            (node1, node2) for (node1, node2) in list_edges if (node1, node2) != (u, v)
-        ]  # update the list of edges that we have not touched yet
-    return G
-
-
-def write_rewired_instance(folder, p, an_instance):
+    Each (seed, step) pair gets its own stream, derived with numpy's SeedSequence,
+    so a rewired instance only depends on its seed and step, and not on the
+    order in which the seeds are processed or on the number of workers.
     """
-    Args:
-        folder (str): folder to save the lp file
-        p = the fraction of edges to rewire.
+    state = np.random.SeedSequence([seed, step]).generate_state(2)
+    return random.Random(int(state[0]) << 32 | int(state[1]))
 
+
+def rewired_instances(instance, r, num_points=20):
+    """
+    Incrementally rewire the edges of an instance in `num_points` steps, each
+    rewiring 1/num_points of the original edges (with the rng of `step_rng`).
+    Yields the instance after each step, the nodes keep their coordinates.
+    r (float): the radius the instance was generated with
     """
-    if not os.path.isdir(folder):
-        os.makedirs(folder)
+    rewirer = Rewirer(instance.nodes, instance.edge_array().tolist())
+    edges_per_step = int(instance.num_edges() / num_points)
+    for step in range(num_points):
+        rewirer.rewire(edges_per_step, rng=step_rng(instance.seed, step))
+        an_instance = Instance(
+            L=instance.L,
+            density=instance.density,
+            r=r,
+            seed=instance.seed,
+            version="0.2",
+        )
+        for node in instance.nodes:
+            an_instance.add_node(node, **instance.nodes[node])
+        an_instance.set_edges(rewirer.edges())
+        yield an_instance
 
-    path = os.path.join(folder, an_instance.name() + f"_rewired{p}")
-    with open(f"{path}.lp", "w") as fh:
-        print(f"writing {path}.lp (cplex format)")
-        fh.write(an_instance.cplex())
 
+def write_rewired_instances(folder, radius, formats, order, num_points, instance):
+    """
+    Rewire an instance and write each of its steps (see generate.write_instance)
+    folder (str): folder to save the files, can use {L}, {d}, {s} and {r}
+    radius (float): the radius the instance was generated with
+    formats (list): the output formats (see generate.FORMATS)
+    order (str): relabel the nodes in this order before writing (optional)
+    num_points (int): number of rewiring steps
+    """
+    print(f"seed {instance.seed}: rewiring in {num_points} steps")
+    for step, an_instance in enumerate(rewired_instances(instance, radius, num_points)):
+        write_instance(
+            folder, radius, formats, order, an_instance, suffix=f"_rewired{step}"
+        )
+    return instance.seed
 
-def generate_rewired_graph(L, density, r, seed):
+
+def generate_rewired_graph(
+    L,
+    density,
+    r,
+    seed,
+    num_points=20,
+    folder=os.path.join("instances", "L{L}", "rewired"),
+    formats=("cplex",),
+    order=None,
+):
     """
-    Save lp of rewired graphs
-    seed is here overloaded, we do not separate generator seed and rewiring seed
+    Save the rewired graphs of one seed (by default as lp files)
+    seed is here overloaded, the rewiring streams are derived from the generator seed
     """
-    num_points = 20
     instance = Generator(L=L, density=density, r=r).generate(seed=seed)
-    G = instance.to_networkx_graph()
-    list_edges = list(G.edges())
-    initial_num_edges = len(list_edges)
-    remove_fraction_per_step = 1 / num_points  # we go each 5% of the edges
-    edges_remove = int(initial_num_edges * remove_fraction_per_step)
-    for num in range(num_points):
-        print(f"seed {seed} and num_edges {edges_remove}")
-        G = rewire_edges_from_graph(G, edges_remove, list_edges)
-        list_edges = list(
-            set(list_edges) & set(list(G.edges()))
-        )  # these are the ones that we have not touched yet
-        # num_edges_rewired = initial_num_edges-len(list_edges)
-        an_instance = Instance(L=L, density=density, r=r, seed=seed, version="0.2")
-        an_instance.add_networkx_graph(G)
-        folder = os.path.join("instances", f"L{L}", "rewired")
-        write_rewired_instance(folder, num, an_instance)
+    write_rewired_instances(folder, r, list(formats), order, num_points, instance)
 
 
 def main():
-    num_seeds = 20
-    for seed in range(num_seeds):
-        generate_rewired_graph(L=21, density=0.8, r=2 ** 0.5, seed=seed)
+    parser = argparse.ArgumentParser(
+        prog="generate_rewired_graph.py",
+        description="Generate graphs rewired from union-jack UDGs towards ER graphs",
+    )
+    parser.add_argument(
+        "-L", type=int, default=21, help="The size of the lattice (default = 21)"
+    )
+    parser.add_argument(
+        "-d",
+        "--density",
+        type=float,
+        default=0.8,
+        help="Portion of the sites that are occupied (default = 0.8)",
+    )
+    parser.add_argument(
+        "-r",
+        "--radius",
+        default=2 ** 0.5,
+        type=float,
+        help="Radius of interaction. (default sqrt(2), i.e Union-Jack grid)",
+    )
+    parser.add_argument(
+        "--num_points",
+        type=int,
+        default=20,
+        help="Number of rewiring steps, each rewires 1/num_points of the edges",
+    )
+    parser.add_argument(
+        "--seeds",
+        type=str,
+        default="0:20",
+        help="The seeds, given as a range start:stop or a list a,b,c (default 0:20)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes (default = 1)",
+    )
+    parser.add_argument(
+        "-f",
+        "--folder",
+        type=str,
+        default=os.path.join("instances", "L{L}", "rewired"),
+        help="Folder where the files should be stored (default: instances/L{L}/rewired)",
+    )
+    add_format_arguments(parser)
+    parser.add_argument(
+        "-o",
+        "--order",
+        choices=["cm", "rcm", "best"],
+        help="Relabel the nodes in this order before writing (see ordering.py)",
+    )
+    args = parser.parse_args()
+    try:
+        # the rewired graphs are not unit disk graphs, they have no clique cover
+        formats = selected_formats(args, default=["cplex"], unsupported=["cliques"])
+    except ValueError as error:
+        parser.error(str(error))
+
+    generator = Generator(L=args.L, density=args.density, r=args.radius)
+    process = partial(
+        write_rewired_instances,
+        args.folder,
+        args.radius,
+        formats,
+        args.order,
+        args.num_points,
+    )
+    for _ in generator.generate_many(
+        parse_seeds(args.seeds), workers=args.jobs, process=process
+    ):
+        pass
 
 
 if __name__ == "__main__":
@@ -9,11 +9,28 @@ __email__ = "randrist@amazon.com"
 __version__ = "0.2"
 
 import random
-import math
+import multiprocessing
+import numpy as np
+from collections import deque
+from functools import lru_cache, partial
 from instance import Instance
-from typing import Optional, List
+from typing import Any, Callable, Iterable, Iterator, Optional, List, Tuple
 
-from utils import format_radius
+from utils import directions_within, format_radius
+
+
+@lru_cache(maxsize=None)
+def disk_adjacency(directions: Tuple[Tuple[int, int], ...]) -> Tuple[int, ...]:
+    """Bit masks of the adjacency among the sites at `directions` (cached)."""
+    offsets = set(directions)
+    adjacency = []
+    for x, y in directions:
+        mask = 0
+        for k, (u, v) in enumerate(directions):
+            if (u - x, v - y) in offsets:
+                mask |= 1 << k
+        adjacency.append(mask)
+    return tuple(adjacency)
 
 
 class Generator:
@@ -43,20 +60,29 @@ class Generator:
         self.density = density
         self.r = format_radius(r)
         self.directions = self.generate_all_directions(r)
+        self.disk_adjacency = self.generate_disk_adjacency(self.directions)
         self.seed = None
         self.rng = None
 
     @staticmethod
     def generate_all_directions(r):
         """
-        Generate directions to grid points with the disk of radius r using brute force
+        Directions to grid points within the disk of radius r, ordered by x then y
+
+        These are a prefix of the table of lattice offsets sorted by distance
+        (see utils.directions_within, which caches them for each radius).
+        """
+        return list(directions_within(r))
+
+    @staticmethod
+    def generate_disk_adjacency(directions):
+        """
+        Generate the adjacency among the sites of the disk around a node.
+
+        Entry k is a bit mask of the directions whose sites are connected to
+        the site at directions[k]. This is cached for each set of directions.
         """
-        directions = []
-        for x in range(-math.floor(r), math.floor(r) + 1):
-            for y in range(-math.floor(r), math.floor(r) + 1):
-                if 0 < x ** 2 + y ** 2 <= r ** 2:
-                    directions.append((x, y))
-        return directions
+        return list(disk_adjacency(tuple(directions)))
 
     def generate(self, seed: Optional[int] = None, verbose: bool = False) -> Instance:
         """Generate an MIS instance on a Union Jack Lattice.
@@ -80,9 +106,9 @@ class Generator:
         self.rng = random.Random(seed)
 
         # Generate the lattice representation
-        grid = self.generate_grid()
+        occupied = self.generate_occupancy()
         if verbose:
-            self.print_ascii(grid)
+            self.print_ascii(self.occupancy_to_grid(occupied))
 
         # Build the instance
         instance = Instance(
@@ -93,22 +119,89 @@ class Generator:
             version=__version__,
         )
 
-        # Populate the edges in the instance from the grid
-        for x in range(self.L):
-            for y in range(self.L):
-                if grid[x][y] is None:
-                    continue
-                center = grid[x][y]
-                instance.add_node(id_nb=center, x=x, y=y)
-                for delta_x, delta_y in self.directions:
-                    x_bis = x + delta_x
-                    y_bis = y + delta_y
-                    if 0 <= x_bis < self.L and 0 <= y_bis < self.L:
-                        next_neighbour = grid[x_bis][y_bis]
-                        if next_neighbour is not None:
-                            instance.add_edge(next_neighbour, center)
+        # Populate the nodes and edges in the instance from the lattice
+        # (node ids are assigned column by column, as in the grid)
+        for id_nb, (x, y) in enumerate(zip(*np.nonzero(occupied))):
+            instance.add_node(id_nb=id_nb, x=int(x), y=int(y))
+        instance.set_edges(self.generate_edges(occupied))
         return instance
 
+    def generate_many(
+        self,
+        seeds: Iterable[int],
+        workers: int = 1,
+        process: Optional[Callable[[Instance], Any]] = None,
+    ) -> Iterator[Any]:
+        """Generate the MIS instances for many seeds.
+
+        Each instance only depends on its seed, so the results are the same
+        regardless of the number of workers, and they are returned in the
+        order of `seeds`.
+
+        Args:
+          seeds (iterable of int): Seeds for the random number generator
+          workers (int): Number of worker processes (default: 1, no pool)
+          process (callable): Applied to each instance within the worker,
+            e.g. to write it to disk (optional, must be picklable)
+
+        Returns:
+          Iterator over the instances (or the results of `process` on them)
+        """
+        generate = partial(self.generate_and_process, process)
+        if workers <= 1:
+            yield from map(generate, seeds)
+            return
+        with multiprocessing.Pool(workers) as pool:
+            yield from pool.imap(generate, seeds, chunksize=4)
+
+    def generate_and_process(
+        self, process: Optional[Callable[[Instance], Any]], seed: int
+    ) -> Any:
+        """Generate the instance for a seed and apply `process` to it."""
+        instance = self.generate(seed=seed)
+        if process is None:
+            return instance
+        return process(instance)
+
+    def generate_edges(self, occupied: np.ndarray) -> np.ndarray:
+        """Compute all the edges of a lattice of occupied sites.
+
+        Node ids are given by the order of the occupied sites in `occupied`
+        (i.e., they are obtained by a cumulative sum over the flattened array).
+        The edges of each direction are found by comparing the array with a
+        copy of itself shifted by that direction.
+
+        Returns an (E,2) int32 array of edges (a, b) with a < b. Edges are
+        ordered by a, then by direction, which is the order in which a loop
+        over all sites and directions would first encounter them.
+        """
+        L = self.L
+        ids = (np.cumsum(occupied.ravel()) - 1).reshape(L, L).astype(np.int32)
+        sources, targets, order = [], [], []
+        for k, (dx, dy) in enumerate(self.directions):
+            # Only consider directions going to a higher id (each edge once)
+            if dx < 0 or (dx == 0 and dy < 0):
+                continue
+            # The sites (x,y) for which (x+dx,y+dy) is within the lattice
+            here = (
+                slice(max(0, -dx), L - max(0, dx)),
+                slice(max(0, -dy), L - max(0, dy)),
+            )
+            there = (
+                slice(max(0, dx), L + min(0, dx)),
+                slice(max(0, dy), L + min(0, dy)),
+            )
+            both = occupied[here] & occupied[there]
+            sources += [ids[here][both]]
+            targets += [ids[there][both]]
+            order += [np.full(len(sources[-1]), k, dtype=np.int32)]
+        if not sources:
+            return np.zeros((0, 2), dtype=np.int32)
+        sources = np.concatenate(sources)
+        targets = np.concatenate(targets)
+        order = np.lexsort((np.concatenate(order), sources))
+        return np.stack([sources[order], targets[order]], axis=1)
+
     # Lattice representation (with sentinel row/column).
     # Each entry in the (L+1)*(L+1) array is either None or a
     # unique id in 0..round(L*L*density).
@@ -117,16 +210,18 @@ class Generator:
     def generate_grid(self) -> Grid:
         """Create a 2d grid with occupied and vacant sites.
 
+        Returns an (L+1)*(L+1) grid with each site either None=vacant or
+        a unique id 0..round(N * density), see `generate_occupancy` and
+        `occupancy_to_grid`.
+        """
+        return self.occupancy_to_grid(self.generate_occupancy())
+
+    def generate_occupancy(self) -> np.ndarray:
+        """Create an L*L boolean array with occupied and vacant sites.
+
         This removes nodes until exactly round(N * density) nodes remain.
         Nodes randomly proposed for removal are only removed if doing so
         does not split the graph into multiple components.
-
-        Returns an (L+1)*(L+1) grid with each site either None=vacant or
-        a unique id 0..round(N * density).
-
-        NOTE: A column and row of all None are added on the right and at the
-        bottom as sentinels. This simplifies checks whether neighbors are
-        occupied (because [x+1] and [x-1] will access these for x = {0,L-1}).
         """
         # Build the initial (fully populated) grid.
         grid = [[] for _ in range(self.L)]
@@ -158,17 +253,30 @@ class Generator:
                 occupied -= 1
             i = (i + 1) % N
 
-        # transform grid from {0,1} to {id | None}
+        return np.array(grid, dtype=bool)
+
+    def occupancy_to_grid(self, occupied: np.ndarray) -> Grid:
+        """Transform an L*L boolean array into the lattice representation.
+
+        Returns an (L+1)*(L+1) grid with each site either None=vacant or
+        a unique id 0..round(N * density).
+
+        NOTE: A column and row of all None are added on the right and at the
+        bottom as sentinels. This simplifies checks whether neighbors are
+        occupied (because [x+1] and [x-1] will access these for x = {0,L-1}).
+        """
+        grid = []
         n = 0
         for x in range(self.L):
+            column = []
             for y in range(self.L):
-                if grid[x][y] == 0:
-                    grid[x][y] = None
-                else:
-                    grid[x][y] = n
+                if occupied[x, y]:
+                    column += [n]
                     n += 1
+                else:
+                    column += [None]
             # add sentinel col on the right
-            grid[x] += [None]
+            grid += [column + [None]]
         # add sentinel row at the bottom
         grid += [[None] * (self.L + 1)]
 
@@ -186,61 +294,118 @@ class Generator:
 
         In practice this happens rarely for d=0.8, but it does have an effect
         at lower densities.
-        """
-        # movement directions
-        dirs = self.directions
 
-        # identify neighbors of the node (x,y)
-        neighbors = []
-        for d in dirs:
-            u, v = x + d[0], y + d[1]
-            if u < 0 or u >= self.L:
-                continue
-            if v < 0 or v >= self.L:
-                continue
-            if grid[u][v] != 0:
-                neighbors += [(u, v)]
+        The check is done in two stages, giving the same answer as a flood
+        fill over the whole lattice at a fraction of the cost:
+
+          1. if the occupied neighbors are connected among themselves within
+             the disk of radius r around (x,y), the site is removable
+             (this is a few bit operations and settles most proposals)
+          2. otherwise, flood fills from the components the neighbors form
+             within the disk decide whether they connect elsewhere
+        """
+        # Occupied sites within the disk, as a bit mask over self.directions
+        occupied = 0
+        for k, (dx, dy) in enumerate(self.directions):
+            u, v = x + dx, y + dy
+            if 0 <= u < self.L and 0 <= v < self.L and grid[u][v] != 0:
+                occupied |= 1 << k
 
         # A node with less than 2 neighbors can always be removed
-        if len(neighbors) < 2:
+        if occupied & (occupied - 1) == 0:
             return True
 
-        # Flood fill from one neighbor `start` to see if we can
-        # still reach all the others (without going through x,y)
-        start = neighbors[0]
-        neighbors = neighbors[1:]
-        # 0 = vacant
-        # 1 = unvisited
-        # 2 = visited
-        grid[x][y] = 0
-        grid[start[0]][start[1]] = 2
-        i = 0
-        visited = [start]
-        # Early terminate if all remaining neighbors found
-        while i < len(visited) and len(neighbors):
-            site = visited[i]
-            i += 1
-            for d in dirs:
-                u, v = site[0] + d[0], site[1] + d[1]
-                if u < 0 or u >= self.L:
-                    continue
-                if v < 0 or v >= self.L:
-                    continue
-                if grid[u][v] == 1:
-                    grid[u][v] = 2
-                    visited += [(u, v)]
-                    if (u, v) in neighbors:
-                        neighbors.remove((u, v))
-
-        # Replace the site x,y we artificially removed above
-        grid[x][y] = 1
-
-        # Reset all the nodes visited from 2 back to 1
-        for u, v in visited:
-            grid[u][v] = 1
+        # Split the neighbors into the components they form within the disk
+        components = []
+        remaining = occupied
+        while remaining:
+            reached = remaining & -remaining
+            frontier = reached
+            while frontier:
+                grow = 0
+                while frontier:
+                    low = frontier & -frontier
+                    grow |= self.disk_adjacency[low.bit_length() - 1]
+                    frontier ^= low
+                frontier = grow & remaining & ~reached
+                reached |= frontier
+            remaining &= ~reached
+            components += [reached]
+
+        # All neighbors are still connected through the disk
+        if len(components) == 1:
+            return True
 
-        # Return whether all neighbors were visited
-        return len(neighbors) == 0
+        # Otherwise check whether the components are connected elsewhere
+        sites = [
+            [
+                (x + dx, y + dy)
+                for k, (dx, dy) in enumerate(self.directions)
+                if (c >> k) & 1
+            ]
+            for c in components
+        ]
+        return self.flood_fill(grid, x, y, sites)
+
+    def flood_fill(
+        self, grid: Grid, x: int, y: int, components: List[List[Tuple[int, int]]]
+    ) -> bool:
+        """Check whether the given components are connected without (x,y).
+
+        This runs one flood fill over occupied sites from each component in
+        lockstep (avoiding the site (x,y)), and merges fills when they meet.
+        It terminates as soon as all fills have merged (connected) or as soon
+        as any group of merged fills runs out of sites (not connected). The
+        work is therefore bounded by the size of the smallest separated part,
+        rather than by the size of the whole lattice.
+        """
+        dirs = self.directions
+        L = self.L
+        n = len(components)
+
+        # Which fill has visited each site (and union-find over the fills)
+        owner = {(x, y): -1}
+        parent = list(range(n))
+
+        def find(c: int) -> int:
+            while parent[c] != c:
+                parent[c] = parent[parent[c]]
+                c = parent[c]
+            return c
+
+        queues = []
+        for c, sites in enumerate(components):
+            for site in sites:
+                owner[site] = c
+            queues += [deque(sites)]
+        groups = n
+
+        while True:
+            for c in range(n):
+                queue = queues[c]
+                if not queue:
+                    continue
+                a, b = queue.popleft()
+                for dx, dy in dirs:
+                    site = (a + dx, b + dy)
+                    other = owner.get(site)
+                    if other is None:
+                        u, v = site
+                        if 0 <= u < L and 0 <= v < L and grid[u][v] != 0:
+                            owner[site] = c
+                            queue.append(site)
+                    elif other >= 0:
+                        i, j = find(c), find(other)
+                        if i != j:
+                            parent[j] = i
+                            groups -= 1
+                            if groups == 1:
+                                return True
+                # A group of fills without any sites left is separated
+                if not queue:
+                    root = find(c)
+                    if all(not queues[k] for k in range(n) if find(k) == root):
+                        return False
 
     def print_ascii(self, grid: Grid) -> None:
         """Print a grid with ascii characters.
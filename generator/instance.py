@@ -7,14 +7,78 @@
 __author__ = "Ruben S. Andrist"
 __email__ = "randrist@amazon.com"
 
+import io
 import json
+import math
 import networkx as nx
+import numpy as np
 
 from svg import Svg
-from typing import Any, Dict
+from typing import Any, BinaryIO, Dict, List, Set, TextIO, Tuple
 
 from utils import format_radius
 
+# Header of the binary container (see `Instance.binary`), 64 bytes
+BINARY_MAGIC = b"MISB"
+BINARY_VERSION = 1
+BINARY_HEADER = np.dtype(
+    [
+        ("magic", "S4"),
+        ("format", "<u4"),
+        ("L", "<u4"),
+        ("nodes", "<u4"),
+        ("nnz", "<u8"),
+        ("seed", "<i8"),
+        ("density", "<f8"),
+        ("r", "<f8"),
+        ("version", "S8"),
+        ("reserved", "V8"),
+    ]
+)
+
+
+def read_binary(
+    filename, offset: int = 0
+) -> Tuple[Dict[str, Any], np.ndarray, np.ndarray, np.ndarray]:
+    """Open a binary container written by `Instance.binary`.
+
+    The arrays are memory mapped (read-only), nothing is parsed or copied.
+    The container starts at byte `offset` of the file (e.g., in an archive).
+
+    Returns:
+      (params, coordinates, indptr, indices): the parameters of the instance
+      (L, density, seed, r, version), the (N,2) int32 coordinates of the
+      nodes (-1 if they have none) and the CSR adjacency (int64 row pointers
+      and int32 column indices, both directions of each edge)
+    """
+    header = np.fromfile(filename, dtype=BINARY_HEADER, count=1, offset=offset)
+    if len(header) == 0 or header["magic"][0] != BINARY_MAGIC:
+        raise ValueError(f"{filename} is not a binary MIS instance")
+    header = header[0]
+    if header["format"] != BINARY_VERSION:
+        raise ValueError(
+            f"{filename} has binary format {header['format']}, expected {BINARY_VERSION}"
+        )
+    N, nnz = int(header["nodes"]), int(header["nnz"])
+    params = {
+        "L": int(header["L"]),
+        "density": float(header["density"]),
+        "seed": None if header["seed"] < 0 else int(header["seed"]),
+        "r": float(header["r"]),
+        "version": header["version"].decode(),
+    }
+    offset += BINARY_HEADER.itemsize
+    coordinates = np.memmap(filename, "<i4", mode="r", offset=offset, shape=(N, 2))
+    offset += coordinates.nbytes
+    indptr = np.memmap(filename, "<i8", mode="r", offset=offset, shape=(N + 1,))
+    offset += indptr.nbytes
+    if nnz == 0:
+        # an empty array cannot be memory mapped
+        indices = np.empty(0, dtype="<i4")
+    else:
+        indices = np.memmap(filename, "<i4", mode="r", offset=offset, shape=(nnz,))
+    return params, coordinates, indptr, indices
+
 
 class Instance(object):
     """Representation of an MIS instance on a Union Jack lattice.
@@ -28,6 +92,39 @@ class Instance(object):
         self.edges = set()
         self.r = format_radius(self.r)
 
+    @property
+    def edges(self) -> Set[Tuple[int, int]]:
+        """The set of edges (a, b) with a < b.
+
+        If the edges were provided as an array (see `set_edges`), the set is
+        only built on first access. It is filled in the order of the array.
+        """
+        if self._edges is None:
+            self._edges = set(map(tuple, self._edge_array.tolist()))
+        return self._edges
+
+    @edges.setter
+    def edges(self, edges: Set[Tuple[int, int]]) -> None:
+        self._edges = edges
+        self._edge_array = None
+
+    def set_edges(self, edges: np.ndarray) -> None:
+        """Replace all edges by an (E,2) array of edges (a, b) with a < b."""
+        self._edges = None
+        self._edge_array = np.asarray(edges, dtype=np.int32).reshape(-1, 2)
+
+    def edge_array(self) -> np.ndarray:
+        """The edges as an (E,2) int32 array."""
+        if self._edge_array is None:
+            self._edge_array = np.array(list(self._edges), dtype=np.int32)
+            self._edge_array = self._edge_array.reshape(-1, 2)
+        return self._edge_array
+
+    def num_edges(self) -> int:
+        if self._edges is None:
+            return len(self._edge_array)
+        return len(self._edges)
+
     def name(self) -> str:
         return f"N{len(self.nodes)}_d{self.density}_s{self.seed}_r{self.r}"
 
@@ -39,6 +136,7 @@ class Instance(object):
 
     def add_edge(self, a: int, b: int) -> None:
         self.edges.add((min(a, b), max(a, b)))
+        self._edge_array = None
 
     def reset_instance(self) -> None:
         self.nodes = {}
@@ -46,42 +144,59 @@ class Instance(object):
 
     def json(self) -> str:
         """A json document containing metadata and the list of edges."""
-        edges = []
-        for e in self.edges:
-            a, b = e
-            edges += [{"ids": [a, b]}]
-        return (
-            json.dumps(
-                {
-                    "problem": {
-                        "type": "mis",
-                        "meta": {
-                            "name": self.name(),
-                            "description": self.description(),
-                            "generator": {
-                                "name": "generator.py",
-                                "version": self.version,
-                            },
-                            "params": {
-                                "L": self.L,
-                                "density": self.density,
-                                "seed": self.seed,
-                                "r": self.r,
-                            },
-                            "size": {
-                                "nodes": len(self.nodes),
-                                "edges": len(self.edges),
-                            },
+        buffer = io.StringIO()
+        self.write_json(buffer)
+        return buffer.getvalue()
+
+    def write_json(self, fh: TextIO) -> None:
+        """Write the json document to an open file (see `json`).
+
+        The edges are streamed one by one after the metadata (they are the
+        last entry of the document), rather than dumped all at once.
+        """
+        document = json.dumps(
+            {
+                "problem": {
+                    "type": "mis",
+                    "meta": {
+                        "name": self.name(),
+                        "description": self.description(),
+                        "generator": {
+                            "name": "generator.py",
+                            "version": self.version,
                         },
-                        "edges": edges,
-                    }
+                        "params": {
+                            "L": self.L,
+                            "density": self.density,
+                            "seed": self.seed,
+                            "r": self.r,
+                        },
+                        "size": {
+                            "nodes": len(self.nodes),
+                            "edges": self.num_edges(),
+                        },
+                    },
+                    "edges": [],
                 }
-            )
-            + "\n"
+            }
         )
+        # Split the document around the (empty) list of edges
+        head, tail = document[:-3], document[-3:]
+        fh.write(head)
+        separator = ""
+        for a, b in self.edges:
+            fh.write(f'{separator}{{"ids": [{a}, {b}]}}')
+            separator = ", "
+        fh.write(tail + "\n")
 
     def svg(self) -> str:
         """A vector rendering of the lattice and edges."""
+        buffer = io.StringIO()
+        self.write_svg(buffer)
+        return buffer.getvalue()
+
+    def write_svg(self, fh: TextIO) -> None:
+        """Write the vector rendering to an open file (see `svg`)."""
         s = Svg(self.L)
         for nid, node in self.nodes.items():
             s.add_node(node)
@@ -89,66 +204,183 @@ class Instance(object):
             a = self.nodes[e[0]]
             b = self.nodes[e[1]]
             s.add_edge(a, b)
-        return s.render()
-
-    def cplex(self) -> str:
-        """A lp formulation of the instance for CPLEX."""
-        lp = f"\\ {self.description()}\n"
-        lp += f"\\ format: CPLEX lp\n"
-        lp += f"\\ generator.py v{self.version}\n"
-        lp += f"\\ name={self.name()}\n"
-
-        lp += f"\\\\ params:\n"
-        lp += f"\\\\ L={self.L}\n"
-        lp += f"\\\\ density={self.density}\n"
-        lp += f"\\\\ seed={self.seed}\n"
-        lp += f"\\\\ r={self.r}\n"
-
-        lp += "\nMaximize\n"
-        lp += "  obj:"
+        s.write(fh)
+
+    def cplex(self, cliques: bool = False) -> str:
+        """A lp formulation of the instance for CPLEX.
+
+        By default there is one constraint per edge. With `cliques`, there is
+        one constraint per clique of a clique cover of the edges instead (see
+        `cliques`), which is smaller and has a tighter relaxation.
+        """
+        buffer = io.StringIO()
+        self.write_cplex(buffer, cliques)
+        return buffer.getvalue()
+
+    def write_cplex(self, fh: TextIO, cliques: bool = False) -> None:
+        """Write the lp formulation to an open file (see `cplex`)."""
+        fh.write(f"\\ {self.description()}\n")
+        fh.write(f"\\ format: CPLEX lp\n")
+        if cliques:
+            fh.write(f"\\ constraints: clique cover\n")
+        fh.write(f"\\ generator.py v{self.version}\n")
+        fh.write(f"\\ name={self.name()}\n")
+
+        fh.write(f"\\\\ params:\n")
+        fh.write(f"\\\\ L={self.L}\n")
+        fh.write(f"\\\\ density={self.density}\n")
+        fh.write(f"\\\\ seed={self.seed}\n")
+        fh.write(f"\\\\ r={self.r}\n")
+
+        fh.write("\nMaximize\n")
+        fh.write("  obj:")
         N = len(self.nodes)
         per_line = 10
-        for i, node in enumerate(self.nodes):
-            lp += f" x{i}"
+        for i in range(N):
+            fh.write(f" x{i}")
             if i < N - 1:
-                lp += " +"
+                fh.write(" +")
                 if i % per_line == per_line - 1:
-                    lp += "\n      "
+                    fh.write("\n      ")
+
+        fh.write("\n\nSubject To\n")
+        if cliques:
+            for j, clique in enumerate(self.cliques()):
+                fh.write(f"  c{j}: " + " + ".join(f"x{i}" for i in clique) + " <= 1\n")
+        else:
+            for j, (a, b) in enumerate(self.edges):
+                fh.write(f"  e{j}: x{a} + x{b} <= 1\n")
+        fh.write("\nBinary\n")
+        fh.write("\n".join([f"  x{i}" for i in self.nodes]))
+        fh.write("\nEnd\n")
+
+    def cliques(self) -> List[List[int]]:
+        """Cliques of the instance which cover all of its edges.
+
+        In a unit disk graph, all the sites within a disk of diameter r are
+        connected to each other. Every edge is covered by the disk centered at
+        its midpoint, so the sites within these disks give a clique cover.
+        Cliques contained in another one are dropped. The nodes must have
+        lattice coordinates, and the edges must connect exactly the pairs of
+        sites up to the distance of the longest edge (this is checked).
 
-        lp += "\n\nSubject To\n"
-        for j, e in enumerate(self.edges):
-            node_sum = " + ".join([f"x{i}" for i in e])
-            lp += f"  e{j}: {node_sum} <= 1\n"
-        lp += "\nBinary\n"
-        lp += "\n".join([f"  x{i}" for i in self.nodes])
-        lp += "\nEnd\n"
-        return lp
+        Returns:
+          The cliques as sorted lists of node ids, sorted.
+        """
+        from scipy.sparse import csr_matrix
+
+        if not all("x" in node and "y" in node for node in self.nodes.values()):
+            raise ValueError("The clique cover needs the coordinates of the nodes")
+        edges = self.edge_array()
+        if len(edges) == 0:
+            return []
+        ids = np.array(sorted(self.nodes))
+        xy = np.array([[self.nodes[i]["x"], self.nodes[i]["y"]] for i in ids])
+        sites = np.full(xy.max(axis=0) + 1, -1)
+        sites[xy[:, 0], xy[:, 1]] = ids
+        position = np.zeros(ids.max() + 1, dtype=int)
+        position[ids] = np.arange(len(ids))
+        a, b = xy[position[edges[:, 0]]], xy[position[edges[:, 1]]]
+        # Squared length of the longest edge (all pairs up to it are edges)
+        R = int(((a - b) ** 2).sum(axis=1).max())
+        # Centers of the disks (the midpoints of the edges), doubled to be integers
+        centers = np.unique(a + b, axis=0)
+
+        # Doubled offsets from a center to the sites within its disk
+        k = math.isqrt(R)
+        ox, oy = np.meshgrid(np.arange(-k, k + 1), np.arange(-k, k + 1))
+        ox, oy = ox.ravel(), oy.ravel()
+        ox, oy = ox[ox ** 2 + oy ** 2 <= R], oy[ox ** 2 + oy ** 2 <= R]
+
+        cliques = []
+        W, H = sites.shape
+        for px, py in [(0, 0), (0, 1), (1, 0), (1, 1)]:
+            # The offsets reaching sites have the parity of the center
+            group = centers[(centers[:, 0] % 2 == px) & (centers[:, 1] % 2 == py)]
+            reach = (ox % 2 == px) & (oy % 2 == py)
+            x = (group[:, :1] + ox[reach]) // 2
+            y = (group[:, 1:] + oy[reach]) // 2
+            inside = (0 <= x) & (x < W) & (0 <= y) & (y < H)
+            members = np.full(x.shape, -1)
+            members[inside] = sites[x[inside], y[inside]]
+            cliques += [tuple(sorted(row[row >= 0].tolist())) for row in members]
+        cliques = sorted(set(cliques))
+
+        # Drop the cliques contained in another clique
+        rows = np.repeat(np.arange(len(cliques)), [len(c) for c in cliques])
+        cols = position[np.concatenate([np.array(c) for c in cliques])]
+        membership = csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+            shape=(len(cliques), len(ids)),
+        )
+        overlap = (membership @ membership.T).tocoo()
+        sizes = np.array([len(c) for c in cliques])
+        contained = (overlap.row != overlap.col) & (overlap.data == sizes[overlap.row])
+        dominated = set(overlap.row[contained].tolist())
+
+        # Check that the cliques only contain edges (this is not the case,
+        # e.g., for rewired graphs, whose edges do not follow the distances)
+        u, v = position[edges[:, 0]], position[edges[:, 1]]
+        adjacency = csr_matrix(
+            (np.ones(2 * len(edges), dtype=np.int32), (np.r_[u, v], np.r_[v, u])),
+            shape=(len(ids), len(ids)),
+        )
+        within = np.asarray(
+            membership.multiply(membership @ adjacency).sum(axis=1)
+        ).ravel()
+        if (within != sizes * (sizes - 1)).any():
+            raise ValueError("The edges are not those of a unit disk graph")
+        return [list(c) for k, c in enumerate(cliques) if k not in dominated]
 
     def metis(self) -> str:
         """Metis 4.0 format for KaMIS."""
-        metis = f"% {self.description()}\n"
-        metis += f"% format: METIS 4.0 (metis4.pdf p16 fig.8a)\n"
-        metis += f"% generator.py v{self.version}\n"
-        metis += f"% name={self.name()}\n"
-
-        metis += f"%\n% params:\n"
-        metis += f"%% L={self.L}\n"
-        metis += f"%% density={self.density}\n"
-        metis += f"%% seed={self.seed}\n"
-        metis += f"%% r={self.r}\n"
-
-        metis += "%\n"
-        metis += "% NOTE: Metis node ids start at 1!\n%\n"
-
-        metis += f"{len(self.nodes)} {len(self.edges)} 0\n"
-        for i in range(len(self.nodes)):
-            adj = [sum(e) - i + 1 for e in self.edges if i in e]
+        buffer = io.StringIO()
+        self.write_metis(buffer)
+        return buffer.getvalue()
+
+    def write_metis(self, fh: TextIO) -> None:
+        """Write the Metis 4.0 format to an open file (see `metis`)."""
+        fh.write(f"% {self.description()}\n")
+        fh.write(f"% format: METIS 4.0 (metis4.pdf p16 fig.8a)\n")
+        fh.write(f"% generator.py v{self.version}\n")
+        fh.write(f"% name={self.name()}\n")
+
+        fh.write(f"%\n% params:\n")
+        fh.write(f"%% L={self.L}\n")
+        fh.write(f"%% density={self.density}\n")
+        fh.write(f"%% seed={self.seed}\n")
+        fh.write(f"%% r={self.r}\n")
+
+        fh.write("%\n")
+        fh.write("% NOTE: Metis node ids start at 1!\n%\n")
+
+        fh.write(f"{len(self.nodes)} {self.num_edges()} 0\n")
+        for adj in self.adjacency(offset=1):
             assert len(adj) > 0
-            metis += " ".join([str(x) for x in sorted(adj)]) + "\n"
-        return metis
+            fh.write(" ".join(map(str, adj)) + "\n")
+
+    def adjacency(self, offset: int = 0) -> List[List[int]]:
+        """Sorted adjacency list of each node (ids 0..N-1).
+
+        This is built with a single sort over the edges rather than by
+        scanning the edges for each node. Ids in the lists are shifted by
+        `offset` (e.g., 1 for formats with 1-based ids).
+        """
+        N = len(self.nodes)
+        edges = self.edge_array()
+        a = np.concatenate([edges[:, 0], edges[:, 1]])
+        b = np.concatenate([edges[:, 1], edges[:, 0]])
+        order = np.lexsort((b, a))
+        neighbors = (b[order] + offset).tolist()
+        bounds = [0] + np.cumsum(np.bincount(a, minlength=N)).tolist()
+        return [neighbors[bounds[i] : bounds[i + 1]] for i in range(N)]
 
     def pickle(self, filename) -> None:
-        """Pickled adjacency matrix."""
+        """Pickled adjacency matrix.
+
+        NOTE: This is a dense N*N list of lists, prefer `npz`, `npy` or
+        `bits` for anything but small instances.
+        """
         N = len(self.nodes)
         adj = [[0] * N for _ in range(N)]
         for a, b in self.edges:
@@ -157,9 +389,126 @@ class Instance(object):
 
         pickle.dump(adj, open(filename, "wb"))
 
+    def csr(self):
+        """Adjacency matrix as a (symmetric) scipy.sparse CSR matrix."""
+        from scipy.sparse import csr_matrix
+
+        N = len(self.nodes)
+        edges = self.edge_array()
+        rows = np.concatenate([edges[:, 0], edges[:, 1]])
+        cols = np.concatenate([edges[:, 1], edges[:, 0]])
+        data = np.ones(len(rows), dtype=np.uint8)
+        return csr_matrix((data, (rows, cols)), shape=(N, N))
+
+    def npz(self, filename) -> None:
+        """Adjacency matrix in scipy.sparse CSR format (load_npz)."""
+        from scipy.sparse import save_npz
+
+        with open(filename, "wb") as fh:
+            save_npz(fh, self.csr())
+
+    def npy(self, filename) -> None:
+        """Edge array (E,2) of int32 in numpy format (numpy.load)."""
+        with open(filename, "wb") as fh:
+            np.save(fh, self.edge_array())
+
+    def packed_adjacency(self) -> np.ndarray:
+        """Adjacency matrix with one bit per entry (see numpy.unpackbits).
+
+        Row i is an array of ceil(N/8) bytes, with bit j set (big-endian
+        within each byte) if i and j are connected.
+        """
+        N = len(self.nodes)
+        edges = self.edge_array()
+        rows = np.concatenate([edges[:, 0], edges[:, 1]])
+        cols = np.concatenate([edges[:, 1], edges[:, 0]])
+        packed = np.zeros((N, (N + 7) // 8), dtype=np.uint8)
+        np.bitwise_or.at(packed, (rows, cols >> 3), 0x80 >> (cols & 7))
+        return packed
+
+    def bits(self, filename) -> None:
+        """Packed bit adjacency matrix in numpy format (numpy.load)."""
+        with open(filename, "wb") as fh:
+            np.save(fh, self.packed_adjacency())
+
+    def binary(self, filename) -> None:
+        """Versioned binary container with memory mappable arrays.
+
+        A 64 byte header (see BINARY_HEADER) with the parameters of the
+        instance, followed by the (N,2) int32 coordinates of the nodes (-1 for
+        nodes without coordinates) and the adjacency in CSR format: N+1 int64
+        row pointers and int32 column indices. All values are little endian.
+        Use `read_binary` or `Instance.from_binary` to load it.
+        """
+        with open(filename, "wb") as fh:
+            self.write_binary(fh)
+
+    def write_binary(self, fh: BinaryIO) -> None:
+        """Write the binary container to a file open in binary mode."""
+        N = len(self.nodes)
+        edges = self.edge_array()
+        a = np.concatenate([edges[:, 0], edges[:, 1]])
+        b = np.concatenate([edges[:, 1], edges[:, 0]])
+        indices = b[np.lexsort((b, a))].astype("<i4")
+        indptr = np.zeros(N + 1, dtype="<i8")
+        np.cumsum(np.bincount(a, minlength=N), out=indptr[1:])
+        coordinates = np.array(
+            [[node.get("x", -1), node.get("y", -1)] for node in self.node_list()],
+            dtype="<i4",
+        ).reshape(-1, 2)
+        header = np.zeros(1, dtype=BINARY_HEADER)
+        header[0] = (
+            BINARY_MAGIC,
+            BINARY_VERSION,
+            self.L,
+            N,
+            len(indices),
+            -1 if self.seed is None else self.seed,
+            self.density,
+            self.r,
+            str(self.version).encode(),
+            b"",
+        )
+        for array in [header, coordinates, indptr, indices]:
+            fh.write(array.tobytes())
+
+    @classmethod
+    def from_binary(cls, filename, offset: int = 0) -> "Instance":
+        """Construct an instance from a binary container (see `binary`).
+
+        The edges are in sorted order (which can differ from the order of the
+        edges in the instance that was written).
+        """
+        params, coordinates, indptr, indices = read_binary(filename, offset)
+        instance = cls(**params)
+        # The radius is stored formatted already (see __init__)
+        instance.r = params["r"]
+        for i, (x, y) in enumerate(coordinates.tolist()):
+            if x < 0:
+                instance.add_node(i)
+            else:
+                instance.add_node(i, x=x, y=y)
+        rows = np.repeat(np.arange(len(coordinates), dtype=np.int32), np.diff(indptr))
+        upper = rows < indices
+        instance.set_edges(np.stack([rows[upper], indices[upper]], axis=1))
+        return instance
+
+    def node_list(self) -> List[Dict[str, Any]]:
+        """The attributes of the nodes, ordered by id."""
+        return [self.nodes[i] for i in sorted(self.nodes)]
+
     def edgelist(self) -> str:
         """Edge list format for julia"""
-        return "\n".join(map(lambda x: f"{x[0]}, {x[1]}", self.edges))
+        buffer = io.StringIO()
+        self.write_edgelist(buffer)
+        return buffer.getvalue()
+
+    def write_edgelist(self, fh: TextIO) -> None:
+        """Write the edge list to an open file (see `edgelist`)."""
+        separator = ""
+        for a, b in self.edges:
+            fh.write(f"{separator}{a}, {b}")
+            separator = "\n"
 
     def to_networkx_graph(self) -> nx.Graph:
         G = nx.Graph()
@@ -3,10 +3,8 @@
 python3 optimization/create_file.py -path L21_ER
 
 for L in 21; do
+    python3 generate_ER.py -L $L --seeds 0:501 --jobs 4 --cplex
     for seed in `seq 0 500`; do
-        python3 generate_ER.py -L $L -s $seed --cplex
         python3 optimization/optimize.py -L $L -s $seed --TTS --ER -path L21_ER
     done
 done
-
-
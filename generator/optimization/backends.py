@@ -0,0 +1,388 @@
+###############################################################################
+# // SPDX-License-Identifier: Apache-2.0
+# // Copyright 2023: Amazon Web Services, Inc
+###############################################################################
+from importlib.util import find_spec
+from instance import Instance
+from run_cplex import model_from_instance, run_one_instance
+from scipy.sparse import csr_matrix
+
+import numpy as np
+import os
+import re
+import resource
+import subprocess
+import tempfile
+import time
+
+
+def read_lp(path: str):
+    """
+    Read a lp file written by Instance.cplex (with either formulation)
+    Returns the params of the instance (from the header), the number of variables, and the constraints as the list of the variables of each sum <= 1
+    """
+    params = {}
+    constraints = []
+    num_nodes = 0
+    section = None
+    with open(path) as f_object:
+        for line in f_object:
+            match = re.match(r"\\\\ (\w+)=(.*)", line)
+            version = re.match(r"\\ generator.py v(.*)", line)
+            if match:
+                params[match.group(1)] = match.group(2).strip()
+            elif version:
+                params["version"] = version.group(1).strip()
+            elif line.strip() in ["Maximize", "Subject To", "Binary", "End"]:
+                section = line.strip()
+            elif section == "Subject To" and "<=" in line:
+                constraints.append([int(x) for x in re.findall(r"x(\d+)", line)])
+            elif section == "Binary" and line.strip():
+                num_nodes += 1
+    for key, cast in [("L", int), ("density", float), ("seed", int), ("r", float)]:
+        if key in params:
+            params[key] = cast(params[key])
+    return params, num_nodes, constraints
+
+
+def lp_instance(path: str) -> Instance:
+    """
+    The instance of a lp file (without coordinates), two nodes are connected if they are in the same constraint
+    """
+    params, num_nodes, constraints = read_lp(path)
+    instance = Instance(**params)
+    # the radius is formatted already (see Instance.__init__)
+    instance.r = params["r"]
+    for node in range(num_nodes):
+        instance.add_node(node)
+    edges = [(a, b) for c in constraints for i, a in enumerate(c) for b in c[i + 1 :]]
+    instance.set_edges(np.array(sorted(set(edges)), dtype=np.int64).reshape(-1, 2))
+    return instance
+
+
+def timed(function, *args):
+    """
+    Run a function, returns its result, the process time and the wall time it took (measured as in run_cplex_once)
+    """
+    time_bis = time.time()
+    raw_time_start = time.process_time()
+    result = function(*args)
+    raw_time_diff = time.process_time() - raw_time_start
+    time_diff = time.time() - time_bis
+    return result, raw_time_diff, time_diff
+
+
+class Backend:
+    """
+    The interface of the solvers of MIS instances, so that they can be compared on the same instances and stored in the same results.
+    run returns the same values as run_cplex.run_one_instance:
+    (solver time to optimum, process time, wall time, solver TTS, process TTS, wall TTS, size of the MIS)
+    where the solver time is the time reported by the solver (the wall time of the solve when it does not report one), and the TTS times are 0 without TTS.
+    Exact solvers which only report the optimum once it is proven have the TTS equal to the time to optimum.
+    Args:
+        TTS: whether to evaluate the time to solution
+        threads: maximum number of threads to use, 0 lets the solver choose (ignored by single threaded solvers)
+        formulation: the constraints of the model, see run_cplex.FORMULATIONS (for the MILP solvers, when the instance is in memory)
+        tts_mode: how CPLEX measures the TTS, see run_cplex.TTS_MODES
+    """
+
+    name = None
+
+    def __init__(
+        self,
+        TTS: bool = False,
+        threads: int = 0,
+        formulation: str = "edge",
+        tts_mode: str = "single",
+    ) -> None:
+        self.TTS = TTS
+        self.threads = threads
+        self.formulation = formulation
+        self.tts_mode = tts_mode
+
+    @staticmethod
+    def available() -> bool:
+        return True
+
+    def run(self, path: str, instance: Instance = None):
+        """
+        Solve an instance, given in memory or else read from the lp file at path (which also names the logs)
+        """
+        raise NotImplementedError
+
+    def constraints(self, path: str, instance: Instance = None):
+        """
+        The number of variables and the constraints (variables of each sum <= 1) of the model of an instance
+        """
+        if instance is None:
+            _, num_nodes, constraints = read_lp(path)
+            return num_nodes, constraints
+        if self.formulation == "clique":
+            return len(instance.nodes), instance.cliques()
+        return len(instance.nodes), instance.edge_array().tolist()
+
+    def exact(self, solve, *args):
+        """
+        The results of an exact solver which only reports the optimum at the end
+        """
+        sol, raw_time_diff, time_diff = timed(solve, *args)
+        tts = (time_diff, raw_time_diff, time_diff) if self.TTS else (0, 0, 0)
+        return (time_diff, raw_time_diff, time_diff) + tts + (int(sol),)
+
+
+class CplexBackend(Backend):
+    """
+    CPLEX through docplex (see run_cplex.py)
+    """
+
+    name = "cplex"
+
+    @staticmethod
+    def available() -> bool:
+        return find_spec("cplex") is not None
+
+    def run(self, path: str, instance: Instance = None):
+        model = None
+        if instance is not None:
+            model = model_from_instance(instance, self.formulation)
+        return run_one_instance(
+            path,
+            TTS=self.TTS,
+            threads=self.threads,
+            model=model,
+            tts_mode=self.tts_mode,
+        )
+
+
+class HighsBackend(Backend):
+    """
+    The open source MILP solver HiGHS, through scipy.optimize.milp (it reports no incumbents, so the TTS is the time to optimum)
+    """
+
+    name = "highs"
+
+    def run(self, path: str, instance: Instance = None):
+        from scipy.optimize import Bounds, LinearConstraint, milp
+
+        num_nodes, constraints = self.constraints(path, instance)
+        rows = np.repeat(np.arange(len(constraints)), [len(c) for c in constraints])
+        columns = np.array([i for c in constraints for i in c], dtype=np.int64)
+        A = csr_matrix(
+            (np.ones(len(columns)), (rows, columns)),
+            shape=(len(constraints), num_nodes),
+        )
+        linear = [LinearConstraint(A, -np.inf, 1)] if len(constraints) else None
+
+        def solve():
+            result = milp(
+                -np.ones(num_nodes),
+                constraints=linear,
+                integrality=np.ones(num_nodes),
+                bounds=Bounds(0, 1),
+            )
+            if not result.success:
+                raise RuntimeError(f"HiGHS failed on {path}: {result.message}")
+            return round(-result.fun)
+
+        return self.exact(solve)
+
+
+class CpSatBackend(Backend):
+    """
+    The CP-SAT solver of OR-Tools (if installed), the TTS is taken from the solutions it reports during the solve
+    """
+
+    name = "cpsat"
+
+    @staticmethod
+    def available() -> bool:
+        return find_spec("ortools") is not None
+
+    def run(self, path: str, instance: Instance = None):
+        from ortools.sat.python import cp_model
+
+        num_nodes, constraints = self.constraints(path, instance)
+        model = cp_model.CpModel()
+        x = [model.NewBoolVar(f"x{i}") for i in range(num_nodes)]
+        for c in constraints:
+            model.AddAtMostOne([x[i] for i in c])
+        model.Maximize(sum(x))
+        solver = cp_model.CpSolver()
+        if self.threads != 0:
+            solver.parameters.num_workers = self.threads
+
+        # (objective, solver time, process time, wall time) of each solution found
+        timeline = []
+
+        class Timeline(cp_model.CpSolverSolutionCallback):
+            def on_solution_callback(self):
+                timeline.append(
+                    (
+                        self.ObjectiveValue(),
+                        self.WallTime(),
+                        time.process_time() - raw_time_start,
+                        time.time() - time_bis,
+                    )
+                )
+
+        time_bis = time.time()
+        raw_time_start = time.process_time()
+        status = solver.Solve(model, Timeline() if self.TTS else None)
+        raw_time_diff = time.process_time() - raw_time_start
+        time_diff = time.time() - time_bis
+        if status != cp_model.OPTIMAL:
+            raise RuntimeError(f"CP-SAT did not solve {path} to optimality")
+
+        sol = int(round(solver.ObjectiveValue()))
+        tts = (0, 0, 0)
+        if self.TTS:
+            tts = next(
+                (t[1:] for t in timeline if t[0] >= sol),
+                (solver.WallTime(), raw_time_diff, time_diff),
+            )
+        return (solver.WallTime(), raw_time_diff, time_diff) + tuple(tts) + (sol,)
+
+
+class DPBackend(Backend):
+    """
+    The sweeping line dynamic programming of solver.py (exact, for instances whose nodes are in lattice order)
+    """
+
+    name = "dp"
+
+    def run(self, path: str, instance: Instance = None):
+        from solver import solve
+
+        if instance is None:
+            instance = lp_instance(path)
+        nn = instance.adjacency()
+        return self.exact(lambda: solve(nn, max_candidates=0)[0])
+
+
+class BranchReduceBackend(Backend):
+    """
+    The exact branch and reduce solver of branch_reduce.py (for any graph)
+    """
+
+    name = "branch_reduce"
+
+    def run(self, path: str, instance: Instance = None):
+        from branch_reduce import solve
+
+        if instance is None:
+            instance = lp_instance(path)
+        nn = instance.adjacency()
+        return self.exact(lambda: solve(nn)[0])
+
+
+class SABackend(Backend):
+    """
+    The simulated annealing of annealing.py, with the replicas split over threads processes (1 if threads is 0).
+    It is a heuristic: the solution is the best size found, which is not proven to be the MIS, and the TTS is the time until it was first found.
+    """
+
+    name = "sa"
+
+    def run(self, path: str, instance: Instance = None):
+        from annealing import anneal_parallel
+
+        if instance is None:
+            instance = lp_instance(path)
+        result = anneal_parallel(instance.adjacency(), workers=max(self.threads, 1))
+        tts = (0, 0, 0)
+        if self.TTS:
+            tts = (
+                result["time_to_best"],
+                result["process_time_to_best"],
+                result["time_to_best"],
+            )
+        return (
+            (result["time"], result["process_time"], result["time"])
+            + tts
+            + (result["best"],)
+        )
+
+
+class SweepingLineBackend(Backend):
+    """
+    The C++ sweeping line executable of cpp/ (built with make), run in a subprocess on the metis file of the instance.
+    The process time is the CPU time of the subprocess, and the solver time its wall time (including reading the file).
+    """
+
+    name = "sweeping_line"
+    executable = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "..", "..", "cpp", "sweeping_line"
+    )
+
+    def __init__(self, executable: str = None, **options) -> None:
+        super().__init__(**options)
+        if executable is not None:
+            self.executable = executable
+
+    @classmethod
+    def available(cls) -> bool:
+        return os.access(cls.executable, os.X_OK)
+
+    def run(self, path: str, instance: Instance = None):
+        # generate.py writes the metis file next to the lp file
+        metis = re.sub(r"(\.cliques)?\.lp$", ".txt", path)
+        if instance is None and os.path.isfile(metis):
+            return self.run_metis(metis)
+        if instance is None:
+            instance = lp_instance(path)
+        with tempfile.TemporaryDirectory() as folder:
+            metis = os.path.join(folder, instance.name() + ".txt")
+            with open(metis, "w") as f_object:
+                instance.write_metis(f_object)
+            return self.run_metis(metis)
+
+    def run_metis(self, metis: str):
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        time_bis = time.time()
+        output = subprocess.run(
+            [self.executable, metis], capture_output=True, text=True
+        ).stdout
+        time_diff = time.time() - time_bis
+        after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        raw_time_diff = (after.ru_utime + after.ru_stime) - (
+            usage.ru_utime + usage.ru_stime
+        )
+
+        lines = output.strip().splitlines()
+        if len(lines) < 2 or lines[-2].strip() != "|MSI| #GS #1E":
+            raise RuntimeError(f"{self.executable} failed on {metis}:\n{output}")
+        sol = int(lines[-1].split()[0])
+        tts = (time_diff, raw_time_diff, time_diff) if self.TTS else (0, 0, 0)
+        return (time_diff, raw_time_diff, time_diff) + tts + (sol,)
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in [
+        CplexBackend,
+        HighsBackend,
+        CpSatBackend,
+        DPBackend,
+        BranchReduceBackend,
+        SABackend,
+        SweepingLineBackend,
+    ]
+}
+
+
+def available_backends():
+    """
+    The names of the backends which can run here
+    """
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+
+def get_backend(name: str, **options) -> Backend:
+    """
+    A backend by name (see BACKENDS), with the options of Backend
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name}, expected one of {list(BACKENDS)}")
+    if not BACKENDS[name].available():
+        raise ValueError(f"The backend {name} is not available (not installed)")
+    return BACKENDS[name](**options)
@@ -3,6 +3,7 @@
 # // Copyright 2023: Amazon Web Services, Inc
 ###############################################################################
 from csv import writer
+from opt_result import headers
 import argparse
 import os
 
@@ -24,21 +25,7 @@ def main():
         os.path.join("data", "cplex", args.path_to_save + ".csv"), "a"
     ) as f_object:
         writer_object = writer(f_object)
-        writer_object.writerow(
-            [
-                "L",
-                "Density",
-                "Seed",
-                "UDG Radius",
-                "CPLEX TTO",
-                "Process TTO",
-                "Clock TTO",
-                "CPLEX TTS",
-                "Process TTS",
-                "Clock TTS",
-                "Solution",
-            ]
-        )
+        writer_object.writerow(headers(rewired=False))
         f_object.close()
 
 
@@ -4,6 +4,43 @@
 ###############################################################################
 from csv import writer
 import numpy as np
+import os
+
+# The schema of the results of both Result and ResultRewired: the attribute of the result and the heading of its column
+SCHEMA = [
+    ("L", "L"),
+    ("density", "Density"),
+    ("seed", "Seed"),
+    ("r", "UDG Radius"),
+    ("rewiring_frac", "Frac Rewired"),
+    ("tto_cplex", "CPLEX TTO"),
+    ("raw_time_diff", "Process TTO"),
+    ("time_diff", "Clock TTO"),
+    ("tts_cplex", "CPLEX TTS"),
+    ("raw_time_diff_tts", "Process TTS"),
+    ("time_diff_tts", "Clock TTS"),
+    ("sol", "Solution"),
+]
+# the times are rounded to the microsecond
+TIMES = [
+    "tto_cplex",
+    "raw_time_diff",
+    "time_diff",
+    "tts_cplex",
+    "raw_time_diff_tts",
+    "time_diff_tts",
+]
+
+
+def headers(rewired: bool = False):
+    """
+    The headings of the columns of the csv file of the results (without the fraction rewired for Result)
+    """
+    return [
+        heading
+        for attribute, heading in SCHEMA
+        if rewired or attribute != "rewiring_frac"
+    ]
 
 
 class Result:
@@ -11,55 +48,42 @@ class Result:
     This class is in charge of creating an object with the relevant information to store, and it actually saves it to the path indicated in the params
     """
 
+    # whether the csv files have the column of the fraction of edges rewired
+    rewired = False
+
     def __init__(self, **params: {}) -> None:
         self.__dict__ = params
 
-    def store_results(self):
-        List = [
-            self.L,
-            self.density,
-            self.seed,
-            self.r,
-            np.round(self.tto_cplex, 6),
-            np.round(self.raw_time_diff, 6),
-            np.round(self.time_diff, 6),
-            np.round(self.tts_cplex, 6),
-            np.round(self.raw_time_diff_tts, 6),
-            np.round(self.time_diff_tts, 6),
-            self.sol,
-        ]
+    def record(self) -> dict:
+        """
+        The values of all the columns of SCHEMA, by heading (the fraction rewired is 0 when not given)
+        """
+        values = {}
+        for attribute, heading in SCHEMA:
+            value = getattr(self, attribute, 0)
+            if attribute in TIMES:
+                value = float(np.round(value, 6))
+            values[heading] = value
+        return values
 
+    def row(self):
+        record = self.record()
+        return [record[heading] for heading in headers(self.rewired)]
+
+    def store_results(self):
+        # the headings are written first when the file is new (so create_file.py is not needed)
+        new_file = not os.path.isfile(self.path) or os.path.getsize(self.path) == 0
         with open(self.path, "a") as f_object:
             writer_object = writer(f_object)
-            writer_object.writerow(List)
+            if new_file:
+                writer_object.writerow(headers(self.rewired))
+            writer_object.writerow(self.row())
             f_object.close()
 
 
-class ResultRewired:
+class ResultRewired(Result):
     """
     This class is in charge of creating an object with the relevant information to store, and it actually saves it to the path indicated in the params
     """
 
-    def __init__(self, **params: {}) -> None:
-        self.__dict__ = params
-
-    def store_results(self):
-        List = [
-            self.L,
-            self.density,
-            self.seed,
-            self.r,
-            self.rewiring_frac,
-            np.round(self.tto_cplex, 6),
-            np.round(self.raw_time_diff, 6),
-            np.round(self.time_diff, 6),
-            np.round(self.tts_cplex, 6),
-            np.round(self.raw_time_diff_tts, 6),
-            np.round(self.time_diff_tts, 6),
-            self.sol,
-        ]
-
-        with open(self.path, "a") as f_object:
-            writer_object = writer(f_object)
-            writer_object.writerow(List)
-            f_object.close()
+    rewired = True
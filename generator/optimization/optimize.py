@@ -3,6 +3,9 @@
 # // Copyright 2023: Amazon Web Services, Inc
 ###############################################################################
 from optimizer import Optimizer
+from result_store import ResultStore
+from backends import BACKENDS
+from run_cplex import FORMULATIONS, TTS_MODES
 
 import argparse
 
@@ -62,7 +65,50 @@ def parse_optimization_args(parser):
         help="Generate Erdos–Renyi graphs",
     )
 
+    parser.add_argument(
+        "--store",
+        type=str,
+        help="Take the instance from this instance store (see store.py)",
+    )
+
+    parser.add_argument(
+        "--archive",
+        type=str,
+        help="Read the instance from the archive in this folder (see archive.py)",
+    )
+
+    parser.add_argument(
+        "--formulation",
+        choices=FORMULATIONS,
+        default="edge",
+        help="One constraint per edge, or per clique of a clique cover (default edge)",
+    )
+
+    parser.add_argument(
+        "--tts_mode",
+        choices=TTS_MODES,
+        default="single",
+        help="Take the TTS from the solve to optimality, or solve again (default single)",
+    )
+
+    parser.add_argument(
+        "--backend",
+        choices=list(BACKENDS),
+        default="cplex",
+        help="The solver (default cplex), the results are saved in data/{backend}",
+    )
+
+    parser.add_argument(
+        "--shard",
+        action="store_true",
+        help="Write the result to the shard of this process, for runs in parallel (merge them with result_store.py)",
+    )
+
     args = parser.parse_args()
+    if args.ER or args.rewiring_frac != 0:
+        for name in ["store", "archive"]:
+            if getattr(args, name) is not None:
+                parser.error(f"--{name} only holds UDGs, not ER or rewired graphs")
     return args
 
 
@@ -80,10 +126,18 @@ def main():
         TTS_bool=args.TTS_bool,
         threads=args.threads,
         ER=args.ER,
-        rewiring_frac=args.rewiring_frac
+        rewiring_frac=args.rewiring_frac,
+        store=args.store,
+        archive=args.archive,
+        formulation=args.formulation,
+        tts_mode=args.tts_mode,
+        backend=args.backend,
     ).optimize(args.path_to_save)
 
-    opt_result.store_results()
+    if args.shard:
+        ResultStore(opt_result.path, batch_size=1).append(opt_result)
+    else:
+        opt_result.store_results()
 
 
 if __name__ == "__main__":
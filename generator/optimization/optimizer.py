@@ -3,10 +3,12 @@
 # // Copyright 2023: Amazon Web Services, Inc
 ###############################################################################
 import os
-from run_cplex import run_one_instance
+from backends import get_backend
 from opt_result import Result, ResultRewired
 
+from archive import Archive
 from instance import Instance
+from store import InstanceStore
 from utils import format_radius
 
 
@@ -20,6 +22,12 @@ class Optimizer:
         density (float): density, 0 < density < 1.0
         TTS_bool (bool): to enable the calculating of Time to Solution.
         threads (int): number of threads for CPLEX to use. 0 let CPLEX choose.
+        store (str): folder of an InstanceStore to take the (UDG) instance from, it is generated there if needed
+        (with store or archive, the CPLEX model is built in memory rather than read from an lp file)
+        archive (str): folder of an Archive (see archive.py) to read the (UDG) instance from
+        formulation (str): "edge" for one constraint per edge, "clique" for one per clique of a clique cover (the .cliques.lp files of generate.py -q)
+        tts_mode (str): "single" to take the TTS from the incumbents of the solve to optimality, "replay" to solve again (see run_one_instance)
+        backend (str): the solver, see backends.BACKENDS (the results of other solvers than CPLEX are saved in data/{backend} with the same columns)
     """
 
     def __init__(
@@ -32,6 +40,11 @@ class Optimizer:
         threads: int = 0,
         rewiring_frac: float = 0,
         ER: bool = False,
+        store: str = None,
+        archive: str = None,
+        formulation: str = "edge",
+        tts_mode: str = "single",
+        backend: str = "cplex",
     ) -> None:
         self.L = L
         self.seed = seed
@@ -41,12 +54,24 @@ class Optimizer:
         self.threads = threads
         self.rewiring_frac = rewiring_frac
         self.ER = ER
+        self.formulation = formulation
+        self.tts_mode = tts_mode
+        self.backend = backend
+        # the instance, when it is optimized without going through an lp file
+        self.instance = None
 
         # here we follow the notation used in generate.py to go and look to the lp file already created
         an_instance = Instance(L=self.L, density=self.density, seed=self.seed, r=self.r, version="0.2")
         for node in range(round(self.L * self.L * self.density)):
             an_instance.add_node(node)
         folder = os.path.join("instances", f"L{self.L}")
+        extension = ".cliques.lp" if formulation == "clique" else ".lp"
+        if formulation == "clique" and (ER or self.rewiring_frac != 0):
+            raise ValueError("The clique formulation is only available for UDGs")
+        if store is not None and (ER or self.rewiring_frac != 0):
+            raise ValueError("The instance store only holds UDGs")
+        if archive is not None and (ER or self.rewiring_frac != 0):
+            raise ValueError("The archives only hold UDGs")
         if ER:
             self.path = os.path.join(folder, "ER", an_instance.name() + ".lp")
         elif self.rewiring_frac != 0:
@@ -55,12 +80,36 @@ class Optimizer:
                 "rewired",
                 an_instance.name() + "_rewired" + str(self.rewiring_frac) + ".lp",
             )
+        elif archive is not None:
+            # the model is built in memory, the path only names the logs
+            self.instance = Archive(archive, L, density, r).get(seed)
+            self.path = os.path.join(archive, self.instance.name() + extension)
+        elif store is not None:
+            # the instance is generated in the store if not there yet
+            instance_store = InstanceStore(store)
+            self.instance = instance_store.get(L, density, seed, r)
+            key = instance_store.key(L, density, seed, r)
+            self.path = os.path.join(
+                instance_store.folder(key), self.instance.name() + extension
+            )
         else:
-            self.path = os.path.join(folder, an_instance.name() + ".lp")
+            self.path = os.path.join(folder, an_instance.name() + extension)
+
+    def solver(self):
+        """
+        The backend which solves the instance
+        """
+        return get_backend(
+            self.backend,
+            TTS=self.TTS_bool,
+            threads=self.threads,
+            formulation=self.formulation,
+            tts_mode=self.tts_mode,
+        )
 
     def optimize(self, path_to_save):
         """
-        Here we run cplex, and we obtain some results that consider relevant for our experiments
+        Here we run the solver (cplex by default), and we obtain some results that consider relevant for our experiments
         """
         (
             tto_cplex,
@@ -70,8 +119,10 @@ class Optimizer:
             raw_time_diff_tts,
             time_diff_tts,
             sol,
-        ) = run_one_instance(self.path, TTS=self.TTS_bool, threads=self.threads)
-        path = os.path.join("data", "cplex", path_to_save + ".csv")
+        ) = self.solver().run(self.path, self.instance)
+        folder = os.path.join("data", self.backend)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, path_to_save + ".csv")
         if self.rewiring_frac != 0:
             opt_result = ResultRewired(
                 L=self.L,
@@ -0,0 +1,169 @@
+###############################################################################
+# // SPDX-License-Identifier: Apache-2.0
+# // Copyright 2023: Amazon Web Services, Inc
+###############################################################################
+from csv import DictReader, DictWriter, reader, writer
+from glob import glob
+from opt_result import headers
+
+import argparse
+import numpy as np
+import os
+import pandas as pd
+import socket
+
+
+class ResultStore:
+    """
+    This class stores the results of many optimizations (Result or ResultRewired, see opt_result.py) in batches, from several processes at once.
+    Each process appends its results to its own shard (a csv file with all the columns of SCHEMA, in the folder path + ".shards"), so no lock is needed.
+    Once the workers are done, merge appends the shards to the csv file at path and writes the same results in a columnar file next to it
+    (path with .parquet when pandas has a parquet engine, .npz otherwise), which load_results reads much faster than the csv.
+    Args:
+        path: the csv file of the results, e.g. data/cplex/L21.csv
+        batch_size: the number of results kept in memory before they are written to the shard
+    """
+
+    def __init__(self, path: str, batch_size: int = 100) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.buffer = []
+        self.shards = path + ".shards"
+        self.shard = os.path.join(
+            self.shards, f"{socket.gethostname()}-{os.getpid()}.csv"
+        )
+
+    def append(self, result) -> bool:
+        """
+        Add a result, returns True when the batch was full and the results were written to the shard
+        """
+        self.buffer.append(result.record())
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+            return True
+        return False
+
+    def flush(self) -> None:
+        """
+        Write the results in memory to the shard of this process (this is flushed to disk right away)
+        """
+        if not self.buffer:
+            return
+        os.makedirs(self.shards, exist_ok=True)
+        new_shard = not os.path.isfile(self.shard)
+        with open(self.shard, "a", newline="") as f_object:
+            writer_object = DictWriter(f_object, fieldnames=headers(rewired=True))
+            if new_shard:
+                writer_object.writeheader()
+            writer_object.writerows(self.buffer)
+            f_object.flush()
+            os.fsync(f_object.fileno())
+        self.buffer = []
+
+    def merge(self) -> int:
+        """
+        Append the results of all the shards (also those of processes which were killed) to the csv file, then rewrite the columnar file.
+        This must only run once the processes writing the shards are done. Returns the number of results merged.
+        """
+        self.flush()
+        shards = sorted(glob(os.path.join(self.shards, "*.csv")))
+        records = []
+        for shard in shards:
+            with open(shard, newline="") as f_object:
+                records += list(DictReader(f_object))
+        if records:
+            columns = self.columns(records)
+            new_file = not os.path.isfile(self.path) or os.path.getsize(self.path) == 0
+            with open(self.path, "a", newline="") as f_object:
+                writer_object = writer(f_object)
+                if new_file:
+                    writer_object.writerow(columns)
+                writer_object.writerows(
+                    [record[c] for c in columns] for record in records
+                )
+                f_object.flush()
+                os.fsync(f_object.fileno())
+            # the shards are only removed once their results are safely in the csv file
+            for shard in shards:
+                os.remove(shard)
+            os.rmdir(self.shards)
+        if os.path.isfile(self.path):
+            self.write_columnar()
+        return len(records)
+
+    def columns(self, records):
+        """
+        The columns of the csv file: its headings if it exists, else those of ResultRewired if some instances were rewired
+        Raises ValueError if some instances were rewired and the csv file exists without the column of the rewiring fraction
+        """
+        rewired = any(float(record["Frac Rewired"]) != 0 for record in records)
+        if os.path.isfile(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, newline="") as f_object:
+                columns = next(reader(f_object))
+            if rewired and "Frac Rewired" not in columns:
+                raise ValueError(
+                    f"{self.path} has no Frac Rewired column for the rewired results"
+                )
+            return columns
+        return headers(rewired)
+
+    def write_columnar(self) -> str:
+        """
+        Write all the results of the csv file in a columnar file, returns its path
+        """
+        df = pd.read_csv(self.path)
+        base = os.path.splitext(self.path)[0]
+        try:
+            df.to_parquet(base + ".parquet", index=False)
+            return base + ".parquet"
+        except ImportError:
+            # no parquet engine (pyarrow or fastparquet), one array per column instead
+            np.savez(base + ".npz", **{c: df[c].to_numpy() for c in df.columns})
+            return base + ".npz"
+
+
+def load_results(path: str) -> pd.DataFrame:
+    """
+    The results of a csv file, read from its columnar file when it is up to date (see ResultStore)
+    """
+    base = os.path.splitext(path)[0]
+    csv_time = os.path.getmtime(path) if os.path.isfile(path) else 0
+    if (
+        os.path.isfile(base + ".parquet")
+        and os.path.getmtime(base + ".parquet") >= csv_time
+    ):
+        return pd.read_parquet(base + ".parquet")
+    if os.path.isfile(base + ".npz") and os.path.getmtime(base + ".npz") >= csv_time:
+        with np.load(base + ".npz", allow_pickle=False) as data:
+            return pd.DataFrame({c: data[c] for c in data.files})
+    return pd.read_csv(path)
+
+
+def main():
+    """
+    Merge the shards of the results written by optimize.py --shard (run it once all the optimizations are done)
+    """
+    # not at the top: the backends need the generator and the solvers, reading the results does not
+    from backends import BACKENDS
+
+    parser = argparse.ArgumentParser(
+        prog="result_store.py",
+        description="Merge the shards of results into the csv and columnar files",
+    )
+    parser.add_argument(
+        "-path", "--path_to_save", required=True, type=str, help="Path of the results"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=list(BACKENDS),
+        default="cplex",
+        help="The solver of the results (default cplex), they are in data/{backend}",
+    )
+    args = parser.parse_args()
+
+    store = ResultStore(os.path.join("data", args.backend, args.path_to_save + ".csv"))
+    print(f"Merged {store.merge()} results into {store.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,10 @@
 # // Copyright 2023: Amazon Web Services, Inc
 ###############################################################################
 from docplex.mp.progress import ProgressListener, ProgressClock
+from docplex.mp.model import Model
 from docplex.mp.model_reader import ModelReader
 
+import numpy as np
 import time
 import os
 
@@ -46,12 +48,102 @@ class BestBoundAborter(ProgressListener):
                 self.abort()
 
 
+class IncumbentTimeline(ProgressListener):
+    """
+    Record the time at which each improving incumbent is found during a solve, to get the TTS from the same solve as the optimum.
+    Each entry of the timeline is (objective, CPLEX time, process time, wall time), the times being since the start of the solve.
+    """
+
+    def __init__(self, log_file_obj=None):
+        super(IncumbentTimeline, self).__init__(ProgressClock.Objective)
+        self.log_file_obj = log_file_obj
+        self.timeline = []
+        self.raw_time_start = time.process_time()
+        self.time_start = time.time()
+
+    def notify_start(self):
+        super(IncumbentTimeline, self).notify_start()
+        self.timeline = []
+        self.raw_time_start = time.process_time()
+        self.time_start = time.time()
+
+    def notify_progress(self, pdata):
+        super(IncumbentTimeline, self).notify_progress(pdata)
+        if pdata.has_incumbent:
+            self.timeline.append(
+                (
+                    pdata.current_objective,
+                    pdata.time,
+                    time.process_time() - self.raw_time_start,
+                    time.time() - self.time_start,
+                )
+            )
+            if self.log_file_obj:
+                self.log_file_obj.write(
+                    f"_____ INCUMBENT {pdata.current_objective} after {pdata.time}\n"
+                )
+
+    def time_to(self, sol_value: float, minimize: bool = False):
+        """
+        The (CPLEX time, process time, wall time) of the first incumbent as good as sol_value, None if there is none
+        """
+        for objective, cplex_time, raw_time, wall_time in self.timeline:
+            if (objective <= sol_value) if minimize else (objective >= sol_value):
+                return cplex_time, raw_time, wall_time
+        return None
+
+
+# How the TTS is measured: from the incumbents of the solve to optimality (single),
+# or by solving again until the optimum is found (replay)
+TTS_MODES = ["single", "replay"]
+
+# The formulations of the model: one constraint per edge, or per clique of a clique cover
+FORMULATIONS = ["edge", "clique"]
+
+
+def build_model(edges, num_nodes: int, name: str = "mis", cliques=None) -> Model:
+    """
+    Build the docplex model of an MIS instance in memory, the same formulation as Instance.cplex (without going through an lp file)
+    Args:
+        edges: the edges of the instance, as an (E,2) array or a list of pairs
+        num_nodes: the number of nodes (ids 0..num_nodes-1)
+        name: name of the model
+        cliques: if given, a list of cliques covering the edges, with one constraint per clique instead of one per edge
+    """
+    mdl = Model(name=name)
+    # the variables and constraints are created in batches (without names)
+    x = mdl.binary_var_list(num_nodes, name="x")
+    mdl.maximize(mdl.sum_vars(x))
+    if cliques is not None:
+        mdl.add_constraints_([mdl.sum_vars([x[i] for i in c]) <= 1 for c in cliques])
+    else:
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2).tolist()
+        mdl.add_constraints_([x[a] + x[b] <= 1 for a, b in edges])
+    return mdl
+
+
+def model_from_instance(instance, formulation: str = "edge") -> Model:
+    """
+    Build the docplex model of an Instance in memory (see build_model and FORMULATIONS)
+    """
+    if formulation not in FORMULATIONS:
+        raise ValueError(
+            f"Unknown formulation {formulation}, expected one of {FORMULATIONS}"
+        )
+    cliques = instance.cliques() if formulation == "clique" else None
+    return build_model(
+        instance.edge_array(), len(instance.nodes), instance.name(), cliques
+    )
+
+
 def run_cplex_once(
     path: str,
     log_file_path: str,
     TTS: bool = True,
     sol_value: float = None,
     threads: int = 0,
+    model: Model = None,
+    timeline: IncumbentTimeline = None,
 ):
     """
     Run CPLEX and log results
@@ -61,12 +153,20 @@ def run_cplex_once(
         TTS: is a boolean that when true it calculates first the solution, and then it runs again CPLEX to obtain the TTS by using the class above.
         sol_value: stopping criteria for TTS, should be the optimal solution. If TTS this argument is required
         threads: maximum number of threads to used by CPLEX, for default behavior set to 0
+        model: a model built in memory (see build_model) to optimize instead of reading the lp file, it can be reused between runs as the results of a previous solve are cleared
+        timeline: if given, it records the improving incumbents of the solve (see IncumbentTimeline)
     """
     if (TTS is True) and (sol_value is None):
         raise ValueError("To run TTS one need the target solution (sol_value)")
 
     print(f"Optimizing with CPLEX {path}, save log in {log_file_path}")
-    mdl = ModelReader.read(path, ignore_names=True)
+    if model is None:
+        mdl = ModelReader.read(path, ignore_names=True)
+    else:
+        mdl = model
+        # start from scratch: no listener, incumbent or solution of a previous run
+        mdl.clear_progress_listeners()
+        mdl.clean_before_solve = True
     log_file_obj = open(log_file_path, "w")
     mdl.context.solver.log_output = log_file_obj
     if threads != 0:
@@ -75,6 +175,9 @@ def run_cplex_once(
         mdl.add_progress_listener(
             BestBoundAborter(max_best_bound=sol_value, log_file_obj=log_file_obj)
         )
+    if timeline is not None:
+        timeline.log_file_obj = log_file_obj
+        mdl.add_progress_listener(timeline)
     time_bis = time.time()
     raw_time_start = time.process_time()
 
@@ -97,14 +200,25 @@ def run_cplex_once(
     )
 
 
-def run_one_instance(path: str, TTS: bool = True, threads: int = 0):
+def run_one_instance(
+    path: str,
+    TTS: bool = True,
+    threads: int = 0,
+    model: Model = None,
+    tts_mode: str = "single",
+):
     """
-    Run CPLEX on a lp file, if TTS, we run twice, first to find optimal, then to evaluate it's time to optimal solution.
+    Run CPLEX on a lp file, if TTS, we also evaluate the time to the optimal solution.
     Args:
         path: this is the string indicating the lp file to optimize
-        TTS: is a boolean that when true it calculates first the solution, and then it runs again CPLEX to obtain the TTS by using the class above.
+        TTS: is a boolean that when true it calculates first the solution, and then the time at which CPLEX found it.
         threads: number of threads to use
+        model: a model built in memory (see build_model), used for both runs instead of reading the lp file (path then only names the logs), else the lp file is read once
+        tts_mode: "single" takes the TTS from the incumbents recorded during the solve to optimality (one run),
+        "replay" runs CPLEX again from scratch until it finds the optimal value (two runs, as in the original experiments)
     """
+    if tts_mode not in TTS_MODES:
+        raise ValueError(f"Unknown TTS mode {tts_mode}, expected one of {TTS_MODES}")
 
     log_dir = os.path.join(os.path.dirname(path), "logs")
     if not os.path.isdir(log_dir):
@@ -113,12 +227,28 @@ def run_one_instance(path: str, TTS: bool = True, threads: int = 0):
     name = os.path.basename(path)[:-3]
     log_file_path = os.path.join(log_dir, name + "_cplex.log")
 
+    if model is None and TTS and tts_mode == "replay":
+        # the lp file is read once for both runs
+        model = ModelReader.read(path, ignore_names=True)
+
+    timeline = IncumbentTimeline() if TTS and tts_mode == "single" else None
     tto_cplex, raw_time_diff, time_diff, optimal_objective_value = run_cplex_once(
-        path, log_file_path=log_file_path, TTS=False, threads=threads
+        path,
+        log_file_path=log_file_path,
+        TTS=False,
+        threads=threads,
+        model=model,
+        timeline=timeline,
     )
-    # if we are required, we calculate the TTS by running one more time
     tts_cplex, raw_time_diff_tts, time_diff_tts = 0, 0, 0
-    if TTS:
+    if timeline is not None:
+        # the optimum was reported when found, or else only at the end of the solve
+        tts = timeline.time_to(optimal_objective_value)
+        if tts is None:
+            tts = tto_cplex, raw_time_diff, time_diff
+        tts_cplex, raw_time_diff_tts, time_diff_tts = tts
+    elif TTS:
+        # we calculate the TTS by running one more time
         log_file_path = os.path.join(log_dir, name + "_TTS" + "_cplex.log")
         tts_cplex, raw_time_diff_tts, time_diff_tts, _ = run_cplex_once(
             path,
@@ -126,6 +256,7 @@ def run_one_instance(path: str, TTS: bool = True, threads: int = 0):
             TTS=True,
             threads=threads,
             sol_value=optimal_objective_value,
+            model=model,
         )
 
     return (
@@ -0,0 +1,338 @@
+###############################################################################
+# // SPDX-License-Identifier: Apache-2.0
+# // Copyright 2023: Amazon Web Services, Inc
+###############################################################################
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from optimizer import Optimizer
+from result_store import ResultStore
+from backends import BACKENDS
+from run_cplex import FORMULATIONS, TTS_MODES
+
+from utils import format_radius, parse_seeds
+
+import argparse
+import os
+
+
+class Ledger:
+    """
+    This class keeps track of the jobs of a sweep that have been completed, in a text file with one key per line, so that a sweep which has been killed can be resumed without redoing solved instances
+    The key of a job also has the settings of the optimization, so that a job done with another backend, formulation or TTS mode is not skipped
+    """
+
+    def __init__(
+        self,
+        path: str,
+        backend: str = "cplex",
+        formulation: str = "edge",
+        tts_mode: str = "single",
+        TTS: bool = False,
+    ) -> None:
+        self.path = path
+        self.settings = [
+            f"backend={backend}",
+            f"formulation={formulation}",
+            f"tts_mode={tts_mode}",
+            f"TTS={int(TTS)}",
+        ]
+        self.done = set()
+        if os.path.isfile(path):
+            with open(path) as f_object:
+                self.done = set(line.strip() for line in f_object if line.strip())
+
+    def key(self, job: dict) -> str:
+        return " ".join(
+            [
+                f"L={job['L']}",
+                f"d={job['density']}",
+                f"s={job['seed']}",
+                f"r={format_radius(job['r'])}",
+                f"rewired={job['rewiring_frac']}",
+                f"ER={int(job['ER'])}",
+            ]
+            + self.settings
+        )
+
+    def __contains__(self, job: dict) -> bool:
+        return self.key(job) in self.done
+
+    def record(self, job: dict) -> None:
+        """
+        Mark a job as completed (this is flushed to disk right away)
+        """
+        key = self.key(job)
+        with open(self.path, "a") as f_object:
+            f_object.write(key + "\n")
+            f_object.flush()
+            os.fsync(f_object.fileno())
+        self.done.add(key)
+
+
+def make_jobs(Ls, seeds, radii, densities, rewiring_fracs=(0,), ER=False):
+    """
+    The list of jobs (one per instance) for all combinations of the parameters
+    """
+    return [
+        dict(L=L, seed=seed, r=r, density=density, rewiring_frac=frac, ER=ER)
+        for L, r, density, frac, seed in product(
+            Ls, radii, densities, rewiring_fracs, seeds
+        )
+    ]
+
+
+def run_job(
+    job: dict,
+    TTS: bool,
+    threads: int,
+    path_to_save: str,
+    store: str = None,
+    archive: str = None,
+    formulation: str = "edge",
+    tts_mode: str = "single",
+    backend: str = "cplex",
+):
+    """
+    Optimize the instance of a single job, this runs within a worker process
+    """
+    optimizer = Optimizer(
+        TTS_bool=TTS,
+        threads=threads,
+        store=store,
+        archive=archive,
+        formulation=formulation,
+        tts_mode=tts_mode,
+        backend=backend,
+        **job,
+    )
+    return optimizer.optimize(path_to_save)
+
+
+def run_sweep(
+    jobs,
+    ledger: Ledger,
+    workers: int = 1,
+    runner=run_job,
+    batch_size: int = 100,
+    **kwargs,
+) -> int:
+    """
+    Run all the jobs not yet in the ledger with up to `workers` jobs at a time.
+
+    Results are stored (and the jobs recorded in the ledger) by this process as
+    the jobs complete, in batches of `batch_size` in the shard of this process
+    (see ResultStore), which is flushed at the end. Other sweeps may write to
+    other shards at the same time, so merging the shards into the results file
+    is left to result_store.py once all of them are done.
+    A job is only recorded in the ledger once its result is on disk.
+    A job which fails is reported and the others go on, then a RuntimeError
+    is raised once all of them are done (the failed jobs are not recorded).
+    Returns the number of jobs which were run.
+    """
+    pending = [job for job in jobs if job not in ledger]
+    print(f"{len(jobs) - len(pending)} of {len(jobs)} jobs already done")
+    stores = {}
+    unrecorded = []
+
+    def record_stored():
+        for store in stores.values():
+            store.flush()
+        for job in unrecorded:
+            ledger.record(job)
+        unrecorded.clear()
+
+    def store_result(job, result):
+        if result.path not in stores:
+            stores[result.path] = ResultStore(result.path, batch_size)
+        unrecorded.append(job)
+        if stores[result.path].append(result):
+            record_stored()
+
+    failed = []
+
+    def report_failure(job, error):
+        print(f"job {ledger.key(job)} failed: {error!r}")
+        failed.append(job)
+
+    try:
+        if workers <= 1:
+            for job in pending:
+                try:
+                    result = runner(job, **kwargs)
+                except Exception as error:
+                    report_failure(job, error)
+                    continue
+                store_result(job, result)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(runner, job, **kwargs): job for job in pending
+                }
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except Exception as error:
+                        report_failure(futures[future], error)
+                        continue
+                    store_result(futures[future], result)
+    finally:
+        # the results of the completed jobs are kept even if the sweep fails
+        record_stored()
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(pending)} jobs failed")
+    return len(pending)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="sweep.py",
+        description="Optimize many instances with CPLEX, running several at once",
+    )
+    parser.add_argument(
+        "-L", type=int, nargs="+", required=True, help="The sizes of the lattice"
+    )
+    parser.add_argument(
+        "-d",
+        "--density",
+        type=float,
+        nargs="+",
+        default=[0.8],
+        help="Portions of the sites that are occupied (default = 0.8)",
+    )
+    parser.add_argument(
+        "-s",
+        "--seeds",
+        type=str,
+        required=True,
+        help="The seeds, given as a range start:stop or a list a,b,c",
+    )
+    parser.add_argument(
+        "-r",
+        "--radius",
+        type=float,
+        nargs="+",
+        default=[2 ** 0.5],
+        help="Radii of interaction. (default sqrt(2), i.e Union-Jack grid)",
+    )
+    parser.add_argument(
+        "-TTS", "--TTS_bool", action="store_true", help="Evaluate Time To Solution"
+    )
+    parser.add_argument(
+        "-path", "--path_to_save", required=True, type=str, help="Path to save results"
+    )
+    parser.add_argument(
+        "-c",
+        "--cores",
+        type=int,
+        default=os.cpu_count(),
+        help="Total number of cores to use (default: all)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of instances optimized at once (the cores are split among them)",
+    )
+    parser.add_argument(
+        "-rewiring_frac",
+        "--rewiring_frac",
+        type=int,
+        nargs="+",
+        default=[0],
+        help="Fractions of edges rewired",
+    )
+    parser.add_argument(
+        "-ER",
+        "--ER",
+        action="store_true",
+        help="Optimize Erdos–Renyi graphs",
+    )
+    parser.add_argument(
+        "--ledger",
+        type=str,
+        help="File recording completed jobs (default: data/{backend}/{path}.ledger)",
+    )
+    parser.add_argument(
+        "--store",
+        type=str,
+        help="Take the instances from this instance store (see store.py)",
+    )
+    parser.add_argument(
+        "--archive",
+        type=str,
+        help="Read the instances from the archives in this folder (see archive.py)",
+    )
+    parser.add_argument(
+        "--formulation",
+        choices=FORMULATIONS,
+        default="edge",
+        help="One constraint per edge, or per clique of a clique cover (default edge)",
+    )
+    parser.add_argument(
+        "--tts_mode",
+        choices=TTS_MODES,
+        default="single",
+        help="Take the TTS from the solve to optimality, or solve again (default single)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=list(BACKENDS),
+        default="cplex",
+        help="The solver (default cplex), the results are saved in data/{backend}",
+    )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=100,
+        help="Number of results written to disk at once (default 100)",
+    )
+    args = parser.parse_args()
+    if args.ER or any(args.rewiring_frac):
+        for name in ["store", "archive"]:
+            if getattr(args, name) is not None:
+                parser.error(f"--{name} only holds UDGs, not ER or rewired graphs")
+
+    jobs = make_jobs(
+        args.L,
+        parse_seeds(args.seeds),
+        args.radius,
+        args.density,
+        rewiring_fracs=args.rewiring_frac,
+        ER=args.ER,
+    )
+    ledger_path = args.ledger or os.path.join(
+        "data", args.backend, args.path_to_save + ".ledger"
+    )
+    os.makedirs(os.path.dirname(ledger_path) or ".", exist_ok=True)
+    threads = max(1, args.cores // args.jobs)
+    ledger = Ledger(
+        ledger_path,
+        backend=args.backend,
+        formulation=args.formulation,
+        tts_mode=args.tts_mode,
+        TTS=args.TTS_bool,
+    )
+    run_sweep(
+        jobs,
+        ledger,
+        workers=args.jobs,
+        TTS=args.TTS_bool,
+        threads=threads,
+        path_to_save=args.path_to_save,
+        store=args.store,
+        archive=args.archive,
+        formulation=args.formulation,
+        tts_mode=args.tts_mode,
+        batch_size=args.batch_size,
+        backend=args.backend,
+    )
+    print(
+        "Merge the results once all the sweeps are done: "
+        f"python3 optimization/result_store.py -path {args.path_to_save} "
+        f"--backend {args.backend}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+###############################################################################
+# // SPDX-License-Identifier: Apache-2.0
+# // Copyright 2023: Amazon Web Services, Inc
+###############################################################################
+"""ordering.py: Node orderings minimizing the frontier of sweeping-line solvers.
+
+The sweeping-line solvers (`solver.py`, `cpp/sweeping_line.cc`) process the
+nodes in the order of their ids, and their cost is exponential in the size of
+the frontier (see `solver.find_boundaries`). This module computes the frontier
+for several candidate orderings and relabels instances accordingly.
+"""
+
+import argparse
+import math
+import numpy as np
+
+from generator import Generator
+from instance import Instance
+from solver import find_boundaries
+from typing import Callable, Dict, List, Optional
+
+# An ordering maps an instance to the list of its node ids in the order
+# in which they should be processed.
+Ordering = Callable[[Instance], List[int]]
+
+
+def coordinates(instance: Instance):
+    """The x and y coordinates of the nodes (ordered by node id)."""
+    ids = sorted(instance.nodes)
+    x = np.array([instance.nodes[i]["x"] for i in ids])
+    y = np.array([instance.nodes[i]["y"] for i in ids])
+    return np.array(ids), x, y
+
+
+def column_order(instance: Instance) -> List[int]:
+    """Sweep column by column (the order of the ids from `Generator`)."""
+    ids, x, y = coordinates(instance)
+    return ids[np.lexsort((y, x))].tolist()
+
+
+def row_order(instance: Instance) -> List[int]:
+    """Sweep row by row."""
+    ids, x, y = coordinates(instance)
+    return ids[np.lexsort((x, y))].tolist()
+
+
+def diagonal_order(instance: Instance) -> List[int]:
+    """Sweep along the diagonals x + y = const."""
+    ids, x, y = coordinates(instance)
+    return ids[np.lexsort((x, x + y))].tolist()
+
+
+def antidiagonal_order(instance: Instance) -> List[int]:
+    """Sweep along the anti-diagonals x - y = const."""
+    ids, x, y = coordinates(instance)
+    return ids[np.lexsort((x, x - y))].tolist()
+
+
+def cuthill_mckee_order(instance: Instance) -> List[int]:
+    """Bandwidth minimizing Cuthill-McKee ordering (no coordinates needed)."""
+    from scipy.sparse.csgraph import reverse_cuthill_mckee
+
+    order = reverse_cuthill_mckee(instance.csr(), symmetric_mode=True)
+    return order[::-1].tolist()
+
+
+def reverse_cuthill_mckee_order(instance: Instance) -> List[int]:
+    """Reverse Cuthill-McKee ordering (no coordinates needed)."""
+    from scipy.sparse.csgraph import reverse_cuthill_mckee
+
+    return reverse_cuthill_mckee(instance.csr(), symmetric_mode=True).tolist()
+
+
+# The candidate orderings, by name
+ORDERINGS: Dict[str, Ordering] = {
+    "column": column_order,
+    "row": row_order,
+    "diagonal": diagonal_order,
+    "antidiagonal": antidiagonal_order,
+    "cm": cuthill_mckee_order,
+    "rcm": reverse_cuthill_mckee_order,
+}
+
+# The orderings which rely on the lattice coordinates of the nodes
+GEOMETRIC = ["column", "row", "diagonal", "antidiagonal"]
+
+
+def relabel(instance: Instance, order: List[int]) -> Instance:
+    """A copy of the instance with node `order[k]` relabelled as node k."""
+    params = {
+        k: v
+        for k, v in instance.__dict__.items()
+        if k not in ["nodes", "_edges", "_edge_array"]
+    }
+    relabelled = Instance(**params)
+    new_id = np.empty(len(order), dtype=np.int32)
+    new_id[order] = np.arange(len(order), dtype=np.int32)
+    for k, old in enumerate(order):
+        relabelled.add_node(k, **instance.nodes[old])
+    edges = np.sort(new_id[instance.edge_array()], axis=1)
+    edges = edges[np.lexsort((edges[:, 1], edges[:, 0]))]
+    relabelled.set_edges(edges)
+    return relabelled
+
+
+def adjacency(instance: Instance, order: Optional[List[int]] = None):
+    """Adjacency list of the instance, with nodes relabelled by `order`."""
+    if order is not None:
+        instance = relabel(instance, order)
+    return instance.adjacency()
+
+
+def frontier(instance: Instance, order: List[int]) -> Dict[str, int]:
+    """Statistics of the sweeping-line frontier when processing in `order`.
+
+    Returns the maximum and the sum of the frontier sizes over all steps, as
+    well as `work`, the sum of 2^size, which bounds the number of variants
+    the solvers have to keep track of.
+    """
+    boundaries = find_boundaries(adjacency(instance, order))
+    return {
+        "max": max(boundaries, default=0),
+        "sum": sum(boundaries),
+        "work": sum(2 ** b for b in boundaries),
+    }
+
+
+def compare_orderings(
+    instance: Instance, names: Optional[List[str]] = None
+) -> Dict[str, Dict[str, int]]:
+    """Frontier statistics for each candidate ordering.
+
+    Orderings relying on coordinates are skipped if the nodes have none
+    (e.g., for Erdos-Renyi or rewired graphs).
+    """
+    if names is None:
+        names = list(ORDERINGS)
+    has_coordinates = all("x" in node for node in instance.nodes.values())
+    results = {}
+    for name in names:
+        if name in GEOMETRIC and not has_coordinates:
+            continue
+        results[name] = frontier(instance, ORDERINGS[name](instance))
+    return results
+
+
+def best_ordering(results: Dict[str, Dict[str, int]]) -> str:
+    """The name of the ordering with the smallest frontier in `results`.
+
+    Orderings are compared by their maximum frontier first (which decides
+    whether the C++ tools can handle the instance at all) and by the
+    estimated work second.
+    """
+    return min(results, key=lambda n: (results[n]["max"], results[n]["work"]))
+
+
+def reorder(instance: Instance, name: str) -> Instance:
+    """Relabel the instance with the named ordering ("best" to pick one)."""
+    if name == "best":
+        name = best_ordering(compare_orderings(instance))
+    return relabel(instance, ORDERINGS[name](instance))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="ordering.py",
+        description="Compare node orderings for sweeping-line solvers",
+    )
+    parser.add_argument("-L", type=int, required=True, help="The size of the lattice")
+    parser.add_argument(
+        "-d",
+        "--density",
+        type=float,
+        default=0.8,
+        help="Portion of the sites that are occupied (default = 0.8)",
+    )
+    parser.add_argument(
+        "-s", "--seed", type=int, default=0, help="The seed to generate (default = 0)"
+    )
+    parser.add_argument(
+        "-r",
+        "--radius",
+        default=2 ** 0.5,
+        type=float,
+        help="Radius of interaction. (default sqrt(2), i.e Union-Jack grid)",
+    )
+    args = parser.parse_args()
+
+    instance = Generator(L=args.L, density=args.density, r=args.radius).generate(
+        seed=args.seed
+    )
+    results = compare_orderings(instance)
+    best = best_ordering(results)
+    print(f"{'ordering':>14} {'max':>5} {'sum':>8} {'log2(work)':>11}")
+    for name, stats in results.items():
+        marker = " *" if name == best else ""
+        log_work = math.log2(stats["work"])
+        print(
+            f"{name:>14} {stats['max']:>5} {stats['sum']:>8} {log_work:>11.2f}{marker}"
+        )
+
+
+if __name__ == "__main__":
+    main()
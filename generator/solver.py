@@ -8,15 +8,18 @@
 __author__ = "Ruben S. Andrist"
 __email__ = "randrist@amazon.com"
 
+import argparse
 import json
 import sys
+from typing import List, Optional, Tuple
 
 
-def main(argv):
-    # Usage: python solver.py some_instance.json
-    assert len(argv) == 2
-    assert argv[-1][-5:] == ".json"
-    with open(argv[-1]) as fh:
+def load_json(path: str) -> Tuple[int, List[List[int]]]:
+    """Load an instance in json format.
+
+    Returns the lattice size `L` and the adjacency list of each node.
+    """
+    with open(path) as fh:
         instance = json.load(fh)
     assert instance["problem"]["type"] == "mis"
 
@@ -34,72 +37,153 @@ def main(argv):
             nn += [[] for _ in range(N - len(nn))]
         nn[a] += [b]
         nn[b] += [a]
+    return L, nn
 
-    # Sweeping line solver
-    #
-    # We keep track of the best score (=mis size) for each possible assignment
-    # on the "frontier" (i.e., those nodes already treated but connected to
-    # nodes which haven't been treated yet).
-    #
-    # NOTE: This involves keeping track of at most 2^(L+1) variants since
-    # the size of the frontier is limited by the size of the lattice.
 
-    # Keep track of up to `max_candidates` actual assignments for printing
-    # after solution (the rest is just counted).
-    max_candidates = 5
+def load_binary(path: str, seed: Optional[int] = None) -> Tuple[int, List[List[int]]]:
+    """Load an instance from a binary container (see `Instance.binary`).
+
+    If `seed` is given, `path` is a shard of an archive (see `archive.py`)
+    and the instance of that seed is loaded from it.
+
+    Returns the lattice size `L` and the adjacency list of each node.
+    """
+    from archive import shard_offset
+    from instance import read_binary
+
+    offset = 0 if seed is None else shard_offset(path, seed)
+    params, _, indptr, indices = read_binary(path, offset)
+    neighbors = indices.tolist()
+    bounds = indptr.tolist()
+    nn = [neighbors[bounds[i] : bounds[i + 1]] for i in range(len(bounds) - 1)]
+    return params["L"], nn
+
+
+def find_boundaries(nn: List[List[int]]) -> List[int]:
+    """Find the boundaries assuming we are processing the nodes 0..N-1.
+
+    The boundary is the set of nodes that have been processed but are
+    still connected to at least 1 unprocessed node. We need to track
+    its state in the variant set because it still affects potential
+    assignment of that upcoming unprocessed node.
+
+    We calculate boundaries[i] as the distance between the first node
+    in the boundary to the last one (inclusive; in the ordering the
+    nodes are specified in the input), after processing node i. This is
+    the same as `find_boundaries` in cpp/sweeping_line.cc.
+    """
+    boundaries = []
+    # The number of processed neighbors of each node. Once this number
+    # grows to the size of the adjacency list of a node, it can be
+    # dropped from the boundary.
+    processed_neighbors = [0] * len(nn)
+    # Keep track of the earliest node in the boundary
+    # (increased as nodes have all their neighbors processed)
+    first_active = 0
+    for i in range(len(nn)):
+        for j in nn[i]:
+            processed_neighbors[j] += 1
+        while first_active <= i:
+            if processed_neighbors[first_active] < len(nn[first_active]):
+                break
+            first_active += 1
+        boundaries += [i - first_active + 1]
+    return boundaries
+
+
+def neighbor_masks(nn: List[List[int]]) -> List[int]:
+    """Bit masks of the already processed neighbors of each node.
+
+    Bit `i - j - 1` of mask i is set if node j < i is a neighbor of node i,
+    which is the position of node j in the key when node i is processed
+    (see `solve`). Node j is always within the boundary at that point,
+    since it is connected to node i which has not been processed yet.
+    """
+    masks = []
+    for i, neighbors in enumerate(nn):
+        mask = 0
+        for j in neighbors:
+            if j < i:
+                mask |= 1 << (i - j - 1)
+        masks += [mask]
+    return masks
+
+
+def solve(nn: List[List[int]], max_candidates: int = 5) -> Tuple[int, int, List[int]]:
+    """Sweeping line solver.
+
+    We keep track of the best score (=mis size) for each possible assignment
+    on the "frontier" (i.e., those nodes already treated but connected to
+    nodes which haven't been treated yet).
+
+    The assignment of the frontier is the key of each variant, as a bit mask
+    with bit 0 for the node processed last, bit 1 for the one before, etc.
+    After each node, the key is clipped to the boundary found from the
+    adjacency (see `find_boundaries`), which summarizes the variants over
+    nodes that no longer affect upcoming nodes. For each node we precompute
+    a mask of its neighbors on the frontier, so that checking whether it can
+    be added to the MIS is a single `&`.
+
+    NOTE: This involves keeping track of at most 2^max(boundaries) variants.
+    This is limited by the size of the lattice as long as the nodes are
+    processed in the order of the 2D representation, for any radius.
+
+    Args:
+      nn (list): adjacency list of each node
+      max_candidates (int): number of full assignments to keep track of
+        (0 to only count solutions, which is faster)
+
+    Returns:
+      (best, count, candidates): the mis size, the number of distinct
+      maximum independent sets, and up to `max_candidates` of them as bit
+      masks (bit i set if node i is in the set)
+    """
+    # Limit bits in the key to the boundary after each node
+    clips = [(1 << b) - 1 for b in find_boundaries(nn)]
+    masks = neighbor_masks(nn)
+
+    if max_candidates == 0:
+        return count_solutions(masks, clips)
 
     # Our initial variant set has only one entry with
-    # - the key "", meaning no nodes in the frontier (we haven't handled any)
-    # - the three values score=0, assignments=[""], count=1
-    #
-    # NOTE: The difference between the `key` and `assignments` is that the former
-    # only keeps track of the last `L+1` nodes, while assignments keeps up
-    # to `max_candidates` possible full assignments.
-    variants = {"": [0, [""], 1]}
+    # - the key 0, meaning no nodes in the frontier (we haven't handled any)
+    # - the three values score=0, count=1, assignments=[0]
+    variants = {0: (0, 1, [0])}
 
     # Handle each of the nodes in the lattice.
-    for i in range(N):
+    for i, (mask, clip) in enumerate(zip(masks, clips)):
         # The new variant set we build while handling node `i`
         nv = {}
-        for k, vs in variants.items():
-            cost, assignments, count = vs
-
-            # Check whether, for this variant, there is a neighbor
-            # set (this chan be checked purely in the key). If there
-            # is one set, it means we only need to generate child
-            # variants by appending '0', but not '1'.
-            neighbor_is_set = False
-            for j in nn[i]:
-                if j >= i:
-                    continue
-                if k[j - i] == "1":
-                    neighbor_is_set = True
-                    break
-
+        bit = 1 << i
+        # The bit of node `i` in the key (unless it is no longer in the
+        # boundary, i.e., it has no unprocessed neighbors)
+        own = clip & 1
+        for k, (cost, count, assignments) in variants.items():
             # Generate child variants by appending '0'
-            nk = k[-L - 1 :] + "0"
-            if nk not in nv or cost > nv[nk][0]:
+            nk = (k << 1) & clip
+            prev = nv.get(nk)
+            if prev is None or cost > prev[0]:
                 # We found a better score -> overwrite
-                na = [a + "0" for a in assignments]
-                nv[nk] = [cost, na, count]
-            elif cost == nv[nk][0]:
-                # We found a maching score, add the count
-                nv[nk][1] += [a + "0" for a in assignments]
-                nv[nk][1] = nv[nk][1][:max_candidates]
-                nv[nk][2] += count
-
-            # If no neighbor is set, also create child variants appending '1'
-            if not neighbor_is_set:
-                nk = k[-L - 1 :] + "1"
-                if nk not in nv or cost + 1 > nv[nk][0]:
+                nv[nk] = (cost, count, assignments)
+            elif cost == prev[0]:
+                # We found a matching score, add the count
+                na = (prev[2] + assignments)[:max_candidates]
+                nv[nk] = (cost, prev[1] + count, na)
+
+            # If no neighbor is set (checked purely in the key with the
+            # precomputed mask), also create child variants appending '1'
+            if not k & mask:
+                nk |= own
+                prev = nv.get(nk)
+                if prev is None or cost + 1 > prev[0]:
                     # We found a better score -> overwrite
-                    na = [a + "1" for a in assignments]
-                    nv[nk] = [cost + 1, na, count]
-                elif cost + 1 == nv[nk][0]:
+                    na = [a | bit for a in assignments]
+                    nv[nk] = (cost + 1, count, na)
+                elif cost + 1 == prev[0]:
                     # We found a matching score, add the count
-                    nv[nk][1] += [a + "1" for a in assignments]
-                    nv[nk][1] = nv[nk][1][:max_candidates]
-                    nv[nk][2] += count
+                    na = [a | bit for a in assignments]
+                    na = (prev[2] + na)[:max_candidates]
+                    nv[nk] = (cost + 1, prev[1] + count, na)
 
         # Swap the new variants into the main one
         variants = nv
@@ -108,27 +192,107 @@ def main(argv):
     best = 0
     candidates = []
     best_count = 0
-    for _, vs in variants.items():
-        cost, assignments, count = vs
+    for cost, count, assignments in variants.values():
         if cost > best:
             best = cost
             best_count = count
-            candidates = assignments
+            candidates = list(assignments)
         elif cost == best:
             best_count += count
             candidates += assignments
 
+    return best, best_count, candidates[:max_candidates]
+
+
+def count_solutions(
+    masks: List[int], clips: List[int]
+) -> Tuple[int, int, List[int]]:
+    """Sweeping line solver which only counts the solutions (see `solve`).
+
+    The scores and counts of the variants are kept in two separate maps,
+    which avoids creating a tuple for each new variant.
+    """
+    costs, counts = {0: 0}, {0: 1}
+    for mask, clip in zip(masks, clips):
+        own = clip & 1
+        next_costs, next_counts = {}, {}
+        get = next_costs.get
+        for k, cost in costs.items():
+            count = counts[k]
+            # Child variant appending '0'
+            nk = (k << 1) & clip
+            prev = get(nk, -1)
+            if cost > prev:
+                next_costs[nk] = cost
+                next_counts[nk] = count
+            elif cost == prev:
+                next_counts[nk] += count
+            # Child variant appending '1' (if no neighbor is set)
+            if not k & mask:
+                nk |= own
+                prev = get(nk, -1)
+                if cost + 1 > prev:
+                    next_costs[nk] = cost + 1
+                    next_counts[nk] = count
+                elif cost + 1 == prev:
+                    next_counts[nk] += count
+        costs, counts = next_costs, next_counts
+
+    best = max(costs.values())
+    best_count = sum(counts[k] for k, cost in costs.items() if cost == best)
+    return best, best_count, []
+
+
+def main(argv):
+    # Usage: python solver.py [-k 5] some_instance.json
+    parser = argparse.ArgumentParser(
+        prog="solver.py",
+        description="Solve unweighted MIS instances on Union Jack lattices",
+    )
+    parser.add_argument(
+        "instance",
+        type=str,
+        help="The instance in json or binary (.bin) format, or an archive shard (.mis)",
+    )
+    parser.add_argument(
+        "-s", "--seed", type=int, help="The seed of the instance in an archive shard"
+    )
+    # Keep track of up to `max_candidates` actual assignments for printing
+    # after solution (the rest is just counted).
+    parser.add_argument(
+        "-k",
+        "--max_candidates",
+        type=int,
+        default=5,
+        help="Number of solutions to print (default = 5, 0 to only count)",
+    )
+    args = parser.parse_args(argv[1:])
+    if args.instance.endswith(".mis"):
+        _, nn = load_binary(args.instance, args.seed)
+    elif args.instance.endswith(".bin"):
+        _, nn = load_binary(args.instance)
+    else:
+        assert args.instance[-5:] == ".json"
+        _, nn = load_json(args.instance)
+
+    max_candidates = args.max_candidates
+    best, best_count, candidates = solve(nn, max_candidates=max_candidates)
+
     # Print results to the screen
-    print("file:", argv[-1])
+    print("file:", args.instance)
+    if args.seed is not None:
+        print("seed:", args.seed)
     print(f"|mis|={best}")
     print(f"degeneracy={best_count}")
+    if max_candidates == 0:
+        return
     if best_count <= max_candidates:
         print("\nsolutions:")
     else:
         print(f"first {max_candidates} solutions:")
 
-    for candidate in candidates[:max_candidates]:
-        print([i for i, v in enumerate(candidate) if v == "1"])
+    for candidate in candidates:
+        print([i for i in range(len(nn)) if (candidate >> i) & 1])
     print()
     print("NOTE: Node indices are 0-indexed!")
 
@@ -0,0 +1,227 @@
+###############################################################################
+# // SPDX-License-Identifier: Apache-2.0
+# // Copyright 2023: Amazon Web Services, Inc
+###############################################################################
+
+"""store.py: Persistent on-disk cache of generated MIS instances."""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from generate import EXTENSIONS, write_instance
+from generator import Generator, __version__
+from instance import Instance
+from utils import format_radius
+
+
+class InstanceStore:
+    """Cache of instances on disk, keyed by their generation parameters.
+
+    Each instance is stored once, as compact binary arrays (the coordinates of
+    the nodes and the edges) in its own folder, whose name is a hash of
+    (L, density, seed, r, version). Looking up an instance is therefore a
+    single path computation. The other formats (cplex, metis, json, ...) are
+    only rendered into the folder of the instance when first requested.
+
+    If `max_bytes` is given, the least recently used instances are evicted
+    when the store grows beyond that size (the time of last use is the
+    modification time of the folder, so it is shared between processes).
+    The store is only scanned for the sizes of the instances when they are
+    needed (see `usage`), so opening it and looking up instances is cheap.
+    """
+
+    # The file holding the nodes and edges of each instance
+    DATA = "instance.npz"
+    # The file holding the name of each instance (see Instance.name)
+    NAME = "name.txt"
+
+    def __init__(
+        self, root: str = os.path.join("instances", "store"), max_bytes: int = None
+    ) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+        self._usage = None
+
+    @property
+    def usage(self) -> OrderedDict:
+        """The size of each entry in bytes, from the least to the most
+        recently used (the store is scanned on first use)."""
+        if self._usage is None:
+            entries = []
+            for prefix in os.scandir(self.root):
+                if not prefix.is_dir():
+                    continue
+                for entry in os.scandir(prefix.path):
+                    if entry.is_dir():
+                        entries.append((entry.stat().st_mtime, entry.name))
+            self._usage = OrderedDict(
+                (key, self.entry_size(key)) for _, key in sorted(entries)
+            )
+        return self._usage
+
+    @staticmethod
+    def key(L: int, density: float, seed: int, r: float, version: str = __version__):
+        """The key of an instance, a hash of its generation parameters."""
+        params = json.dumps(
+            {
+                "L": L,
+                "density": density,
+                "seed": seed,
+                "r": format_radius(r),
+                "version": version,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha1(params.encode()).hexdigest()
+
+    def folder(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def entry_size(self, key: str) -> int:
+        return sum(e.stat().st_size for e in os.scandir(self.folder(key)))
+
+    def name(self, key: str) -> Optional[str]:
+        """The name of a stored instance (None if unknown), without loading it."""
+        try:
+            with open(os.path.join(self.folder(key), self.NAME)) as fh:
+                return fh.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.isfile(os.path.join(self.folder(key), self.DATA))
+
+    def __len__(self) -> int:
+        return len(self.usage)
+
+    def size(self) -> int:
+        """The total size of the instances in the store, in bytes."""
+        return sum(self.usage.values())
+
+    def get(
+        self, L: int, density: float = 0.8, seed: int = 0, r: float = 2 ** 0.5
+    ) -> Instance:
+        """The instance for these parameters, generated only if not stored yet."""
+        key = self.key(L, density, seed, r)
+        if key in self:
+            self.touch(key)
+            return self.load(key)
+        instance = Generator(L=L, density=density, r=r).generate(seed=seed)
+        self.put(key, instance)
+        return instance
+
+    def path(
+        self,
+        fmt: str,
+        L: int,
+        density: float = 0.8,
+        seed: int = 0,
+        r: float = 2 ** 0.5,
+    ) -> str:
+        """The path of the instance in a format (see generate.FORMATS).
+
+        The file is rendered on first use and kept in the store afterwards,
+        the instance is only loaded (or generated) to render it.
+        """
+        key = self.key(L, density, seed, r)
+        folder = self.folder(key)
+        name = self.name(key)
+        if name is not None and key in self:
+            path = os.path.join(folder, name + EXTENSIONS[fmt])
+            if os.path.isfile(path):
+                self.touch(key)
+                return path
+        instance = self.get(L, density, seed, r)
+        path = os.path.join(folder, instance.name() + EXTENSIONS[fmt])
+        if name is None:
+            # stored before the names were
+            self.write_name(key, instance)
+        # write_instance never leaves a partially written file
+        write_instance(folder, r, [fmt], None, instance)
+        self.record(key)
+        return path
+
+    def put(self, key: str, instance: Instance) -> None:
+        """Store an instance (with the nodes and edges only)."""
+        folder = self.folder(key)
+        os.makedirs(folder, exist_ok=True)
+        params = {
+            k: v
+            for k, v in instance.__dict__.items()
+            if k not in ["nodes", "_edges", "_edge_array"]
+        }
+        ids = sorted(instance.nodes)
+        # nodes without coordinates (e.g., of ER graphs) are stored at (-1, -1)
+        nodes = [instance.nodes[i] for i in ids]
+        coordinates = np.array(
+            [[node.get("x", -1), node.get("y", -1)] for node in nodes], dtype=np.int32
+        ).reshape(-1, 2)
+        self.write_name(key, instance)
+        fd, tmp = tempfile.mkstemp(dir=folder, suffix=".npz")
+        with os.fdopen(fd, "wb") as fh:
+            np.savez(
+                fh,
+                params=np.array(json.dumps(params)),
+                ids=np.array(ids, dtype=np.int32),
+                coordinates=coordinates,
+                edges=instance.edge_array(),
+            )
+        os.replace(tmp, os.path.join(folder, self.DATA))
+        self.record(key)
+
+    def write_name(self, key: str, instance: Instance) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.folder(key), suffix=".txt")
+        with os.fdopen(fd, "w") as fh:
+            fh.write(instance.name())
+        os.replace(tmp, os.path.join(self.folder(key), self.NAME))
+
+    def record(self, key: str) -> None:
+        """Update the size of an instance which was written to, then evict."""
+        if self._usage is not None:
+            self._usage[key] = self.entry_size(key)
+            self._usage.move_to_end(key)
+        self.evict(keep=key)
+
+    def load(self, key: str) -> Instance:
+        """Load a stored instance."""
+        with np.load(os.path.join(self.folder(key), self.DATA)) as data:
+            params: Dict[str, Any] = json.loads(str(data["params"]))
+            instance = Instance(**params)
+            # The radius is stored formatted already (see Instance.__init__)
+            instance.r = params["r"]
+            for i, (x, y) in zip(data["ids"].tolist(), data["coordinates"].tolist()):
+                if x < 0:
+                    instance.add_node(i)
+                else:
+                    instance.add_node(i, x=x, y=y)
+            instance.set_edges(data["edges"])
+        return instance
+
+    def touch(self, key: str) -> None:
+        """Mark an instance as used now."""
+        os.utime(self.folder(key))
+        if self._usage is not None:
+            if key not in self._usage:
+                self._usage[key] = self.entry_size(key)
+            self._usage.move_to_end(key)
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Remove the least recently used instances until within `max_bytes`."""
+        if self.max_bytes is None:
+            return
+        total = self.size()
+        for key in list(self.usage):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= self.usage.pop(key)
+            shutil.rmtree(self.folder(key), ignore_errors=True)
@@ -7,8 +7,8 @@
 __author__ = "Ruben S. Andrist"
 __email__ = "randrist@amazon.com"
 
-
-from typing import Any, Dict
+import io
+from typing import Any, Dict, TextIO
 
 
 class Svg:
@@ -103,27 +103,34 @@ class Svg:
 
         This should be called after all nodes and edges have been added.
         """
+        buffer = io.StringIO()
+        self.write(buffer)
+        return buffer.getvalue()
+
+    def write(self, fh: TextIO) -> None:
+        """Render the graph as a svg directly into an open file."""
         s = self.scale
         L = self.L
-        svg = self.tag(
-            "svg",
-            height=L * s,
-            width=L * s,
-            viewBox=self.viewBox(s),
-            xmlns="http://www.w3.org/2000/svg",
+        fh.write(
+            self.tag(
+                "svg",
+                height=L * s,
+                width=L * s,
+                viewBox=self.viewBox(s),
+                xmlns="http://www.w3.org/2000/svg",
+            )
         )
 
-        svg += self.tag("g", indent=2, id="edges")
+        fh.write(self.tag("g", indent=2, id="edges"))
         for e in self.edges:
-            svg += self.render_edge(*e)
-        svg += self.tag("g", indent=2, closed=True)
-        svg += self.tag("g", indent=2, id="nodes")
+            fh.write(self.render_edge(*e))
+        fh.write(self.tag("g", indent=2, closed=True))
+        fh.write(self.tag("g", indent=2, id="nodes"))
         for n in self.nodes:
-            svg += self.render_node(n)
-        svg += self.tag("g", indent=2, closed=True)
-        svg += self.tag("g", indent=2, id="labels")
+            fh.write(self.render_node(n))
+        fh.write(self.tag("g", indent=2, closed=True))
+        fh.write(self.tag("g", indent=2, id="labels"))
         for i, n in enumerate(self.nodes):
-            svg += self.render_label(n["x"], n["y"], str(i))
-        svg += self.tag("g", indent=2, closed=True)
-        svg += self.tag("svg", closed=True)
-        return svg
+            fh.write(self.render_label(n["x"], n["y"], str(i)))
+        fh.write(self.tag("g", indent=2, closed=True))
+        fh.write(self.tag("svg", closed=True))
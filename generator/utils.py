@@ -3,20 +3,70 @@
 # // Copyright 2023: Amazon Web Services, Inc
 ###############################################################################
 import math
+from functools import lru_cache
+from typing import List, Set, Tuple
+
+import numpy as np
+
+# Table of the lattice offsets (x, y) != (0, 0) with |x|, |y| <= bound, sorted
+# by squared distance (then x, then y). It is extended when a larger radius
+# is requested, so the offsets within any radius r are a prefix of the table.
+_offsets = {"bound": 0, "xy": np.empty((0, 2), dtype=int), "d2": np.empty(0, dtype=int)}
 
 
 def format_radius(r):
     return math.ceil(r * 1000) / 1000
 
 
-def generate_all_radius(L_max):
+def lattice_offsets(r: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The lattice offsets (as an (n,2) array) and their squared distances,
+    sorted by squared distance, including at least all offsets within radius r
+    """
+    if _offsets["bound"] < r:
+        bound = max(math.ceil(r), 2 * _offsets["bound"])
+        x, y = np.meshgrid(np.arange(-bound, bound + 1), np.arange(-bound, bound + 1))
+        x, y = x.ravel(), y.ravel()
+        d2 = x ** 2 + y ** 2
+        # only keep the offsets within the disk of radius `bound`, for which
+        # the table is complete
+        keep = (0 < d2) & (d2 <= bound ** 2)
+        x, y, d2 = x[keep], y[keep], d2[keep]
+        order = np.lexsort((y, x, d2))
+        _offsets.update(bound=bound, xy=np.stack([x, y], axis=1)[order], d2=d2[order])
+    return _offsets["xy"], _offsets["d2"]
+
+
+@lru_cache(maxsize=None)
+def directions_within(r: float) -> Tuple[Tuple[int, int], ...]:
+    """
+    The directions to the grid points within the disk of radius r (excluding
+    the origin), ordered by x and then y
+    """
+    xy, d2 = lattice_offsets(r)
+    prefix = xy[: np.searchsorted(d2, r ** 2, side="right")]
+    return tuple(sorted(map(tuple, prefix.tolist())))
+
+
+@lru_cache(maxsize=None)
+def _all_radius(L_max: int) -> frozenset:
+    r_max = 2 ** 0.5 * L_max
+    _, d2 = lattice_offsets(r_max)
+    d2 = np.unique(d2[: np.searchsorted(d2, r_max ** 2, side="right")])
+    return frozenset(format_radius(math.sqrt(d)) for d in d2.tolist())
+
+
+def generate_all_radius(L_max) -> Set[float]:
     """
-    Generate directions to grid points with the disk of radius r using brute force
+    The distinct distances (see format_radius) between the points of a lattice
+    of size L_max, up to sqrt(2) L_max (looked up in the table of offsets)
     """
-    radius = set()
-    r_max = 2**0.5 * L_max
-    for x in range(-math.floor(r_max), math.floor(r_max) + 1):
-        for y in range(-math.floor(r_max), math.floor(r_max) + 1):
-            if 0 < x**2 + y**2 <= r_max**2 and x <= L_max and y <= L_max:
-                radius.add(format_radius((x**2 + y**2) ** 0.5))
-    return radius
+    return set(_all_radius(L_max))
+
+
+def parse_seeds(seeds: str) -> List[int]:
+    """Parse a range of seeds `start:stop` (stop excluded) or a list `a,b,c`."""
+    if ":" in seeds:
+        start, stop = seeds.split(":")
+        return list(range(int(start), int(stop)))
+    return [int(s) for s in seeds.split(",")]
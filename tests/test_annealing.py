@@ -0,0 +1,100 @@
+###############################################################################
+# // SPDX-License-Identifier: Apache-2.0
+# // Copyright 2023: Amazon Web Services, Inc
+###############################################################################
+import math
+
+import numpy as np
+import pytest
+
+from annealing import Replicas, anneal, anneal_instance, anneal_parallel, main, tts
+from generator import Generator
+from solver import solve
+
+
+def is_independent(nn, nodes):
+    nodes = set(nodes)
+    return all(j not in nodes for i in nodes for j in nn[i])
+
+
+def check_invariants(state, nn):
+    for row in range(state.R):
+        in_set = state.in_set[row]
+        adjacent = [sum(in_set[j] for j in nn[i]) for i in range(state.N)]
+        assert state.adjacent[row].tolist() == adjacent
+        assert is_independent(nn, np.flatnonzero(in_set))
+        assert state.size[row] == in_set.sum()
+        order, position = state.order[row], state.position[row]
+        assert (order[position] == np.arange(state.N)).all()
+        # the nodes in the set, then vacant, single and other nodes
+        size, vacant, single = state.size[row], state.vacant[row], state.single[row]
+        assert in_set[order[:size]].all()
+        assert state.adjacent[row, order[size:vacant]].tolist() == [0] * (
+            vacant - size
+        )
+        assert (state.adjacent[row, order[vacant:single]] == 1).all()
+        assert (state.adjacent[row, order[single:]] > 1).all()
+
+
+def test_replicas():
+    instance = Generator(L=6, density=0.8, r=2).generate(seed=0)
+    nn = instance.adjacency()
+    state = Replicas(nn, 8, np.random.default_rng(0))
+    state.init()
+    check_invariants(state, nn)
+    # the sets are maximal after the initial greedy fill
+    assert (state.vacant == state.size).all()
+    for step in range(200):
+        state.step(beta=1.0 + step)
+    check_invariants(state, nn)
+    assert state.n_moves == 200
+    assert (state.n_accepted > 0).all()
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+@pytest.mark.parametrize("r", [1, 2**0.5, 2])
+def test_anneal(seed, r):
+    instance = Generator(L=6, density=0.8, r=r).generate(seed=seed)
+    nn = instance.adjacency()
+    best = solve(nn, max_candidates=0)[0]
+    result = anneal(nn, target=best, replicas=50, steps=16, seed=seed)
+    assert result["best"] == best
+    assert len(result["nodes"]) == best
+    assert is_independent(nn, result["nodes"])
+    assert 0 < result["hits"] <= 50
+    assert result["time_to_target"] is not None
+    assert result["time_to_best"] <= result["time"]
+    assert 0 < result["acceptance_rate"] <= 1
+
+
+def test_tts():
+    result = dict(hits=10, replicas=100, time=2.0)
+    assert tts(result) == pytest.approx(0.02 * math.log(0.01) / math.log(0.9))
+    assert tts(dict(result, hits=100)) == 0.02
+    assert tts(dict(result, hits=0)) == math.inf
+
+
+def test_anneal_parallel():
+    instance = Generator(L=6, density=0.8, r=2).generate(seed=1)
+    best = solve(instance.adjacency(), max_candidates=0)[0]
+    result = anneal_instance(instance, target=best, replicas=21, workers=2, steps=8)
+    assert result["replicas"] == 21
+    assert result["best"] == best
+    assert result["hits"] > 0
+    assert result["process_time_to_best"] <= result["process_time"]
+    # the random numbers of each process only depend on the seed
+    nn = instance.adjacency()
+    runs = [anneal_parallel(nn, replicas=21, workers=2, steps=4, seed=5) for _ in "ab"]
+    for key in ["best", "nodes", "hits"]:
+        assert runs[0][key] == runs[1][key]
+
+
+def test_main(tmp_path, capsys):
+    instance = Generator(L=5, density=0.8, r=2).generate(seed=0)
+    path = tmp_path / "instance.json"
+    path.write_text(instance.json())
+    best, _, _ = solve(instance.adjacency(), max_candidates=0)
+    main(["annealing.py", str(path), "--target", str(best), "--replicas", "20"])
+    out = capsys.readouterr().out
+    assert f"|is|={best}\n" in out
+    assert "tts99=" in out
@@ -0,0 +1,69 @@
+###############################################################################
+# // SPDX-License-Identifier: Apache-2.0
+# // Copyright 2023: Amazon Web Services, Inc
+###############################################################################
+import os
+
+import pytest
+from archive import Archive, record, shard_offset, shard_order
+from generator import Generator
+from solver import load_binary
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = Archive(str(tmp_path), L=6, density=0.8, r=2, shard_size=4)
+    generator = Generator(L=6, density=0.8, r=2)
+    seeds = [0, 2, 3, 5, 9]
+    assert archive.extend(generator.generate_many(seeds, process=record)) == 5
+    return archive
+
+
+def test_archive(archive, tmp_path):
+    # seeds 0..3, 4..7 and 8..11 go to three shards
+    assert len(os.listdir(tmp_path)) == 3
+    assert archive.seeds() == [0, 2, 3, 5, 9]
+    assert 5 in archive
+    assert 4 not in archive and 12 not in archive
+    with pytest.raises(KeyError):
+        archive.get(1)
+    with pytest.raises(KeyError):
+        archive.get(13)
+
+
+@pytest.mark.parametrize("seed", [0, 5, 9])
+def test_get(archive, seed):
+    expected = Generator(L=6, density=0.8, r=2).generate(seed=seed)
+    instance = archive.get(seed)
+    assert instance.name() == expected.name()
+    assert instance.nodes == expected.nodes
+    assert instance.edges == expected.edges
+    params, _, indptr, _ = archive.read(seed)
+    assert params["seed"] == seed
+    assert len(indptr) == len(expected.nodes) + 1
+
+
+def test_replace(archive):
+    instance = Generator(L=6, density=0.8, r=2).generate(seed=3)
+    archive.append(*record(instance))
+    assert archive.seeds() == [0, 2, 3, 5, 9]
+    assert archive.get(3).edges == instance.edges
+
+
+def test_load_binary(archive):
+    path = archive.shard_path(9)
+    assert shard_offset(path, 9) == archive.offset(9)
+    L, nn = load_binary(path, seed=9)
+    assert L == 6
+    assert nn == archive.get(9).adjacency()
+
+
+def test_order(archive, tmp_path):
+    assert shard_order(archive.shard_path(0)) is None
+    instance = Generator(L=6, density=0.8, r=2).generate(seed=1)
+    ordered = Archive(str(tmp_path), L=6, density=0.8, r=2, shard_size=4, order="rcm")
+    with pytest.raises(ValueError):
+        ordered.append(*record(instance))
+    assert 1 not in archive
+    ordered.append(*record(Generator(L=6, density=0.8, r=2).generate(seed=12)))
+    assert shard_order(ordered.shard_path(12)) == "rcm"
@@ -0,0 +1,132 @@
+###############################################################################
+# // SPDX-License-Identifier: Apache-2.0
+# // Copyright 2023: Amazon Web Services, Inc
+###############################################################################
+import os
+
+import pytest
+from backends import (
+    BACKENDS,
+    SweepingLineBackend,
+    available_backends,
+    get_backend,
+    lp_instance,
+    read_lp,
+)
+from generator import Generator
+from optimizer import Optimizer
+from solver import solve
+
+
+@pytest.fixture
+def instance():
+    return Generator(L=7, density=0.8, r=2).generate(seed=4)
+
+
+def write_lp(instance, folder, cliques=False):
+    path = os.path.join(folder, instance.name() + (".cliques.lp" if cliques else ".lp"))
+    with open(path, "w") as fh:
+        instance.write_cplex(fh, cliques)
+    return path
+
+
+@pytest.mark.parametrize("cliques", [False, True])
+def test_read_lp(instance, tmp_path, cliques):
+    params, num_nodes, constraints = read_lp(write_lp(instance, tmp_path, cliques))
+    assert params == dict(version="0.2", L=7, density=0.8, seed=4, r=2.0)
+    assert num_nodes == len(instance.nodes)
+    if cliques:
+        assert constraints == instance.cliques()
+    else:
+        assert constraints == [list(edge) for edge in instance.edges]
+
+    loaded = lp_instance(write_lp(instance, tmp_path, cliques))
+    assert loaded.name() == instance.name()
+    assert loaded.edges == instance.edges
+
+
+@pytest.mark.parametrize("name", ["highs", "dp", "branch_reduce"])
+@pytest.mark.parametrize("formulation", ["edge", "clique"])
+def test_backends(instance, tmp_path, name, formulation):
+    expected = solve(instance.adjacency(), max_candidates=0)[0]
+    backend = get_backend(name, TTS=True, formulation=formulation)
+    in_memory = backend.run(write_lp(instance, tmp_path), instance)
+    assert len(in_memory) == 7
+    assert in_memory[-1] == expected
+    # the TTS of exact solvers is their time to optimum
+    assert in_memory[3:6] == in_memory[:3]
+    from_file = backend.run(write_lp(instance, tmp_path, formulation == "clique"))
+    assert from_file[-1] == expected
+
+    backend = get_backend(name, TTS=False)
+    assert backend.run(write_lp(instance, tmp_path), instance)[3:6] == (0, 0, 0)
+
+
+@pytest.mark.parametrize("name", ["cplex", "cpsat"])
+def test_optional_backends(instance, tmp_path, name):
+    if name not in available_backends():
+        with pytest.raises(ValueError):
+            get_backend(name)
+        return
+    expected = solve(instance.adjacency(), max_candidates=0)[0]
+    results = get_backend(name, TTS=True).run(write_lp(instance, tmp_path), instance)
+    assert results[-1] == expected
+    assert 0 < results[3] <= results[0]
+
+
+def test_sa_backend(instance, tmp_path):
+    expected = solve(instance.adjacency(), max_candidates=0)[0]
+    backend = get_backend("sa", TTS=True)
+    results = backend.run(write_lp(instance, tmp_path), instance)
+    assert len(results) == 7
+    # the annealing is a heuristic, it finds the mis of small instances
+    assert results[-1] == expected
+    assert results[3] <= results[0]
+    assert get_backend("sa").run(write_lp(instance, tmp_path))[3:6] == (0, 0, 0)
+
+
+def test_get_backend_unknown():
+    assert set(available_backends()) <= set(BACKENDS)
+    with pytest.raises(ValueError):
+        get_backend("gurobi")
+
+
+def test_sweeping_line_backend(instance, tmp_path):
+    executable = tmp_path / "sweeping_line"
+    executable.write_text(
+        '#!/bin/sh\necho "found L=7"\necho "|MSI| #GS #1E"\necho "11 4 20"\n'
+    )
+    executable.chmod(0o755)
+    backend = SweepingLineBackend(executable=str(executable), TTS=True)
+    results = backend.run(write_lp(instance, tmp_path), instance)
+    assert results[-1] == 11
+    assert results[3:6] == results[:3]
+    # the metis file written by generate.py next to the lp file is used
+    lp = write_lp(instance, tmp_path)
+    with open(lp[:-3] + ".txt", "w") as fh:
+        instance.write_metis(fh)
+    assert backend.run(lp)[-1] == 11
+
+    executable.write_text(
+        '#!/bin/sh\necho "[ERR] Found instance bigger than L=63."\nexit 1\n'
+    )
+    with pytest.raises(RuntimeError):
+        backend.run(lp)
+
+
+def test_optimizer_backend(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    optimizer = Optimizer(L=6, seed=1, store="store", TTS_bool=True, backend="dp")
+    result = optimizer.optimize("test")
+    assert result.path == os.path.join("data", "dp", "test.csv")
+    assert result.sol == solve(optimizer.instance.adjacency(), max_candidates=0)[0]
+    result.store_results()
+    assert os.path.isfile(result.path)
+
+
+@pytest.mark.parametrize("source", ["store", "archive"])
+def test_optimizer_udg_only(source):
+    with pytest.raises(ValueError):
+        Optimizer(L=6, seed=1, ER=True, **{source: "folder"})
+    with pytest.raises(ValueError):
+        Optimizer(L=6, seed=1, rewiring_frac=5, **{source: "folder"})
@@ -0,0 +1,124 @@
+###############################################################################
+# // SPDX-License-Identifier: Apache-2.0
+# // Copyright 2023: Amazon Web Services, Inc
+###############################################################################
+import sys
+
+import networkx as nx
+import pytest
+
+from branch_reduce import (
+    BranchAndReduce,
+    bits,
+    bitset_adjacency,
+    edge_clique_cover,
+    main,
+    solve,
+    solve_instance,
+)
+from generator import Generator
+from solver import solve as sweeping_line
+
+
+def is_independent(nn, nodes):
+    nodes = set(nodes)
+    return all(j not in nodes for i in nodes for j in nn[i])
+
+
+def test_bitsets():
+    adj = bitset_adjacency([[1, 2], [0], [0]])
+    assert adj == [0b110, 0b1, 0b1]
+    assert list(bits(0b101001)) == [0, 3, 5]
+    solver = BranchAndReduce(adj)
+    assert solver.components(adj, 0b111) == [0b111]
+    assert solver.components(adj, 0b110) == [0b010, 0b100]
+    assert solver.upper_bound(adj, 0b111) == 2
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("r", [1, 2**0.5, 2, 3, 4])
+def test_solve_udg(seed, r):
+    instance = Generator(L=6, density=0.8, r=r).generate(seed=seed)
+    nn = instance.adjacency()
+    best, nodes = solve_instance(instance)
+    assert best == sweeping_line(nn, max_candidates=0)[0]
+    assert len(nodes) == best
+    assert is_independent(nn, nodes)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_solve_random(seed):
+    graph = nx.gnp_random_graph(16, 0.1 + 0.02 * seed, seed=seed)
+    nn = [sorted(graph[i]) for i in range(16)]
+    best, nodes = solve(nn)
+    expected = max(len(c) for c in nx.find_cliques(nx.complement(graph)))
+    assert best == expected
+    assert len(nodes) == best
+    assert is_independent(nn, nodes)
+
+    # the linear relaxation bounds every subproblem (also with folded nodes)
+    solver = BranchAndReduce(bitset_adjacency(nn))
+    solver.LP_MIN_NODES = 0
+    best, taken = solver.solve()
+    assert best == expected
+    assert is_independent(nn, bits(taken))
+
+
+@pytest.mark.parametrize("L, r, expected", [(18, 4, 23), (21, 6, 16)])
+def test_solve_mid_size(L, r, expected):
+    # large radii, beyond the frontier of the sweeping line (sizes from HiGHS)
+    instance = Generator(L=L, density=0.8, r=r).generate(seed=1)
+    nn = instance.adjacency()
+    solver = BranchAndReduce(bitset_adjacency(nn))
+    best, taken = solver.solve()
+    assert best == expected
+    assert is_independent(nn, bits(taken))
+    assert solver.lps > 0
+
+
+def test_edge_clique_cover():
+    instance = Generator(L=6, density=0.8, r=2).generate(seed=0)
+    adj = bitset_adjacency(instance.adjacency())
+    cover = edge_clique_cover(adj)
+    covered = {(a, b) for c in cover for a in bits(c) for b in bits(c) if a < b}
+    assert covered == set(map(tuple, instance.edge_array().tolist()))
+
+
+def test_run_depth():
+    # the searches nest deeper than the recursion limit of Python
+    def chain(depth):
+        if depth == 0:
+            return 0, 0
+        size, taken = yield chain(depth - 1)
+        return size + 1, taken | (1 << depth)
+
+    depth = 2 * sys.getrecursionlimit()
+    assert BranchAndReduce.run(chain(depth)) == (depth, (1 << (depth + 1)) - 2)
+
+
+def test_reductions():
+    # A path of 5 nodes is reduced without branching
+    nn = [[1], [0, 2], [1, 3], [2, 4], [3]]
+    solver = BranchAndReduce(bitset_adjacency(nn))
+    assert solver.solve() == (3, 0b10101)
+    assert solver.branches == 0
+    # A cycle of 6 nodes needs a degree 2 fold
+    nn = [[(i - 1) % 6, (i + 1) % 6] for i in range(6)]
+    solver = BranchAndReduce(bitset_adjacency(nn))
+    best, taken = solver.solve()
+    assert best == 3 and is_independent(nn, bits(taken))
+    assert solver.folds > 0
+    # Two twins of degree 3 with independent neighbors are folded
+    graph = nx.complete_bipartite_graph(2, 3)
+    nn = [sorted(graph[i]) for i in range(5)]
+    solver = BranchAndReduce(bitset_adjacency(nn))
+    assert solver.solve() == (3, 0b11100)
+
+
+def test_main(tmp_path, capsys):
+    instance = Generator(L=5, density=0.8, r=2).generate(seed=0)
+    path = tmp_path / "instance.json"
+    path.write_text(instance.json())
+    main(["branch_reduce.py", str(path)])
+    best, _, _ = sweeping_line(instance.adjacency(), max_candidates=0)
+    assert f"|mis|={best}\n" in capsys.readouterr().out
@@ -7,8 +7,9 @@ import os
 import shutil
 import sys
 from io import StringIO
+from archive import Archive
 from generator import Generator
-from generate import main
+from generate import main, parse_seeds, write_instance
 
 
 @pytest.fixture
@@ -45,8 +46,40 @@ def test_main_all_formats(instance, tmpdir):
     assert os.path.isfile(os.path.join(folder, instance.name() + ".lp"))
     assert os.path.isfile(os.path.join(folder, instance.name() + ".txt"))
     assert os.path.isfile(os.path.join(folder, instance.name() + ".json"))
-    assert os.path.isfile(os.path.join(folder, instance.name() + ".pkl"))
     assert os.path.isfile(os.path.join(folder, instance.name() + ".edgelist"))
+    assert os.path.isfile(os.path.join(folder, instance.name() + ".npz"))
+    assert os.path.isfile(os.path.join(folder, instance.name() + ".npy"))
+    assert os.path.isfile(os.path.join(folder, instance.name() + ".bits.npy"))
+    assert os.path.isfile(os.path.join(folder, instance.name() + ".bin"))
+    # the dense pickle and the clique cover are only written when selected
+    assert not os.path.isfile(os.path.join(folder, instance.name() + ".pkl"))
+    assert not os.path.isfile(os.path.join(folder, instance.name() + ".cliques.lp"))
+    # no temporary files are left behind
+    assert len(os.listdir(folder)) == 9
+
+
+def test_main_pickle(instance, tmpdir):
+    folder = os.path.join(tmpdir, f"instances{os.sep}L{instance.L}")
+    sys.argv = [
+        "generator.py",
+        "-L",
+        str(instance.L),
+        "-d",
+        str(instance.density),
+        "-s",
+        "42",
+        "-r",
+        str(instance.r),
+        "-a",
+        "-p",
+        "-q",
+        "-f",
+        folder,
+    ]
+    main()
+    assert os.path.isfile(os.path.join(folder, instance.name() + ".pkl"))
+    assert os.path.isfile(os.path.join(folder, instance.name() + ".cliques.lp"))
+    assert os.path.isfile(os.path.join(folder, instance.name() + ".npz"))
 
 
 def test_main_one_format(instance, tmpdir):
@@ -75,6 +108,14 @@ def test_main_one_format(instance, tmpdir):
     assert not os.path.isfile(os.path.join(folder, instance.name() + ".edgelist"))
 
 
+def test_write_instance_failure(instance, tmpdir):
+    # the clique cover of a graph which is not a UDG fails after the .lp file
+    instance.add_edge(0, len(instance.nodes) - 1)
+    with pytest.raises(ValueError):
+        write_instance(str(tmpdir), instance.r, ["cplex", "cliques"], None, instance)
+    assert os.listdir(tmpdir) == []
+
+
 def test_main_verbose(instance, capsys):
     ascii_fig = "\n o       o \n |       |\n o       o \n  \\     / \n   o   o   \n  /|\\ / \\ \n o-o-o   o \n |/"
     sys.argv = [
@@ -112,3 +153,49 @@ def test_main_dry(instance, tmpdir):
         main()
     assert pytest_wrapped_e.type == SystemExit
     assert pytest_wrapped_e.value.code == 0
+
+
+def test_main_seeds(tmpdir):
+    contents = []
+    for jobs in ["1", "2"]:
+        folder = os.path.join(tmpdir, f"jobs{jobs}")
+        sys.argv = ["generator.py", "-L", "6", "--seeds", "0:5", "--jobs", jobs]
+        sys.argv += ["-c", "-m", "-f", folder]
+        with pytest.raises(SystemExit):
+            main()
+        files = sorted(os.listdir(folder))
+        assert len(files) == 10
+        contents += [[open(os.path.join(folder, f)).read() for f in files]]
+    assert contents[0] == contents[1]
+
+
+def test_main_archive(tmpdir, capsys):
+    folder = os.path.join(tmpdir, "archive")
+    args = ["generator.py", "-L", "6", "--seeds", "0:3", "--archive", "-f", folder]
+    sys.argv = args + ["-o", "rcm"]
+    with pytest.raises(SystemExit):
+        main()
+    assert Archive(folder, 6, r=2 ** 0.5).seeds() == [0, 1, 2]
+    # the records of an archive all have the same ordering
+    for order in [["-o", "column"], []]:
+        sys.argv = args + order
+        with pytest.raises(ValueError):
+            main()
+    # the archive only holds binary records
+    sys.argv = args + ["-o", "rcm", "-c"]
+    with pytest.raises(SystemExit):
+        main()
+    assert "--archive writes binary records" in capsys.readouterr().err
+
+
+def test_parse_seeds():
+    assert parse_seeds("3:6") == [3, 4, 5]
+    assert parse_seeds("1,5,7") == [1, 5, 7]
+
+
+def test_generate_many():
+    generator = Generator(L=6, density=0.7, r=2)
+    expected = [generator.generate(seed=s).cplex() for s in [4, 2, 9]]
+    for workers in [1, 2]:
+        instances = generator.generate_many([4, 2, 9], workers=workers)
+        assert [instance.cplex() for instance in instances] == expected
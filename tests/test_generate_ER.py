@@ -0,0 +1,92 @@
+###############################################################################
+# // SPDX-License-Identifier: Apache-2.0
+# // Copyright 2023: Amazon Web Services, Inc
+###############################################################################
+import itertools
+import os
+import sys
+
+import numpy as np
+import pytest
+from networkx import erdos_renyi_graph
+from generate_ER import (
+    generate_ER_graph,
+    gnm_edges,
+    gnp_edges_fast,
+    gnp_edges_networkx,
+    main,
+    pair_edges,
+    save_ER_graphs,
+    udg_num_edges,
+)
+
+
+def test_pair_edges():
+    pairs = list(itertools.combinations(range(7), 2))
+    assert pair_edges(np.arange(len(pairs)), 7).tolist() == [list(p) for p in pairs]
+
+
+@pytest.mark.parametrize("N, p", [(20, 0.3), (100, 0.05), (30, 0), (30, 1)])
+def test_gnp_edges_networkx(N, p):
+    graph = erdos_renyi_graph(n=N, p=p, seed=np.random.RandomState(4))
+    edges = gnp_edges_networkx(N, p, np.random.RandomState(4))
+    assert edges.tolist() == [list(e) for e in graph.edges]
+
+
+def test_gnp_edges_fast():
+    N, p = 200, 0.1
+    edges = gnp_edges_fast(N, p, np.random.default_rng(0))
+    assert (edges[:, 0] < edges[:, 1]).all()
+    assert len(np.unique(edges, axis=0)) == len(edges)
+    expected = p * N * (N - 1) / 2
+    assert abs(len(edges) - expected) < 5 * expected ** 0.5
+    again = gnp_edges_fast(N, p, np.random.default_rng(0))
+    assert (edges == again).all()
+
+
+def test_gnm_edges():
+    edges = gnm_edges(50, 300, np.random.default_rng(1))
+    assert len(np.unique(edges, axis=0)) == 300
+    assert (edges[:, 0] < edges[:, 1]).all()
+    with pytest.raises(ValueError):
+        gnm_edges(5, 11, np.random.default_rng(1))
+
+
+def test_generate_ER_graph():
+    instance = generate_ER_graph(L=5, density=0.8, seed=0)
+    assert len(instance.nodes) == 20
+    assert instance.name() == "N20_d0.8_s0_r1.415"
+    fast = generate_ER_graph(L=5, density=0.8, seed=0, method="fast")
+    assert len(fast.nodes) == 20
+    num_edges = udg_num_edges(L=5, density=0.8, seed=0, r=2 ** 0.5)
+    matched = generate_ER_graph(L=5, density=0.8, seed=0, num_edges=num_edges)
+    assert matched.num_edges() == num_edges
+    with pytest.raises(ValueError):
+        generate_ER_graph(L=5, density=0.8, seed=0, method="slow")
+
+
+def test_save_ER_graphs(tmp_path):
+    folder = str(tmp_path / "L{L}" / "ER")
+    seeds = list(save_ER_graphs([0, 1, 2], folder, ["cplex", "metis"], L=5, workers=2))
+    assert seeds == [0, 1, 2]
+    files = sorted(os.listdir(tmp_path / "L5" / "ER"))
+    assert files[:2] == ["N20_d0.8_s0_r1.415.lp", "N20_d0.8_s0_r1.415.txt"]
+    assert len(files) == 6
+    with open(tmp_path / "L5" / "ER" / "N20_d0.8_s1_r1.415.txt") as fh:
+        assert fh.read() == generate_ER_graph(L=5, density=0.8, seed=1).metis()
+
+
+def test_main_all(tmp_path, monkeypatch):
+    argv = ["generate_ER.py", "-L", "5", "-s", "3", "-f", str(tmp_path)]
+    monkeypatch.setattr(sys, "argv", argv + ["-a"])
+    main()
+    files = sorted(os.listdir(tmp_path))
+    # all the formats which do not need coordinates
+    assert len(files) == 8
+    assert "N20_d0.8_s3_r1.415.lp" in files
+    assert not any(name.endswith((".svg", ".cliques.lp")) for name in files)
+
+    for flag in ["-g", "-q"]:
+        monkeypatch.setattr(sys, "argv", argv + [flag])
+        with pytest.raises(SystemExit):
+            main()
@@ -0,0 +1,115 @@
+###############################################################################
+# // SPDX-License-Identifier: Apache-2.0
+# // Copyright 2023: Amazon Web Services, Inc
+###############################################################################
+import os
+import random
+import sys
+from functools import partial
+
+import numpy as np
+import pytest
+from generator import Generator
+from generate_rewired_graph import (
+    Rewirer,
+    generate_rewired_graph,
+    main,
+    rewired_instances,
+    step_rng,
+    write_rewired_instances,
+)
+
+
+@pytest.fixture
+def instance():
+    return Generator(L=8, density=0.8, r=2 ** 0.5).generate(seed=0)
+
+
+def test_rewire(instance):
+    original = instance.edges
+    rewirer = Rewirer(instance.nodes, sorted(original), rng=random.Random(1))
+    rewirer.rewire(20)
+    edges = set(map(tuple, rewirer.edges().tolist()))
+    # the number of edges is preserved, without self loops
+    assert len(edges) == len(original)
+    assert all(u < v for u, v in edges)
+    # each rewire removes one untouched edge (and adds a new one)
+    assert len(rewirer.untouched) == len(original) - 20
+    assert set(rewirer.untouched) <= original
+    assert 0 < len(original - edges) <= 20
+
+
+def test_rewire_all(instance):
+    rewirer = Rewirer(instance.nodes, sorted(instance.edges), rng=random.Random(2))
+    rewirer.rewire(instance.num_edges())
+    assert rewirer.untouched == []
+    with pytest.raises(ValueError):
+        rewirer.rewire(1)
+
+
+def test_rewire_full_graph():
+    rewirer = Rewirer([0, 1, 2], [(0, 1), (0, 2), (1, 2)], rng=random.Random(0))
+    with pytest.raises(ValueError):
+        rewirer.rewire(1)
+    # the graph is left unchanged
+    assert rewirer.edges().tolist() == [[0, 1], [0, 2], [1, 2]]
+    assert sorted(rewirer.untouched) == [(0, 1), (0, 2), (1, 2)]
+
+
+def test_step_rng():
+    # each (seed, step) has its own reproducible stream
+    assert step_rng(3, 1).random() == step_rng(3, 1).random()
+    assert step_rng(3, 1).random() != step_rng(3, 2).random()
+    assert step_rng(3, 1).random() != step_rng(4, 1).random()
+
+
+def test_rewired_instances(instance):
+    steps = list(rewired_instances(instance, 2 ** 0.5, num_points=4))
+    assert len(steps) == 4
+    assert [s.name() for s in steps] == [instance.name()] * 4
+    for step in steps:
+        assert step.num_edges() == instance.num_edges()
+        assert step.nodes == instance.nodes
+    # the steps are reproducible
+    again = list(rewired_instances(instance, 2 ** 0.5, num_points=4))
+    for a, b in zip(steps, again):
+        assert (a.edge_array() == b.edge_array()).all()
+
+
+def test_generate_rewired_graph(tmp_path):
+    folder = str(tmp_path / "L{L}")
+    for seed in [0, 1]:
+        generate_rewired_graph(
+            8, 0.8, 2 ** 0.5, seed, num_points=3, folder=folder, formats=["cplex", "npy"]
+        )
+    files = sorted(os.listdir(tmp_path / "L8"))
+    assert len(files) == 2 * 3 * 2
+    assert "N51_d0.8_s0_r1.415_rewired2.lp" in files
+
+    # the same files are written when the seeds are spread over workers
+    process = partial(
+        write_rewired_instances, str(tmp_path / "pool"), 2 ** 0.5, ["npy"], None, 3
+    )
+    generator = Generator(L=8, density=0.8, r=2 ** 0.5)
+    assert list(generator.generate_many([0, 1], workers=2, process=process)) == [0, 1]
+    for name in os.listdir(tmp_path / "pool"):
+        assert (
+            np.load(tmp_path / "pool" / name) == np.load(tmp_path / "L8" / name)
+        ).all()
+
+
+def test_main_all(tmp_path, monkeypatch):
+    folder = str(tmp_path / "L{L}")
+    argv = ["generate_rewired_graph.py", "-L", "6", "--seeds", "0:1"]
+    argv += ["--num_points", "2", "-f", folder]
+    monkeypatch.setattr(sys, "argv", argv + ["-a"])
+    main()
+    files = os.listdir(tmp_path / "L6")
+    assert "N29_d0.8_s0_r1.415_rewired1.svg" in files
+    # the rewired graphs have no clique cover
+    assert not any(name.endswith(".cliques.lp") for name in files)
+    assert len(files) == 2 * 9
+
+    monkeypatch.setattr(sys, "argv", argv + ["-q"])
+    with pytest.raises(SystemExit):
+        main()
@@ -4,6 +4,10 @@
 ###############################################################################
 # test_generator.py
 
+import random
+
+import networkx as nx
+import numpy as np
 import pytest
 from generator import Generator
 
@@ -36,3 +40,75 @@ gn = Generator
 )
 def test_action_with_parametrization(test_input, expected):
     assert gn.generate_all_directions(test_input) == expected
+
+
+def test_disk_adjacency():
+    directions = gn.generate_all_directions(1)
+    # (-1, 0) and (1, 0) are at distance 2, (-1, 0) and (0, -1) at sqrt(2)
+    assert gn.generate_disk_adjacency(directions) == [0, 0, 0, 0]
+    directions = gn.generate_all_directions(2 ** 0.5)
+    adjacency = gn.generate_disk_adjacency(directions)
+    # (-1, -1) is connected to (-1, 0) and (0, -1)
+    assert adjacency[0] == (1 << 1) | (1 << 3)
+
+
+def flood_fill_reference(grid, directions, x, y):
+    """Whether all occupied sites stay connected when removing (x,y)."""
+    L = len(grid)
+    sites = [(u, v) for u in range(L) for v in range(L) if grid[u][v]]
+    sites = [site for site in sites if site != (x, y)]
+    visited = {sites[0]}
+    queue = [sites[0]]
+    for a, b in queue:
+        for dx, dy in directions:
+            u, v = a + dx, b + dy
+            if 0 <= u < L and 0 <= v < L and grid[u][v] and (u, v) != (x, y):
+                if (u, v) not in visited:
+                    visited.add((u, v))
+                    queue += [(u, v)]
+    return len(visited) == len(sites)
+
+
+@pytest.mark.parametrize("r", [1, 2 ** 0.5, 2, 3])
+def test_can_remove(r):
+    g = Generator(L=9, density=0.5, r=r)
+    rng = random.Random(7)
+    for _ in range(20):
+        grid = [[int(rng.random() < 0.6) for _ in range(9)] for _ in range(9)]
+        # only consider grids which start out connected
+        if not flood_fill_reference(grid, g.directions, -1, -1):
+            continue
+        for x in range(9):
+            for y in range(9):
+                if grid[x][y]:
+                    expected = flood_fill_reference(grid, g.directions, x, y)
+                    assert g.can_remove(grid, x, y) == expected
+
+
+@pytest.mark.parametrize("density, r", [(0.3, 1), (0.5, 2 ** 0.5), (0.8, 3)])
+def test_generate_connected(density, r):
+    instance = Generator(L=12, density=density, r=r).generate(seed=3)
+    G = instance.to_networkx_graph()
+    assert G.number_of_nodes() == round(144 * density)
+    assert nx.is_connected(G)
+
+
+@pytest.mark.parametrize("r", [1, 2 ** 0.5, 3])
+def test_generate_edges(r):
+    g = Generator(L=10, density=0.7, r=r)
+    g.rng = random.Random(5)
+    occupied = g.generate_occupancy()
+    grid = g.occupancy_to_grid(occupied)
+    # Reference: loop over all sites and directions
+    expected = []
+    for x in range(10):
+        for y in range(10):
+            for dx, dy in g.directions:
+                u, v = x + dx, y + dy
+                if 0 <= u < 10 and 0 <= v < 10:
+                    a, b = grid[x][y], grid[u][v]
+                    if a is not None and b is not None and a < b:
+                        expected += [(a, b)]
+    edges = g.generate_edges(occupied)
+    assert edges.dtype == np.int32
+    assert [tuple(e) for e in edges.tolist()] == expected
@@ -4,9 +4,12 @@
 ###############################################################################
 # test_instance.py
 
+import io
 import json
+import numpy as np
 import pytest
-from instance import Instance
+from generator import Generator
+from instance import Instance, read_binary
 
 
 @pytest.fixture
@@ -83,6 +86,13 @@ def test_metis(instance):
     assert metis
     # test metis string starts with '%'
     assert metis.startswith("%")
+    # test the graph size and the (1-based, sorted) adjacency lists
+    assert metis.endswith("\n4 4 0\n2 3\n1 4\n1 4\n2 3\n")
+
+
+def test_adjacency(instance):
+    assert instance.adjacency() == [[1, 2], [0, 3], [0, 3], [1, 2]]
+    assert instance.adjacency(offset=1)[0] == [2, 3]
 
 
 def test_pickle(instance, tmp_path):
@@ -98,6 +108,128 @@ def test_pickle(instance, tmp_path):
     assert adj == [[0, 1, 1, 0], [1, 0, 0, 1], [1, 0, 0, 1], [0, 1, 1, 0]]
 
 
+def test_npz(instance, tmp_path):
+    from scipy.sparse import load_npz
+
+    filename = tmp_path / "test.npz"
+    instance.npz(filename)
+    adj = load_npz(filename).toarray()
+    assert adj.tolist() == [[0, 1, 1, 0], [1, 0, 0, 1], [1, 0, 0, 1], [0, 1, 1, 0]]
+
+
+def test_npy(instance, tmp_path):
+    filename = tmp_path / "test.npy"
+    instance.npy(filename)
+    edges = np.load(filename)
+    assert edges.dtype == np.int32
+    assert set(map(tuple, edges.tolist())) == instance.edges
+
+
+def test_bits(instance, tmp_path):
+    filename = tmp_path / "test.bits.npy"
+    instance.bits(filename)
+    adj = np.unpackbits(np.load(filename), axis=1)[:, :4]
+    assert adj.tolist() == [[0, 1, 1, 0], [1, 0, 0, 1], [1, 0, 0, 1], [0, 1, 1, 0]]
+
+
+def test_binary(instance, tmp_path):
+    filename = tmp_path / "test.bin"
+    instance.binary(filename)
+    params, coordinates, indptr, indices = read_binary(filename)
+    assert params == dict(L=5, density=0.5, seed=123, r=1.0, version="1.0")
+    assert isinstance(coordinates, np.memmap)
+    assert coordinates.tolist() == [[0, 0], [1, 0], [0, 1], [1, 1]]
+    assert indptr.tolist() == [0, 2, 4, 6, 8]
+    assert indices.tolist() == [1, 2, 0, 3, 0, 3, 1, 2]
+
+    loaded = Instance.from_binary(filename)
+    assert loaded.name() == instance.name()
+    assert loaded.nodes == instance.nodes
+    assert loaded.edges == instance.edges
+    assert loaded.metis() == instance.metis()
+
+
+def test_binary_invalid(instance, tmp_path):
+    filename = tmp_path / "test.npy"
+    instance.npy(filename)
+    with pytest.raises(ValueError):
+        read_binary(filename)
+
+
 def test_edgelist(instance):
     expected = "0, 1\n0, 2\n2, 3\n1, 3"
     assert instance.edgelist() == expected
+
+
+def test_set_edges(instance):
+    edges = instance.edge_array()
+    assert edges.shape == (4, 2)
+    other = Instance(L=5, density=0.5, seed=123, r=1, version="1.0")
+    other.nodes = instance.nodes
+    other.set_edges(np.array([[0, 1], [0, 2], [1, 3], [2, 3]]))
+    assert other.num_edges() == 4
+    assert other.edges == instance.edges
+    assert other.cplex() == instance.cplex()
+    other.add_edge(3, 0)
+    assert other.num_edges() == 5
+    assert [0, 3] in other.edge_array().tolist()
+
+
+@pytest.mark.parametrize("fmt", ["json", "svg", "cplex", "metis", "edgelist"])
+def test_write(instance, fmt):
+    buffer = io.StringIO()
+    getattr(instance, "write_" + fmt)(buffer)
+    assert buffer.getvalue() == getattr(instance, fmt)()
+
+
+def test_cplex_constraints(instance):
+    cplex = instance.cplex()
+    assert "  obj: x0 + x1 + x2 + x3\n" in cplex
+    for j, (a, b) in enumerate(instance.edges):
+        assert f"  e{j}: x{a} + x{b} <= 1\n" in cplex
+    assert cplex.endswith("\nBinary\n  x0\n  x1\n  x2\n  x3\nEnd\n")
+
+
+def test_cplex_cliques(instance):
+    cplex = instance.cplex(cliques=True)
+    # the square of the fixture has no triangle, each clique is an edge
+    for j, (a, b) in enumerate(instance.cliques()):
+        assert f"  c{j}: x{a} + x{b} <= 1\n" in cplex
+    assert " e0: " not in cplex
+    buffer = io.StringIO()
+    instance.write_cplex(buffer, cliques=True)
+    assert buffer.getvalue() == cplex
+
+
+@pytest.mark.parametrize("r", [1, 2 ** 0.5, 2, 3])
+def test_cliques(r):
+    instance = Generator(L=8, density=0.8, r=r).generate(seed=1)
+    cliques = instance.cliques()
+    edges = set(instance.edges)
+    covered = set()
+    for clique in cliques:
+        pairs = {(a, b) for a in clique for b in clique if a < b}
+        # every pair of nodes of a clique is an edge
+        assert pairs <= edges
+        covered |= pairs
+    assert covered == edges
+    # no clique is contained in another one
+    sets = [set(c) for c in cliques]
+    assert not any(a < b for a in sets for b in sets)
+    # with r = 1 there is no triangle, otherwise the cover is smaller
+    assert len(cliques) <= len(edges)
+    assert len(cliques) < len(edges) or r == 1
+
+
+def test_cliques_not_udg(instance):
+    instance.add_edge(0, 3)
+    instance.add_node(4, x=3, y=3)
+    instance.add_edge(0, 4)
+    with pytest.raises(ValueError):
+        instance.cliques()
+    other = Instance(L=5, density=0.5, seed=123, r=1, version="1.0")
+    other.add_node(0)
+    other.add_node(1)
+    other.add_edge(0, 1)
+    with pytest.raises(ValueError):
+        other.cliques()
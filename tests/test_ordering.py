@@ -0,0 +1,61 @@
+###############################################################################
+# // SPDX-License-Identifier: Apache-2.0
+# // Copyright 2023: Amazon Web Services, Inc
+###############################################################################
+# test_ordering.py
+
+import pytest
+import ordering
+from generator import Generator
+from instance import Instance
+from solver import solve
+
+
+@pytest.fixture
+def instance():
+    return Generator(L=6, density=0.8, r=2).generate(seed=1)
+
+
+@pytest.mark.parametrize("name", list(ordering.ORDERINGS))
+def test_orderings(instance, name):
+    order = ordering.ORDERINGS[name](instance)
+    assert sorted(order) == list(instance.nodes)
+    relabelled = ordering.relabel(instance, order)
+    assert relabelled.num_edges() == instance.num_edges()
+    assert relabelled.name() == instance.name()
+    # the solution does not depend on the order in which nodes are processed
+    best, count, _ = solve(relabelled.adjacency(), max_candidates=0)
+    assert (best, count) == solve(instance.adjacency(), max_candidates=0)[:2]
+
+
+def test_column_order(instance):
+    # the generator assigns ids column by column
+    assert ordering.column_order(instance) == list(instance.nodes)
+
+
+def test_relabel():
+    inst = Instance(L=2, density=1.0, seed=0, r=1, version="1.0")
+    for i, (x, y) in enumerate([(0, 0), (0, 1), (1, 0), (1, 1)]):
+        inst.add_node(i, x=x, y=y)
+    inst.add_edge(0, 1)
+    inst.add_edge(0, 2)
+    inst.add_edge(1, 3)
+    inst.add_edge(2, 3)
+    relabelled = ordering.relabel(inst, ordering.row_order(inst))
+    assert relabelled.nodes[1] == {"x": 1, "y": 0}
+    assert relabelled.edges == {(0, 1), (0, 2), (1, 3), (2, 3)}
+
+
+def test_frontier():
+    instance = Generator(L=5, density=1.0, r=2 ** 0.5).generate(seed=0)
+    stats = ordering.frontier(instance, ordering.column_order(instance))
+    # Union Jack connections reach back L+1 nodes
+    assert stats["max"] == 6
+
+
+def test_compare_orderings_without_coordinates(instance):
+    graph = Instance(L=6, density=0.8, seed=1, r=2, version="1.0")
+    graph.add_networkx_graph(instance.to_networkx_graph())
+    results = ordering.compare_orderings(graph)
+    assert set(results) == {"cm", "rcm"}
+    assert ordering.best_ordering(results) in results
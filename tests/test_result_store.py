@@ -0,0 +1,167 @@
+###############################################################################
+# // SPDX-License-Identifier: Apache-2.0
+# // Copyright 2023: Amazon Web Services, Inc
+###############################################################################
+import csv
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from opt_result import Result, ResultRewired, headers
+from result_store import ResultStore, load_results, main
+
+
+def make_result(path, seed, **params):
+    return Result(
+        L=5,
+        density=0.8,
+        seed=seed,
+        r=1.415,
+        tto_cplex=0.1234567,
+        raw_time_diff=0.2,
+        time_diff=0.3,
+        tts_cplex=0.05,
+        raw_time_diff_tts=0.1,
+        time_diff_tts=0.15,
+        sol=seed,
+        path=path,
+        **params,
+    )
+
+
+def read_csv(path):
+    with open(path) as f:
+        return list(csv.reader(f))
+
+
+def store_results(path, seeds):
+    """Store results from a worker process."""
+    store = ResultStore(path, batch_size=2)
+    for seed in seeds:
+        store.append(make_result(path, seed))
+    store.flush()
+    return os.getpid()
+
+
+def test_store_results_headers(tmp_path):
+    path = str(tmp_path / "results.csv")
+    make_result(path, 0).store_results()
+    make_result(path, 1).store_results()
+    rows = read_csv(path)
+    assert rows[0] == headers()
+    assert rows[1] == ["5", "0.8", "0", "1.415"] + [
+        "0.123457",
+        "0.2",
+        "0.3",
+        "0.05",
+        "0.1",
+        "0.15",
+        "0",
+    ]
+    assert len(rows) == 3
+
+    rewired = str(tmp_path / "rewired.csv")
+    ResultRewired(**make_result(rewired, 0, rewiring_frac=3).__dict__).store_results()
+    rows = read_csv(rewired)
+    assert rows[0] == headers(rewired=True)
+    assert rows[1][4] == "3"
+
+
+def test_batches(tmp_path):
+    path = str(tmp_path / "results.csv")
+    store = ResultStore(path, batch_size=3)
+    assert not store.append(make_result(path, 0))
+    assert not store.append(make_result(path, 1))
+    assert not os.path.exists(store.shard)
+    assert store.append(make_result(path, 2))
+    assert len(read_csv(store.shard)) == 4
+    store.append(make_result(path, 3))
+    assert store.merge() == 4
+    assert not os.path.exists(store.shards)
+    rows = read_csv(path)
+    assert rows[0] == headers()
+    assert [row[2] for row in rows[1:]] == ["0", "1", "2", "3"]
+
+
+def test_merge_workers(tmp_path):
+    path = str(tmp_path / "results.csv")
+    make_result(path, 100).store_results()
+    with ProcessPoolExecutor(max_workers=3) as executor:
+        pids = list(executor.map(store_results, [path] * 3, [[0, 1, 2], [3], [4, 5]]))
+    assert len(os.listdir(path + ".shards")) == len(set(pids))
+
+    assert ResultStore(path).merge() == 6
+    # the results are appended to the existing file, with its headings
+    rows = read_csv(path)
+    assert rows[0] == headers()
+    assert sorted(int(row[2]) for row in rows[1:]) == [0, 1, 2, 3, 4, 5, 100]
+    df = load_results(path)
+    assert list(df.columns) == headers()
+    assert sorted(df["Seed"]) == [0, 1, 2, 3, 4, 5, 100]
+    assert df["CPLEX TTO"].iloc[0] == 0.123457
+
+
+def test_merge_rewired(tmp_path):
+    path = str(tmp_path / "rewired.csv")
+    store = ResultStore(path)
+    for seed in range(3):
+        store.append(ResultRewired(**make_result(path, seed, rewiring_frac=2).__dict__))
+    assert store.merge() == 3
+    assert read_csv(path)[0] == headers(rewired=True)
+    assert (load_results(path)["Frac Rewired"] == 2).all()
+
+
+def test_merge_rewired_without_column(tmp_path):
+    path = str(tmp_path / "results.csv")
+    store = ResultStore(path)
+    store.append(make_result(path, 0))
+    store.merge()
+    store.append(ResultRewired(**make_result(path, 1, rewiring_frac=2).__dict__))
+    with pytest.raises(ValueError):
+        store.merge()
+    # the results are kept in the shard
+    assert len(read_csv(path)) == 2
+    assert os.listdir(path + ".shards")
+
+
+def test_load_results_stale(tmp_path):
+    path = str(tmp_path / "results.csv")
+    store = ResultStore(path)
+    store.append(make_result(path, 0))
+    store.merge()
+    # a result added to the csv afterwards is not in the columnar file
+    make_result(path, 1).store_results()
+    os.utime(path, (os.path.getmtime(path) + 10,) * 2)
+    assert len(load_results(path)) == 2
+
+
+def test_main_backend(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    path = os.path.join("data", "highs", "results.csv")
+    store_results(path, [0, 1, 2])
+    monkeypatch.setattr(
+        sys, "argv", ["result_store.py", "-path", "results", "--backend", "highs"]
+    )
+    main()
+    assert "Merged 3 results" in capsys.readouterr().out
+    assert len(read_csv(path)) == 4
+    assert not os.path.exists(path + ".shards")
+
+
+def test_import_optimization_only(tmp_path):
+    # as exploratory_notebooks/utils.py does: only generator/optimization on the path, no docplex
+    optimization = os.path.dirname(sys.modules["result_store"].__file__)
+    code = "\n".join(
+        [
+            "import sys",
+            f"sys.path.insert(0, {optimization!r})",
+            "sys.modules['docplex'] = None",
+            "from result_store import ResultStore, load_results",
+            "assert 'instance' not in sys.modules and 'backends' not in sys.modules",
+        ]
+    )
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONPATH"}
+    subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env, check=True)
@@ -0,0 +1,120 @@
+###############################################################################
+# // SPDX-License-Identifier: Apache-2.0
+# // Copyright 2023: Amazon Web Services, Inc
+###############################################################################
+import pytest
+import run_cplex
+from docplex.mp.progress import ProgressData
+from generator import Generator
+from run_cplex import (
+    IncumbentTimeline,
+    build_model,
+    model_from_instance,
+    run_one_instance,
+)
+
+
+def test_build_model():
+    mdl = build_model([(0, 1), (1, 2)], 4)
+    assert mdl.number_of_binary_variables == 4
+    assert mdl.number_of_linear_constraints == 2
+    assert mdl.is_maximized()
+    lp = mdl.export_as_lp_string()
+    assert "x_0 + x_1 <= 1" in lp
+    assert "x_1 + x_2 <= 1" in lp
+
+
+def test_model_from_instance():
+    instance = Generator(L=6, density=0.8, r=2).generate(seed=0)
+    mdl = model_from_instance(instance)
+    assert mdl.name == instance.name()
+    assert mdl.number_of_binary_variables == len(instance.nodes)
+    assert mdl.number_of_linear_constraints == instance.num_edges()
+
+
+def test_build_model_cliques():
+    mdl = build_model([(0, 1), (1, 2), (0, 2), (2, 3)], 4, cliques=[[0, 1, 2], [2, 3]])
+    assert mdl.number_of_linear_constraints == 2
+    lp = mdl.export_as_lp_string()
+    assert "x_0 + x_1 + x_2 <= 1" in lp
+
+
+def test_model_from_instance_cliques():
+    instance = Generator(L=6, density=0.8, r=2).generate(seed=0)
+    mdl = model_from_instance(instance, "clique")
+    assert mdl.number_of_linear_constraints == len(instance.cliques())
+    assert mdl.number_of_linear_constraints < instance.num_edges()
+    with pytest.raises(ValueError):
+        model_from_instance(instance, "triangle")
+
+
+def test_run_one_instance_in_memory(tmp_path):
+    pytest.importorskip("cplex")
+    instance = Generator(L=5, density=0.8).generate(seed=0)
+    path = str(tmp_path / (instance.name() + ".lp"))
+    with open(path, "w") as fh:
+        instance.write_cplex(fh)
+    from_file = run_one_instance(path, TTS=True)
+    in_memory = run_one_instance(path, TTS=True, model=model_from_instance(instance))
+    assert in_memory[-1] == from_file[-1]
+
+
+def progress(objective, time):
+    return ProgressData(0, objective is not None, objective, 10, 0, 0, 0, 0, time, 0)
+
+
+def test_incumbent_timeline(tmp_path):
+    log = tmp_path / "timeline.log"
+    with open(log, "w") as fh:
+        timeline = IncumbentTimeline(log_file_obj=fh)
+        timeline.notify_start()
+        for objective, time in [(None, 0.1), (5, 0.2), (7, 0.5), (8, 0.9)]:
+            timeline.notify_progress(progress(objective, time))
+    assert [entry[:2] for entry in timeline.timeline] == [(5, 0.2), (7, 0.5), (8, 0.9)]
+    assert timeline.time_to(7)[0] == 0.5
+    assert timeline.time_to(6)[0] == 0.5
+    assert timeline.time_to(9) is None
+    assert timeline.time_to(5, minimize=True)[0] == 0.2
+    assert log.read_text().count("INCUMBENT") == 3
+    # a new solve starts a new timeline
+    timeline.notify_start()
+    assert timeline.timeline == []
+
+
+def test_run_one_instance_tts_mode(tmp_path):
+    with pytest.raises(ValueError):
+        run_one_instance(str(tmp_path / "instance.lp"), tts_mode="twice")
+
+
+def test_run_one_instance_single_tts(tmp_path):
+    pytest.importorskip("cplex")
+    instance = Generator(L=5, density=0.8).generate(seed=0)
+    path = str(tmp_path / (instance.name() + ".lp"))
+    with open(path, "w") as fh:
+        instance.write_cplex(fh)
+    single = run_one_instance(path, TTS=True, tts_mode="single")
+    replay = run_one_instance(path, TTS=True, tts_mode="replay")
+    assert single[-1] == replay[-1]
+    # the optimum is found before the end of the solve which proves it
+    assert 0 < single[3] <= single[0]
+
+
+def test_run_one_instance_reads_once(tmp_path, monkeypatch):
+    reads, models = [], []
+
+    def read(path, ignore_names=False):
+        reads.append(path)
+        return "model"
+
+    def run_cplex_once(path, log_file_path, TTS, threads, model, **kwargs):
+        models.append(model)
+        return 1.0, 1.0, 1.0, 7
+
+    monkeypatch.setattr(run_cplex.ModelReader, "read", read)
+    monkeypatch.setattr(run_cplex, "run_cplex_once", run_cplex_once)
+    path = str(tmp_path / "instance.lp")
+    results = run_one_instance(path, TTS=True, tts_mode="replay")
+    assert results[-1] == 7
+    # both runs optimize the model read from the lp file
+    assert reads == [path]
+    assert models == ["model", "model"]
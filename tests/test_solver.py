@@ -8,7 +8,8 @@ from pprint import pprint
 
 import pytest
 
-from solver import main
+from generator import Generator
+from solver import find_boundaries, load_binary, load_json, main, neighbor_masks, solve
 
 
 def test_main(tmp_path, capsys):  # Added capsys parameter
@@ -43,3 +44,60 @@ def test_main(tmp_path, capsys):  # Added capsys parameter
     assert "solutions:\n" in captured.out
     assert "[0, 4]\n" in captured.out
     assert "[1, 3]\n" in captured.out
+
+
+def brute_force(nn):
+    """Size and number of the maximum independent sets."""
+    best, count = 0, 0
+    for assignment in range(1 << len(nn)):
+        nodes = [i for i in range(len(nn)) if (assignment >> i) & 1]
+        if any((assignment >> j) & 1 for i in nodes for j in nn[i]):
+            continue
+        if len(nodes) > best:
+            best, count = len(nodes), 0
+        if len(nodes) == best:
+            count += 1
+    return best, count
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("r", [1, 2 ** 0.5, 2, 3])
+@pytest.mark.parametrize("max_candidates", [0, 3])
+def test_solve(seed, r, max_candidates):
+    instance = Generator(L=4, density=0.8, r=r).generate(seed=seed)
+    nn = [[] for _ in instance.nodes]
+    for a, b in instance.edges:
+        nn[a] += [b]
+        nn[b] += [a]
+    best, count, candidates = solve(nn, max_candidates=max_candidates)
+    assert (best, count) == brute_force(nn)
+    assert len(candidates) == min(count, max_candidates)
+    for candidate in candidates:
+        assert bin(candidate).count("1") == best
+        for i in range(len(nn)):
+            if (candidate >> i) & 1:
+                assert all(not (candidate >> j) & 1 for j in nn[i])
+
+
+def test_load_binary(tmp_path):
+    instance = Generator(L=4, density=0.8, r=2).generate(seed=1)
+    instance.binary(tmp_path / "instance.bin")
+    with open(tmp_path / "instance.json", "w") as fh:
+        instance.write_json(fh)
+    L, nn = load_binary(str(tmp_path / "instance.bin"))
+    assert L == 4
+    assert nn == [sorted(n) for n in load_json(str(tmp_path / "instance.json"))[1]]
+    assert solve(nn)[:2] == brute_force(nn)
+
+
+def test_neighbor_masks():
+    assert neighbor_masks([[1, 2], [0], [0]]) == [0, 1, 2]
+
+
+def test_find_boundaries():
+    # path 0-1-2-3: only the last processed node is on the boundary
+    assert find_boundaries([[1], [0, 2], [1, 3], [2]]) == [1, 1, 1, 0]
+    # star around 0: node 0 stays on the boundary until the last leaf
+    assert find_boundaries([[1, 2, 3], [0], [0], [0]]) == [1, 2, 3, 0]
+    # node 1 is isolated, but still within the range 0..2 of the boundary
+    assert find_boundaries([[2], [], [0]]) == [1, 2, 0]
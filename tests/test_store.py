@@ -0,0 +1,76 @@
+###############################################################################
+# // SPDX-License-Identifier: Apache-2.0
+# // Copyright 2023: Amazon Web Services, Inc
+###############################################################################
+import os
+
+import pytest
+
+from generator import Generator
+from store import InstanceStore
+
+
+def test_key():
+    key = InstanceStore.key(L=5, density=0.8, seed=0, r=2 ** 0.5)
+    assert key == InstanceStore.key(L=5, density=0.8, seed=0, r=1.415)
+    assert key != InstanceStore.key(L=5, density=0.8, seed=1, r=2 ** 0.5)
+    assert key != InstanceStore.key(L=5, density=0.8, seed=0, r=2 ** 0.5, version="0")
+
+
+def test_get(tmp_path):
+    store = InstanceStore(str(tmp_path))
+    expected = Generator(L=6, density=0.8, r=2).generate(seed=3)
+    instance = store.get(L=6, density=0.8, seed=3, r=2)
+    assert len(store) == 1
+    # a new store on the same folder loads the instance instead of generating it
+    loaded = InstanceStore(str(tmp_path)).get(L=6, density=0.8, seed=3, r=2)
+    for a in [instance, loaded]:
+        assert a.name() == expected.name()
+        assert a.nodes == expected.nodes
+        assert a.cplex() == expected.cplex()
+        assert a.json() == expected.json()
+
+
+def test_path(tmp_path):
+    store = InstanceStore(str(tmp_path))
+    path = store.path("cplex", L=5, seed=1)
+    assert path.endswith("N20_d0.8_s1_r1.415.lp")
+    with open(path) as fh:
+        assert fh.read() == Generator(L=5).generate(seed=1).cplex()
+    assert store.path("cplex", L=5, seed=1) == path
+    assert store.path("bits", L=5, seed=1).endswith(".bits.npy")
+    assert len(store) == 1
+    assert sorted(os.listdir(os.path.dirname(path)))[0] == "N20_d0.8_s1_r1.415.bits.npy"
+
+
+def test_path_cached(tmp_path, monkeypatch):
+    path = InstanceStore(str(tmp_path)).path("cplex", L=5, seed=1)
+
+    def load(self, key):
+        raise AssertionError("rendered files are looked up without loading")
+
+    monkeypatch.setattr(InstanceStore, "load", load)
+    store = InstanceStore(str(tmp_path))
+    assert store.name(InstanceStore.key(5, 0.8, 1, 2 ** 0.5)) == "N20_d0.8_s1_r1.415"
+    assert store.path("cplex", L=5, seed=1) == path
+    with pytest.raises(AssertionError):
+        store.path("bits", L=5, seed=1)
+    # the store is only scanned when its size is needed
+    assert store._usage is None
+    assert len(store) == 1
+
+
+def test_evict(tmp_path):
+    store = InstanceStore(str(tmp_path))
+    store.get(L=8, seed=0)
+    size = store.size()
+    store = InstanceStore(str(tmp_path), max_bytes=int(2.5 * size))
+    store.get(L=8, seed=1)
+    store.get(L=8, seed=2)
+    assert len(store) == 2
+    assert InstanceStore.key(8, 0.8, 0, 2 ** 0.5) not in store
+    # using an instance makes it the most recently used
+    store.get(L=8, seed=1)
+    store.get(L=8, seed=3)
+    assert InstanceStore.key(8, 0.8, 1, 2 ** 0.5) in store
+    assert InstanceStore.key(8, 0.8, 2, 2 ** 0.5) not in store
@@ -0,0 +1,124 @@
+###############################################################################
+# // SPDX-License-Identifier: Apache-2.0
+# // Copyright 2023: Amazon Web Services, Inc
+###############################################################################
+import csv
+import os
+import sys
+
+import pytest
+from opt_result import Result, headers
+from result_store import ResultStore, load_results
+from sweep import Ledger, main, make_jobs, run_sweep
+
+
+def fake_runner(job, path_to_save):
+    """Stand-in for CPLEX returning the seed as the solution."""
+    return Result(
+        L=job["L"],
+        density=job["density"],
+        seed=job["seed"],
+        r=job["r"],
+        tto_cplex=0,
+        raw_time_diff=0,
+        time_diff=0,
+        tts_cplex=0,
+        raw_time_diff_tts=0,
+        time_diff_tts=0,
+        sol=job["seed"],
+        path=path_to_save,
+    )
+
+
+def test_make_jobs():
+    jobs = make_jobs([5, 7], [0, 1, 2], [1.0], [0.8])
+    assert len(jobs) == 6
+    assert jobs[0] == dict(L=5, seed=0, r=1.0, density=0.8, rewiring_frac=0, ER=False)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_sweep_resumes(tmp_path, workers):
+    results = str(tmp_path / "results.csv")
+    ledger_path = str(tmp_path / "sweep.ledger")
+    jobs = make_jobs([5], [0, 1, 2, 3], [1.0, 2 ** 0.5], [0.8])
+
+    # A first (partial) sweep, as if it had been killed
+    kwargs = dict(workers=workers, runner=fake_runner, path_to_save=results)
+    run_sweep(jobs[:3], Ledger(ledger_path), **kwargs)
+    # Resume the full sweep
+    ran = run_sweep(jobs, Ledger(ledger_path), **kwargs)
+    assert ran == len(jobs) - 3
+    # the results are in the shard of this process until they are merged
+    assert not os.path.isfile(results)
+    assert ResultStore(results).merge() == len(jobs)
+
+    with open(results) as f:
+        header, *rows = list(csv.reader(f))
+    assert header == headers()
+    assert len(rows) == len(jobs)
+    assert sorted((row[2], row[3]) for row in rows) == sorted(
+        (str(job["seed"]), str(job["r"])) for job in jobs
+    )
+    assert all(job in Ledger(ledger_path) for job in jobs)
+
+
+def failing_runner(job, path_to_save):
+    """Stand-in for CPLEX failing on seed 5."""
+    if job["seed"] == 5:
+        raise RuntimeError("CPLEX failed")
+    return fake_runner(job, path_to_save)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_sweep_batches(tmp_path, capsys, workers):
+    results = str(tmp_path / "results.csv")
+    ledger_path = str(tmp_path / "sweep.ledger")
+    jobs = make_jobs([5], list(range(7)), [1.0], [0.8])
+
+    kwargs = dict(batch_size=2, path_to_save=results, workers=workers)
+    with pytest.raises(RuntimeError, match="1 of 7 jobs failed"):
+        run_sweep(jobs, Ledger(ledger_path), runner=failing_runner, **kwargs)
+    assert "s=5" in capsys.readouterr().out
+    # the results of all the other jobs are kept
+    assert sum(job in Ledger(ledger_path) for job in jobs) == 6
+    assert ResultStore(results).merge() == 6
+    assert len(load_results(results)) == 6
+
+    run_sweep(jobs, Ledger(ledger_path), runner=fake_runner, **kwargs)
+    ResultStore(results).merge()
+    assert sorted(load_results(results)["Solution"]) == list(range(7))
+
+
+def test_ledger_settings(tmp_path):
+    ledger_path = str(tmp_path / "sweep.ledger")
+    job = make_jobs([5], [0], [1.0], [0.8])[0]
+    Ledger(ledger_path).record(job)
+    assert job in Ledger(ledger_path)
+    # the same instance optimized with other settings is another job
+    assert job not in Ledger(ledger_path, backend="highs")
+    assert job not in Ledger(ledger_path, formulation="clique")
+    assert job not in Ledger(ledger_path, tts_mode="replay")
+    assert job not in Ledger(ledger_path, TTS=True)
+
+
+def test_run_sweep_keeps_other_shards(tmp_path):
+    results = str(tmp_path / "results.csv")
+    other = tmp_path / "results.csv.shards" / "otherhost-1.csv"
+    other.parent.mkdir()
+    other.write_text(",".join(headers(rewired=True)) + "\n")
+    jobs = make_jobs([5], [0, 1], [1.0], [0.8])
+    run_sweep(
+        jobs, Ledger(str(tmp_path / "ledger")), runner=fake_runner, path_to_save=results
+    )
+    # the shard of another process which may still be running is left alone
+    assert other.is_file()
+    assert len(os.listdir(other.parent)) == 2
+
+
+@pytest.mark.parametrize("source", ["--store", "--archive"])
+@pytest.mark.parametrize("graphs", [["-ER"], ["-rewiring_frac", "0", "5"]])
+def test_main_udg_only(monkeypatch, source, graphs):
+    args = ["sweep.py", "-L", "5", "-s", "0:2", "-path", "test", source, "folder"]
+    monkeypatch.setattr(sys, "argv", args + graphs)
+    with pytest.raises(SystemExit):
+        main()
@@ -13,3 +13,25 @@ import utils as Util
 )
 def test_format_radius(test_input, expected):
     assert Util.format_radius(test_input) == expected
+
+
+def test_lattice_offsets():
+    xy, d2 = Util.lattice_offsets(3)
+    assert (d2[:-1] <= d2[1:]).all()
+    assert (xy[:, 0] ** 2 + xy[:, 1] ** 2 == d2).all()
+    assert xy[:4].tolist() == [[-1, 0], [0, -1], [0, 1], [1, 0]]
+    # extending the table keeps the offsets within the previous radius
+    more, _ = Util.lattice_offsets(20)
+    assert more[: len(xy)].tolist() == xy.tolist()
+
+
+@pytest.mark.parametrize("r", [1, 2 ** 0.5, 2, 3.3166247903554, 7.5])
+def test_directions_within(r):
+    lattice = [(x, y) for x in range(-8, 9) for y in range(-8, 9)]
+    expected = [(x, y) for x, y in lattice if 0 < x ** 2 + y ** 2 <= r ** 2]
+    assert list(Util.directions_within(r)) == expected
+
+
+def test_generate_all_radius():
+    assert Util.generate_all_radius(1) == {1.0, 1.415}
+    assert Util.generate_all_radius(2) == {1.0, 1.415, 2.0, 2.237, 2.829}